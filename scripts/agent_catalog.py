@@ -0,0 +1,489 @@
+#!/usr/bin/env python3
+"""Persistent SQLite catalog of agent markdown files.
+
+Indexes every ``*.md`` under the given roots (default: opencode, claude) with
+name, description, schema, metadata, tags, model, path, mtime and content hash.
+Refreshes are incremental: files whose mtime and size are unchanged are not
+read, and files whose content hash is unchanged are not re-parsed. Rows for
+files that disappeared from a refreshed root are dropped. Rows are keyed by
+(root, path), so overlapping roots (e.g. ``.`` and ``opencode``) keep
+separate rows.
+
+``sync`` is the cheap variant: it stats only the directories recorded by the
+last refresh and rescans those whose mtime changed (files added, removed or
+renamed there), plus any new subdirectories. Files edited in place inside an
+unchanged directory keep their indexed metadata until the next ``refresh``.
+
+lint_agents.py, flatten_agents.py and convert_to_opencode.py accept
+``--catalog PATH`` to list agents from the catalog instead of walking the
+filesystem; they ``sync`` the listed root first, so agents added or removed
+since the last ``refresh`` are never missed.
+
+Usage:
+    python scripts/agent_catalog.py refresh --roots opencode claude
+    python scripts/agent_catalog.py query --tag security
+    python scripts/agent_catalog.py query --schema claude --model zai-coding-plan/glm-4.6 --json
+
+Library:
+    from agent_catalog import AgentCatalog
+    with AgentCatalog(".cache/agent-catalog.sqlite") as catalog:
+        catalog.refresh(["opencode", "claude"])
+        names = [a.name for a in catalog.query(tag="security")]
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import posixpath
+import sqlite3
+import sys
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+try:
+    from . import agent_frontmatter
+    from .lint_agents import classify_schema
+except ImportError:  # executed as a script: scripts/ is on sys.path
+    import agent_frontmatter
+    from lint_agents import classify_schema
+
+DEFAULT_CATALOG = Path(".cache") / "agent-catalog.sqlite"
+DEFAULT_ROOTS = ["opencode", "claude"]
+SCHEMA_DIRS = ("opencode", "claude")
+SCHEMA_VERSION = 2  # Older catalogs are dropped and rebuilt on the next refresh
+# A directory modified this recently may change again within the same mtime
+# tick; its mtime is not recorded, so the next sync rescans it
+RACY_MTIME_NS = 2_000_000_000
+
+_DDL = """
+CREATE TABLE IF NOT EXISTS agents (
+    path TEXT NOT NULL,
+    root TEXT NOT NULL,
+    rel TEXT NOT NULL,
+    name TEXT,
+    description TEXT,
+    schema TEXT,
+    model TEXT,
+    metadata TEXT,
+    tags TEXT,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    content_hash TEXT NOT NULL,
+    PRIMARY KEY (root, path)
+);
+CREATE INDEX IF NOT EXISTS agents_schema ON agents(schema);
+CREATE INDEX IF NOT EXISTS agents_model ON agents(model);
+CREATE TABLE IF NOT EXISTS agent_tags (
+    root TEXT NOT NULL,
+    path TEXT NOT NULL,
+    tag TEXT NOT NULL,
+    PRIMARY KEY (tag, root, path),
+    FOREIGN KEY (root, path) REFERENCES agents(root, path) ON DELETE CASCADE
+);
+CREATE TABLE IF NOT EXISTS agent_dirs (
+    root TEXT NOT NULL,
+    rel TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    PRIMARY KEY (root, rel)
+);
+"""
+
+
+@dataclass
+class AgentRecord:
+    path: str
+    root: str
+    rel: str
+    name: Optional[str]
+    description: Optional[str]
+    schema: Optional[str]
+    model: Optional[str]
+    metadata: Optional[Dict[str, Any]]
+    tags: List[str]
+    mtime_ns: int
+    size: int
+    content_hash: str
+
+
+@dataclass
+class RefreshStats:
+    scanned: int = 0
+    unchanged: int = 0
+    touched: int = 0  # mtime changed, content identical
+    parsed: int = 0
+    removed: int = 0
+
+
+def detect_schema(path: Path) -> Optional[str]:
+    schema = classify_schema(path, "auto")
+    return schema.name if schema is not None else None
+
+
+def extract_tags(fm: Dict[str, Any]) -> List[str]:
+    """Top-level ``tags`` (Claude) plus ``metadata.tags`` (OpenCode skills)."""
+    sources = [fm.get("tags")]
+    if isinstance(fm.get("metadata"), dict):
+        sources.append(fm["metadata"].get("tags"))
+    tags: List[Any] = []
+    for source in sources:
+        if isinstance(source, str):
+            tags.extend(t.strip() for t in source.split(","))
+        elif isinstance(source, list):
+            tags.extend(source)
+    return sorted({str(t) for t in tags if t not in (None, "")})
+
+
+class AgentCatalog:
+    def __init__(self, db_path: str | Path = DEFAULT_CATALOG) -> None:
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.db_path))
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        if self.conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            self.conn.executescript(
+                "DROP TABLE IF EXISTS agent_tags; DROP TABLE IF EXISTS agents; "
+                "DROP TABLE IF EXISTS agent_dirs;"
+            )
+            self.conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self.conn.executescript(_DDL)
+
+    def __enter__(self) -> "AgentCatalog":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.conn.close()
+
+    # ---------------------------
+    # Refresh
+    # ---------------------------
+
+    def refresh(self, roots: Iterable[str | Path]) -> RefreshStats:
+        """Walk ``roots`` completely; every indexed file is stat'ed."""
+        return self._refresh(roots, only_changed=False)
+
+    def sync(self, roots: Iterable[str | Path]) -> RefreshStats:
+        """Rescan only directories whose mtime changed since they were indexed.
+
+        Costs one stat per recorded directory; a root never refreshed before
+        is walked completely.
+        """
+        return self._refresh(roots, only_changed=True)
+
+    def _refresh(self, roots: Iterable[str | Path], only_changed: bool) -> RefreshStats:
+        stats = RefreshStats()
+        with self.conn:
+            for root in roots:
+                root_path = Path(root)
+                if root_path.is_dir():
+                    self._refresh_root(root_path, stats, only_changed)
+        return stats
+
+    def _refresh_root(self, root: Path, stats: RefreshStats, only_changed: bool = False) -> None:
+        root_abs = root.resolve()
+        existing = {
+            row["path"]: row
+            for row in self.conn.execute(
+                "SELECT path, rel, mtime_ns, size, content_hash FROM agents WHERE root = ?",
+                (str(root_abs),),
+            )
+        }
+        known = {
+            row["rel"]: row["mtime_ns"]
+            for row in self.conn.execute(
+                "SELECT rel, mtime_ns FROM agent_dirs WHERE root = ?", (str(root_abs),)
+            )
+        }
+        full = not only_changed or not known
+        todo: List[str] = [""] if full else []
+        gone: set[str] = set()
+        if not full:
+            for rel_dir, mtime_ns in known.items():
+                try:
+                    if os.stat(root / rel_dir).st_mtime_ns != mtime_ns:
+                        todo.append(rel_dir)
+                except OSError:
+                    gone.add(rel_dir)
+
+        scanned: Dict[str, int] = {}
+        seen: set[str] = set()
+        while todo:
+            rel_dir = todo.pop()
+            if rel_dir in scanned:
+                continue
+            try:
+                scanned[rel_dir], subdirs = self._scan_dir(root, root_abs, rel_dir, existing, seen, stats)
+            except OSError:
+                gone.add(rel_dir)
+                continue
+            # Known subdirectories are stat'ed on their own unless walking everything
+            todo.extend(d for d in subdirs if full or d not in known)
+        if full:
+            gone |= known.keys() - scanned.keys()
+
+        listed = scanned.keys() | gone
+        stale = [
+            key
+            for key, row in existing.items()
+            if key not in seen and posixpath.dirname(row["rel"]) in listed
+        ]
+        self.conn.executemany(
+            "DELETE FROM agents WHERE root = ? AND path = ?",
+            [(str(root_abs), key) for key in stale],
+        )
+        stats.removed += len(stale)
+        self.conn.executemany(
+            "DELETE FROM agent_dirs WHERE root = ? AND rel = ?",
+            [(str(root_abs), rel) for rel in gone],
+        )
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO agent_dirs VALUES (?, ?, ?)",
+            [(str(root_abs), rel, mtime_ns) for rel, mtime_ns in scanned.items()],
+        )
+
+    def _scan_dir(
+        self,
+        root: Path,
+        root_abs: Path,
+        rel_dir: str,
+        existing: Dict[str, sqlite3.Row],
+        seen: set[str],
+        stats: RefreshStats,
+    ) -> Tuple[int, List[str]]:
+        """Index the ``*.md`` files directly in ``rel_dir``; return (its mtime, subdirectories)."""
+        directory = root / rel_dir
+        mtime_ns = os.stat(directory).st_mtime_ns
+        if time.time_ns() - mtime_ns < RACY_MTIME_NS:
+            mtime_ns = 0  # Never equal to a real mtime: rescanned next sync
+        subdirs: List[str] = []
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                rel = posixpath.join(rel_dir, entry.name) if rel_dir else entry.name
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(rel)
+                elif entry.name.endswith(".md") and entry.is_file():
+                    self._index_file(root, root_abs, Path(rel), entry.stat(), existing, stats)
+                    seen.add(str(root_abs / rel))
+        return mtime_ns, subdirs
+
+    def _index_file(
+        self,
+        root: Path,
+        root_abs: Path,
+        rel: Path,
+        st: os.stat_result,
+        existing: Dict[str, sqlite3.Row],
+        stats: RefreshStats,
+    ) -> None:
+        stats.scanned += 1
+        path = root / rel
+        abs_path = root_abs / rel
+        key = str(abs_path)
+        row = existing.get(key)
+        if row is not None and (row["mtime_ns"], row["size"]) == (
+            st.st_mtime_ns,
+            st.st_size,
+        ):
+            stats.unchanged += 1
+            return
+        digest = hashlib.sha256(path.read_bytes()).hexdigest()
+        if row is not None and row["content_hash"] == digest:
+            self.conn.execute(
+                "UPDATE agents SET mtime_ns = ?, size = ? WHERE root = ? AND path = ?",
+                (st.st_mtime_ns, st.st_size, str(root_abs), key),
+            )
+            stats.touched += 1
+            return
+        self._upsert(path, abs_path, root_abs, rel, st, digest)
+        stats.parsed += 1
+
+    def _upsert(
+        self,
+        path: Path,
+        abs_path: Path,
+        root_abs: Path,
+        rel: Path,
+        st: os.stat_result,
+        digest: str,
+    ) -> None:
+        doc = agent_frontmatter.read_frontmatter(path)
+        fm: Dict[str, Any] = {}
+        if doc.has_frontmatter:
+            try:
+                loaded = agent_frontmatter.load_yaml(doc.header)
+            except Exception:
+                loaded = None
+            if isinstance(loaded, dict):
+                fm = loaded
+        metadata = fm.get("metadata") if isinstance(fm.get("metadata"), dict) else None
+        tags = extract_tags(fm)
+        key = str(abs_path)
+        self.conn.execute(
+            "INSERT OR REPLACE INTO agents VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                key,
+                str(root_abs),
+                rel.as_posix(),
+                _opt_str(fm.get("name")),
+                _opt_str(fm.get("description")),
+                detect_schema(path),
+                _opt_str(fm.get("model")),
+                json.dumps(metadata, default=str) if metadata is not None else None,
+                json.dumps(tags),
+                st.st_mtime_ns,
+                st.st_size,
+                digest,
+            ),
+        )
+        self.conn.execute(
+            "DELETE FROM agent_tags WHERE root = ? AND path = ?", (str(root_abs), key)
+        )
+        self.conn.executemany(
+            "INSERT INTO agent_tags (root, path, tag) VALUES (?, ?, ?)",
+            [(str(root_abs), key, tag) for tag in tags],
+        )
+
+    # ---------------------------
+    # Queries
+    # ---------------------------
+
+    def query(
+        self,
+        tag: Optional[str] = None,
+        schema: Optional[str] = None,
+        model: Optional[str] = None,
+        name: Optional[str] = None,
+        root: Optional[str | Path] = None,
+    ) -> List[AgentRecord]:
+        sql = "SELECT agents.* FROM agents"
+        clauses: List[str] = []
+        params: List[Any] = []
+        if tag is not None:
+            sql += (
+                " JOIN agent_tags ON agent_tags.root = agents.root"
+                " AND agent_tags.path = agents.path"
+            )
+            clauses.append("agent_tags.tag = ?")
+            params.append(tag)
+        for column, value in (("schema", schema), ("model", model), ("name", name)):
+            if value is not None:
+                clauses.append(f"agents.{column} = ?")
+                params.append(value)
+        if root is not None:
+            clauses.append("agents.root = ?")
+            params.append(str(Path(root).resolve()))
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY agents.root, agents.rel"
+        return [_to_record(row) for row in self.conn.execute(sql, params)]
+
+    def paths(self, root: str | Path) -> List[Path]:
+        """Indexed files under ``root``, presented relative to ``root`` as given.
+
+        Mirrors ``Path(root).rglob('*.md')`` output (sorted) as of the last
+        refresh or sync of ``root``; call :meth:`sync` first for a current
+        listing.
+        """
+        root_path = Path(root)
+        rows = self.conn.execute(
+            "SELECT rel FROM agents WHERE root = ? ORDER BY rel",
+            (str(root_path.resolve()),),
+        )
+        return [root_path / row["rel"] for row in rows]
+
+
+def _opt_str(value: Any) -> Optional[str]:
+    return None if value is None else str(value)
+
+
+def _to_record(row: sqlite3.Row) -> AgentRecord:
+    return AgentRecord(
+        path=row["path"],
+        root=row["root"],
+        rel=row["rel"],
+        name=row["name"],
+        description=row["description"],
+        schema=row["schema"],
+        model=row["model"],
+        metadata=json.loads(row["metadata"]) if row["metadata"] else None,
+        tags=json.loads(row["tags"]) if row["tags"] else [],
+        mtime_ns=row["mtime_ns"],
+        size=row["size"],
+        content_hash=row["content_hash"],
+    )
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description="Build and query the agent catalog.")
+    parser.add_argument(
+        "--db",
+        default=str(DEFAULT_CATALOG),
+        help=f"Catalog database path (default {DEFAULT_CATALOG})",
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    refresh_p = sub.add_parser("refresh", help="Incrementally (re)index agent roots")
+    refresh_p.add_argument(
+        "--roots", nargs="+", default=DEFAULT_ROOTS, help="Root directories to index"
+    )
+
+    query_p = sub.add_parser("query", help="Query indexed agents")
+    query_p.add_argument("--tag", help="Only agents carrying this tag")
+    query_p.add_argument("--schema", choices=list(SCHEMA_DIRS), help="Schema filter")
+    query_p.add_argument("--model", help="Exact model filter")
+    query_p.add_argument("--name", help="Exact name filter")
+    query_p.add_argument("--root", help="Only agents under this root")
+    query_p.add_argument(
+        "--refresh",
+        nargs="*",
+        metavar="ROOT",
+        help="Refresh ROOTs (default opencode claude) before querying",
+    )
+    query_p.add_argument("--json", action="store_true", help="Emit full JSON records")
+    args = parser.parse_args(argv)
+
+    with AgentCatalog(args.db) as catalog:
+        if args.command == "refresh":
+            stats = catalog.refresh(args.roots)
+            print(
+                f"Catalog {args.db}: scanned={stats.scanned} parsed={stats.parsed} "
+                f"touched={stats.touched} unchanged={stats.unchanged} "
+                f"removed={stats.removed}"
+            )
+            return 0
+
+        if args.refresh is not None:
+            catalog.refresh(args.refresh or DEFAULT_ROOTS)
+        records = catalog.query(
+            tag=args.tag,
+            schema=args.schema,
+            model=args.model,
+            name=args.name,
+            root=args.root,
+        )
+    if args.json:
+        print(json.dumps([asdict(r) for r in records], indent=2))
+    else:
+        for r in records:
+            print(f"{r.name or '-'}\t{r.schema or '-'}\t{os.path.relpath(r.path)}")
+    return 0
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main(sys.argv[1:]))
+    except KeyboardInterrupt:
+        print("Interrupted", file=sys.stderr)
+        sys.exit(130)
+    except Exception as e:
+        print("Internal error:", e, file=sys.stderr)
+        sys.exit(2)
@@ -0,0 +1,104 @@
+"""Streaming frontmatter reader and YAML codec shared by the agent scripts.
+
+Agent markdown files start with a ``---`` delimited YAML header followed by a
+(potentially large) prompt body. ``read_frontmatter`` reads the file line by
+line and stops at the closing delimiter, so callers that only need the header
+pay I/O proportional to the header size. The body is read on first access of
+``FrontmatterDocument.body``.
+
+``load_yaml``/``dump_yaml`` use libyaml's CSafeLoader/CSafeDumper when PyYAML
+was built with it and fall back to the pure-Python SafeLoader/SafeDumper
+otherwise. Parsed headers are memoized by content, so repeated loads of the
+same header (bulk lint, conversion, indexing) only parse once.
+
+Used by:
+- scripts/lint_agents.py
+- scripts/convert-agent.py
+- scripts/convert_to_opencode.py
+"""
+
+from __future__ import annotations
+
+import copy
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Optional
+
+import yaml
+
+try:
+    from yaml import CSafeDumper as SafeDumper
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:  # PyYAML built without libyaml
+    from yaml import SafeDumper, SafeLoader  # type: ignore[assignment]
+
+DELIMITER = b"---"
+PARSE_CACHE_SIZE = 4096
+
+
+@dataclass
+class FrontmatterDocument:
+    path: Path
+    # Raw YAML text between the delimiters; None if absent or unterminated.
+    header: Optional[str]
+    # Byte offset of the first body byte (just past the closing delimiter line).
+    body_offset: int
+    encoding: str = "utf-8"
+    _body: Optional[str] = field(default=None, repr=False, compare=False)
+
+    @property
+    def has_frontmatter(self) -> bool:
+        return self.header is not None
+
+    @property
+    def body(self) -> str:
+        """Everything after the closing delimiter (whole file if no header)."""
+        if self._body is None:
+            with self.path.open("rb") as fh:
+                fh.seek(self.body_offset)
+                self._body = fh.read().decode(self.encoding)
+        return self._body
+
+
+def _is_delimiter(line: bytes) -> bool:
+    return line.rstrip(b"\r\n") == DELIMITER
+
+
+def read_frontmatter(path: Path, encoding: str = "utf-8") -> FrontmatterDocument:
+    """Read only the frontmatter block of ``path``.
+
+    The opening delimiter must be the first line; reading stops at the first
+    subsequent line consisting solely of ``---``.
+    """
+    with path.open("rb") as fh:
+        first = fh.readline()
+        if not _is_delimiter(first):
+            return FrontmatterDocument(path, None, 0, encoding)
+        offset = len(first)
+        lines = []
+        for line in fh:
+            offset += len(line)
+            if _is_delimiter(line):
+                header = b"".join(lines).decode(encoding)
+                return FrontmatterDocument(path, header, offset, encoding)
+            lines.append(line)
+    return FrontmatterDocument(path, None, 0, encoding)
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _load_cached(text: str) -> Any:
+    return yaml.load(text, Loader=SafeLoader)  # nosec B506 (safe loader)
+
+
+def load_yaml(text: str) -> Any:
+    """Drop-in for ``yaml.safe_load`` on a string, memoized by content.
+
+    Returns a deep copy so callers may mutate the result freely.
+    """
+    return copy.deepcopy(_load_cached(text))
+
+
+def dump_yaml(data: Any, **kwargs: Any) -> str:
+    """Drop-in for ``yaml.safe_dump`` returning a string."""
+    return yaml.dump(data, Dumper=SafeDumper, **kwargs)
@@ -10,16 +10,16 @@ import argparse
 import re
 import sys
 from pathlib import Path
-import yaml
 
+from agent_frontmatter import dump_yaml, load_yaml, read_frontmatter
 
-def parse_frontmatter(content):
-    """Extract YAML frontmatter from markdown content."""
-    if content.startswith("---\n"):
-        parts = content.split("---\n", 2)
-        if len(parts) >= 3:
-            return yaml.safe_load(parts[1]), parts[2]
-    return {}, content
+
+def parse_frontmatter(path):
+    """Extract YAML frontmatter and body from a markdown file."""
+    doc = read_frontmatter(path)
+    if doc.has_frontmatter:
+        return load_yaml(doc.header) or {}, doc.body
+    return {}, doc.body
 
 
 def claude_to_opencode(frontmatter, content):
@@ -102,7 +102,7 @@ def opencode_to_claude(frontmatter, content, filename):
 
 def format_frontmatter(data):
     """Format frontmatter as YAML."""
-    return yaml.dump(data, default_flow_style=False, sort_keys=False)
+    return dump_yaml(data, default_flow_style=False, sort_keys=False)
 
 
 def main():
@@ -121,8 +121,7 @@ def main():
         print(f"Error: {args.input_file} not found")
         sys.exit(1)
 
-    content = input_path.read_text()
-    frontmatter, body = parse_frontmatter(content)
+    frontmatter, body = parse_frontmatter(input_path)
 
     # Convert based on target format
     if args.to == "opencode":
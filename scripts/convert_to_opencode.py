@@ -10,7 +10,6 @@ OpenCode skill directories by:
 4. Supporting both flat and category-based Claude layouts
 """
 
-import re
 from pathlib import Path
 import yaml
 import click
@@ -18,6 +17,11 @@ from rich.console import Console
 from rich.table import Table
 from rich.progress import track
 
+try:
+    from .agent_frontmatter import dump_yaml, load_yaml, read_frontmatter
+except ImportError:  # executed as a script: scripts/ is on sys.path
+    from agent_frontmatter import dump_yaml, load_yaml, read_frontmatter
+
 console = Console()
 
 DEFAULT_METADATA = {
@@ -28,23 +32,18 @@ DEFAULT_METADATA = {
 
 def parse_agent_file(file_path):
     """Parse a Claude Code agent file and extract frontmatter and content."""
-    with open(file_path, "r", encoding="utf-8") as f:
-        content = f.read()
-
-    # Extract YAML frontmatter
-    match = re.match(r"^---\n(.*?)\n---\n(.*)$", content, re.DOTALL)
-    if not match:
+    doc = read_frontmatter(Path(file_path))
+    if not doc.has_frontmatter:
         console.print(f"[yellow]Warning: No frontmatter found in {file_path}[/yellow]")
-        return None, content
+        return None, doc.body
 
-    frontmatter_str, body = match.groups()
     try:
-        frontmatter = yaml.safe_load(frontmatter_str)
+        frontmatter = load_yaml(doc.header)
     except yaml.YAMLError as e:
         console.print(f"[red]Error parsing YAML in {file_path}: {e}[/red]")
-        return None, content
+        return None, doc.body
 
-    return frontmatter, body
+    return frontmatter, doc.body
 
 
 def convert_frontmatter(frontmatter):
@@ -68,8 +67,14 @@ def normalize_body(body):
     return body.lstrip("\n")
 
 
-def discover_agent_files(source_path):
-    """Discover Claude agent markdown files in flat or category-based layouts."""
+def discover_agent_files(source_path, catalog=None):
+    """Discover Claude agent markdown files in flat or category-based layouts.
+
+    With a catalog (scripts/agent_catalog.py), lists indexed files instead of walking.
+    """
+    if catalog is not None:
+        return discover_from_catalog(source_path, catalog)
+
     agent_files = []
     for agent_file in sorted(source_path.glob("*.md")):
         if agent_file.name not in [
@@ -88,6 +93,21 @@ def discover_agent_files(source_path):
     return list(dict.fromkeys(agent_files))
 
 
+def discover_from_catalog(source_path, catalog):
+    """Catalog-backed equivalent of the filesystem walk in discover_agent_files."""
+    flat, nested = [], []
+    catalog.sync([source_path])
+    for agent_file in catalog.paths(source_path):
+        rel = agent_file.relative_to(source_path)
+        if agent_file.name in ["README.md", "TODO.md"] or rel.parts[0].startswith("."):
+            continue
+        if len(rel.parts) == 1:
+            flat.append(agent_file)
+        elif len(rel.parts) == 2:
+            nested.append(agent_file)
+    return flat + nested
+
+
 def convert_agent(source_file, target_root):
     """Convert a single agent file from Claude Code to OpenCode SKILL format."""
     frontmatter, body = parse_agent_file(source_file)
@@ -101,7 +121,7 @@ def convert_agent(source_file, target_root):
     output_file = output_dir / "SKILL.md"
 
     # Create new content
-    frontmatter_yaml = yaml.safe_dump(opencode_frontmatter, sort_keys=False).strip()
+    frontmatter_yaml = dump_yaml(opencode_frontmatter, sort_keys=False).strip()
     normalized_body = normalize_body(body)
     new_content = f"---\n{frontmatter_yaml}\n---\n{normalized_body}"
 
@@ -129,7 +149,12 @@ def convert_agent(source_file, target_root):
     is_flag=True,
     help="Show what would be done without actually converting",
 )
-def main(source_dir, target_dir, dry_run):
+@click.option(
+    "--catalog",
+    default=None,
+    help="List agents from a catalog built by scripts/agent_catalog.py",
+)
+def main(source_dir, target_dir, dry_run, catalog):
     """Convert Claude Code agents to OpenCode format."""
     source_path = Path(source_dir)
     target_path = Path(target_dir)
@@ -141,7 +166,13 @@ def main(source_dir, target_dir, dry_run):
         return
 
     # Find all agent files
-    agent_files = discover_agent_files(source_path)
+    if catalog:
+        from agent_catalog import AgentCatalog
+
+        with AgentCatalog(catalog) as agent_catalog:
+            agent_files = discover_agent_files(source_path, agent_catalog)
+    else:
+        agent_files = discover_agent_files(source_path)
 
     console.print(f"\n[bold]Found {len(agent_files)} agents to convert[/bold]\n")
 
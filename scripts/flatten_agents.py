@@ -38,20 +38,32 @@ import os
 import shutil
 import sys
 from pathlib import Path
-from typing import Iterator, Optional, Tuple
+from typing import Any, Iterator, Optional, Tuple
 
 # ---------------------------
 # Discovery & Selection
 # ---------------------------
 
-def find_agents(source_root: Path) -> Iterator[Tuple[str, Path]]:
+def find_agents(source_root: Path, catalog: Any = None) -> Iterator[Tuple[str, Path]]:
     """Yield (category, file_path) for agent markdown files under opencode/.
 
     Skips hidden directories and sentinel names (README.md, TODO.md).
+    With a catalog (scripts/agent_catalog.py), lists indexed files instead of walking.
     """
     skip_names = {"readme.md", "todo.md"}
     if not source_root.exists():  # Nothing to do if source missing
         return
+    if catalog is not None:
+        catalog.sync([source_root])
+        # Catalog paths are already sorted by relative path (category, then file)
+        for md_file in catalog.paths(source_root):
+            rel = md_file.relative_to(source_root)
+            if len(rel.parts) != 2 or rel.parts[0].startswith('.'):
+                continue
+            if md_file.name.lower() in skip_names:
+                continue
+            yield rel.parts[0], md_file
+        return
     # Iterate categories deterministically for reproducibility
     for category_dir in sorted(source_root.iterdir()):
         if not category_dir.is_dir() or category_dir.name.startswith('.'):
@@ -235,6 +247,11 @@ def parse_args(argv: list[str]) -> argparse.Namespace:
         action="store_true",
         help="Verify existing symlinks in destination then exit.",
     )
+    parser.add_argument(
+        "--catalog",
+        metavar="PATH",
+        help="List agents from a catalog built by scripts/agent_catalog.py instead of walking opencode/.",
+    )
     parser.add_argument(
         "--rebuild",
         action="store_true",
@@ -275,8 +292,15 @@ def main(argv: Optional[list[str]] = None) -> None:
     total = 0
     acted = 0
 
+    if args.catalog:
+        from agent_catalog import AgentCatalog  # Lazy: pulls in PyYAML
+        with AgentCatalog(args.catalog) as catalog:
+            agents = list(find_agents(source_root, catalog))
+    else:
+        agents = find_agents(source_root)
+
     # Iterate all discovered agents
-    for category, src_path in find_agents(source_root):
+    for category, src_path in agents:
         total += 1
         target_path = resolve_target(dest_root, src_path.name, category, args.strategy)
         if target_path is None:  # Collision & skip strategy
@@ -12,6 +12,44 @@ OpenCode schema (current):
 - Required frontmatter keys: name, description, license, compatibility, metadata
 - Model/mode/temperature/tools are not part of the current skill frontmatter.
 
+Parallel mode:
+- --jobs N fans lint_file out over a process pool (0 = one worker per CPU).
+  Work is distributed in chunks and results are collected in scan order, so the
+  reported violations and summary are identical to the serial run.
+
+Auto-fix writes:
+- --check-order / --fix-missing-model rewrites go through
+  scripts/tools/atomic_write.py: staged in a temp file beside the target
+  (also from --jobs workers), committed with an atomic rename, and each
+  touched directory is fsynced once at the end of the run.
+- --transaction applies the fixes all-or-nothing: they are committed only
+  after every file was linted without an internal error.
+
+Incremental cache:
+- Results are cached on disk (default .cache/agent-lint.json) keyed by file content
+  hash, schema name and the active option set. Unchanged files replay their cached
+  violations instead of being re-validated. The cache is discarded automatically
+  whenever the linter source changes (fingerprinted when the linter is loaded,
+  so a long-lived tool_server keeps tagging results with the rules it runs).
+  Entries for files that no longer exist are dropped on save. Use --no-cache
+  to bypass it.
+
+Git-aware mode:
+- --staged lints only markdown files added/modified in the git index; --since REV
+  lints files added/modified between REV and the working tree. Both are limited
+  to the given --roots and still classify each path with classify_schema.
+
+Catalog mode:
+- --catalog PATH lists files from the SQLite catalog maintained by
+  scripts/agent_catalog.py instead of walking each root; each root is
+  synced first (one stat per directory, rescanning only directories whose
+  mtime changed), so newly added agents are linted too.
+
+Watched mode:
+- Hosted by scripts/tools/tool_server.py (``tool_client.py lint ...``), roots
+  inside the daemon's watched trees are listed from its live in-memory
+  snapshot (scripts/tools/fs_watch.py) instead of being rescanned.
+
 Exit codes:
   0 = clean
   1 = violations (unless --warn-only)
@@ -21,12 +59,22 @@ Exit codes:
 from __future__ import annotations
 
 import argparse
+import hashlib
+import json
+import os
+import subprocess
 import sys
-from dataclasses import dataclass
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 
-import yaml
+try:
+    from . import agent_frontmatter
+    from .tools.atomic_write import WriteBatch, replace_text, stage_text
+except ImportError:  # executed as a script: scripts/ is on sys.path
+    import agent_frontmatter
+    from tools.atomic_write import WriteBatch, replace_text, stage_text
 
 ALLOWED_MODES = {"primary", "subagent", "all"}
 OPENCODE_CANONICAL_ORDER = [
@@ -50,6 +98,10 @@ ALLOWED_TOOLS = {
     "webfetch",
 }
 DEPRECATED_KEYS = {"tags"}
+# Chunks handed to each worker per pass; a few per worker keeps the pool balanced
+# without paying pickling overhead per file.
+CHUNKS_PER_WORKER = 4
+DEFAULT_CACHE_FILE = Path(".cache") / "agent-lint.json"
 
 
 @dataclass
@@ -94,21 +146,24 @@ CLAUDE_SCHEMA = AgentSchema(
 )
 
 
-def parse_frontmatter(text: str) -> Tuple[Optional[Dict[str, Any]], str]:
-    if not text.startswith("---"):
-        return None, text
-    parts = text.split("---", 2)
-    if len(parts) < 3:
-        return None, text
-    raw = parts[1]
-    body = parts[2]
+def parse_frontmatter(
+    path: Path,
+) -> Tuple[Optional[Dict[str, Any]], agent_frontmatter.FrontmatterDocument]:
+    """Parse the YAML header of ``path`` without reading the prompt body.
+
+    Returns (data, document); data is None when the header is missing or
+    invalid. ``document.body`` loads the body lazily for rewrites.
+    """
+    doc = agent_frontmatter.read_frontmatter(path)
+    if not doc.has_frontmatter:
+        return None, doc
     try:
-        data = yaml.safe_load(raw) or {}
+        data = agent_frontmatter.load_yaml(doc.header) or {}
         if not isinstance(data, dict):
-            return None, text
-        return data, body
+            return None, doc
+        return data, doc
     except Exception:
-        return None, text
+        return None, doc
 
 
 def check_order(data: Dict[str, Any], canonical_order: List[str]) -> bool:
@@ -149,9 +204,14 @@ def lint_file(
     fix_model: Optional[str],
     fix_order: bool,
     allow_deprecated_claude: bool,
+    stage_token: Optional[str] = None,
 ) -> Tuple[List[Violation], bool]:
-    text = path.read_text(encoding="utf-8")
-    fm, body = parse_frontmatter(text)
+    """Lint one file, rewriting it atomically when a fix applies.
+
+    With ``stage_token`` the rewrite is only staged, for the WriteBatch with
+    that token to commit.
+    """
+    fm, doc = parse_frontmatter(path)
     violations: List[Violation] = []
     changed = False
 
@@ -287,21 +347,252 @@ def lint_file(
             out_dict = rebuild_order(fm, schema.canonical_order)
         else:
             out_dict = fm
-        dumped = yaml.safe_dump(out_dict, sort_keys=False).strip() + "\n"
-        # Preserve body after frontmatter delimiter
-        body_str = (
-            body if body.startswith("\n") else body
-        )  # body already includes leading newline from split
-        path.write_text(f"---\n{dumped}---{body_str}", encoding="utf-8")
+        dumped = (
+            agent_frontmatter.dump_yaml(out_dict, sort_keys=False).strip() + "\n"
+        )
+        # Body is only read now that a rewrite is needed
+        content = f"---\n{dumped}---\n{doc.body}"
+        if stage_token is not None:
+            stage_text(path, content, stage_token)
+        else:
+            replace_text(path, content)
 
     return violations, changed
 
 
-def scan(root: Path) -> List[Path]:
+def scan(root: Path, snapshot: Any = None) -> List[Path]:
+    """Markdown files under ``root``.
+
+    With a live snapshot (scripts/tools/fs_watch.TreeSnapshot) covering
+    ``root``, files are listed from memory, sorted, after applying pending
+    changes.
+    """
+    if snapshot is not None and snapshot.covers(root):
+        return [root / rel for rel in snapshot.paths(root) if rel.endswith(".md")]
     return [p for p in root.rglob("*.md") if p.is_file()]
 
 
-def main(argv: List[str]) -> int:
+def open_catalog(db_path: str) -> Any:
+    # Imported lazily: agent_catalog itself imports this module.
+    try:
+        from .agent_catalog import AgentCatalog
+    except ImportError:  # executed as a script: scripts/ is on sys.path
+        from agent_catalog import AgentCatalog
+    return AgentCatalog(db_path)
+
+
+def git_changed_files(since: Optional[str]) -> List[Path]:
+    """Paths (relative to cwd) git reports as added/modified/renamed.
+
+    since=None compares the index to HEAD (staged changes); otherwise compares
+    the given revision to the working tree.
+    """
+    def git(*args: str) -> str:
+        return subprocess.run(
+            ["git", *args], check=True, capture_output=True, text=True
+        ).stdout
+
+    top = Path(git("rev-parse", "--show-toplevel").strip())
+    out = git(
+        "diff", "--name-only", "--diff-filter=AMR", "-z", since or "--cached"
+    )
+    # git reports toplevel-relative paths; present them relative to cwd like scan()
+    return [Path(os.path.relpath(top / p)) for p in out.split("\0") if p]
+
+
+def scan_changed(root: Path, changed: List[Path]) -> List[Path]:
+    root_abs = root.resolve()
+    return [
+        p
+        for p in changed
+        if p.suffix == ".md" and p.is_file() and root_abs in p.resolve().parents
+    ]
+
+
+@dataclass(frozen=True)
+class LintOptions:
+    require_model: bool
+    fix_model: Optional[str]
+    fix_order: bool
+    allow_deprecated_claude: bool
+
+
+def _lint_task(
+    task: Tuple[Path, AgentSchema, LintOptions, Optional[str]]
+) -> Tuple[List[Violation], bool]:
+    """Process-pool entry point; must stay module-level to be picklable."""
+    path, schema, options, stage_token = task
+    return lint_file(
+        path,
+        schema,
+        options.require_model,
+        options.fix_model,
+        options.fix_order,
+        options.allow_deprecated_claude,
+        stage_token,
+    )
+
+
+def resolve_jobs(jobs: int) -> int:
+    if jobs <= 0:
+        return os.cpu_count() or 1
+    return jobs
+
+
+def file_digest(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def rules_fingerprint() -> str:
+    """Hash of the linter sources; any rule change invalidates cached results."""
+    digest = hashlib.sha256()
+    for source in (__file__, agent_frontmatter.__file__):
+        digest.update(Path(source).read_bytes())
+    return digest.hexdigest()
+
+
+# Taken at import: the sources on disk may change while this process (e.g. the
+# tool_server daemon) still runs the rules it loaded.
+RULES_FINGERPRINT = rules_fingerprint()
+
+
+class LintCache:
+    """Persistent lint results keyed by content hash, schema and option set."""
+
+    def __init__(self, path: Path, options: LintOptions) -> None:
+        self.path = path
+        self.fingerprint = RULES_FINGERPRINT
+        self.options_key = json.dumps(asdict(options), sort_keys=True)
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.hits = 0
+        self.dirty = False
+        self.seen: set[str] = set()
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        if isinstance(data, dict) and data.get("fingerprint") == self.fingerprint:
+            entries = data.get("entries", {})
+            # Keys are absolute, so any cwd (e.g. tool_server's) reads them alike
+            self.entries = {k: v for k, v in entries.items() if os.path.isabs(k)}
+
+    @staticmethod
+    def _path_key(path: Path) -> str:
+        return os.path.abspath(path)
+
+    def _key(self, digest: str, schema: AgentSchema) -> str:
+        raw = f"{digest}:{schema.name}:{self.options_key}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(
+        self, path: Path, digest: str, schema: AgentSchema
+    ) -> Optional[List[Violation]]:
+        key = self._path_key(path)
+        self.seen.add(key)
+        entry = self.entries.get(key)
+        if not entry or entry.get("key") != self._key(digest, schema):
+            return None
+        self.hits += 1
+        return [Violation(path, msg, fixable) for msg, fixable in entry["violations"]]
+
+    def put(
+        self,
+        path: Path,
+        digest: str,
+        schema: AgentSchema,
+        violations: List[Violation],
+    ) -> None:
+        key = self._path_key(path)
+        self.seen.add(key)
+        self.entries[key] = {
+            "key": self._key(digest, schema),
+            "violations": [[v.message, v.fixable] for v in violations],
+        }
+        self.dirty = True
+
+    def prune(self) -> None:
+        """Drop entries not seen in this run whose file has been deleted."""
+        gone = [key for key in self.entries if key not in self.seen and not os.path.exists(key)]
+        for key in gone:
+            del self.entries[key]
+        self.dirty = self.dirty or bool(gone)
+
+    def save(self) -> None:
+        self.prune()
+        if not self.dirty:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        payload = {"fingerprint": self.fingerprint, "entries": self.entries}
+        tmp.write_text(json.dumps(payload), encoding="utf-8")
+        os.replace(tmp, self.path)
+        self.dirty = False
+
+
+def lint_many(
+    targets: List[Tuple[Path, AgentSchema]],
+    options: LintOptions,
+    jobs: int = 1,
+    cache: Optional[LintCache] = None,
+    batch: Optional[WriteBatch] = None,
+) -> List[Tuple[List[Violation], bool]]:
+    """Return lint_file results for each (path, schema) target, in input order.
+
+    With a cache, unchanged files replay their stored violations and only the
+    misses are linted (serially or on the process pool). With a batch, fixes
+    are staged by the workers and handed to the batch to commit.
+    """
+    results: List[Optional[Tuple[List[Violation], bool]]] = [None] * len(targets)
+    digests: Dict[int, str] = {}
+    pending: List[int] = []
+    for idx, (path, schema) in enumerate(targets):
+        if cache is not None:
+            digest = file_digest(path)
+            cached = cache.get(path, digest, schema)
+            if cached is not None:
+                results[idx] = (cached, False)
+                continue
+            digests[idx] = digest
+        pending.append(idx)
+
+    stage_token = batch.share(targets[i][0] for i in pending) if batch is not None else None
+    tasks = [(targets[i][0], targets[i][1], options, stage_token) for i in pending]
+    workers = min(resolve_jobs(jobs), len(tasks))
+    if workers <= 1:
+        outputs: Iterator[Tuple[List[Violation], bool]] = map(_lint_task, tasks)
+        for idx, output in zip(pending, outputs):
+            results[idx] = output
+            if batch is not None and output[1]:
+                batch.add(targets[idx][0])
+    else:
+        chunksize = max(1, -(-len(tasks) // (workers * CHUNKS_PER_WORKER)))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            try:
+                # Executor.map preserves input order, keeping output deterministic.
+                for idx, output in zip(
+                    pending, pool.map(_lint_task, tasks, chunksize=chunksize)
+                ):
+                    results[idx] = output
+                    if batch is not None and output[1]:
+                        batch.add(targets[idx][0])
+            except BaseException:
+                # Let running workers finish staging before the batch aborts
+                pool.shutdown(wait=True, cancel_futures=True)
+                raise
+
+    if cache is not None:
+        for idx in pending:
+            file_violations, changed = results[idx]  # type: ignore[misc]
+            # Rewritten files hash differently now; they are re-linted next run.
+            if not changed:
+                path, schema = targets[idx]
+                cache.put(path, digests[idx], schema, file_violations)
+        cache.save()
+
+    return results  # type: ignore[return-value]
+
+
+def main(argv: List[str], snapshot: Any = None) -> int:
     parser = argparse.ArgumentParser(description="Lint agent markdown files.")
     parser.add_argument(
         "--roots", nargs="+", default=["opencode"], help="Root directories to scan"
@@ -336,6 +627,46 @@ def main(argv: List[str]) -> int:
         action="store_true",
         help="Allow name/tags in Claude schema without warning",
     )
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=1,
+        metavar="N",
+        help="Lint with N worker processes (0 = CPU count, default 1 = serial)",
+    )
+    parser.add_argument(
+        "--transaction",
+        action="store_true",
+        help="Commit auto-fixes only if every file is linted without error (all-or-nothing)",
+    )
+    parser.add_argument(
+        "--cache-file",
+        default=str(DEFAULT_CACHE_FILE),
+        metavar="PATH",
+        help=f"Incremental lint cache location (default {DEFAULT_CACHE_FILE})",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Ignore and do not update the incremental lint cache",
+    )
+    parser.add_argument(
+        "--catalog",
+        metavar="PATH",
+        help="List files from an agent catalog (scripts/agent_catalog.py) instead of walking roots",
+    )
+    changed_group = parser.add_mutually_exclusive_group()
+    changed_group.add_argument(
+        "--staged",
+        action="store_true",
+        help="Lint only files added/modified in the git index (pre-commit mode)",
+    )
+    changed_group.add_argument(
+        "--since",
+        metavar="REV",
+        help="Lint only files added/modified since git revision REV",
+    )
     args = parser.parse_args(argv)
 
     if args.list_tools:
@@ -346,37 +677,66 @@ def main(argv: List[str]) -> int:
 
     violations: List[Violation] = []
     changed_files = 0
-    scanned_files = 0
     schema_counts = {"opencode": 0, "claude": 0}
+    targets: List[Tuple[Path, AgentSchema]] = []
 
-    classified_any = False
+    git_mode = args.staged or args.since is not None
+    changed_paths: List[Path] = []
+    if git_mode:
+        try:
+            changed_paths = git_changed_files(args.since)
+        except (OSError, subprocess.CalledProcessError) as e:
+            detail = getattr(e, "stderr", "") or str(e)
+            print(f"git diff failed: {detail.strip()}", file=sys.stderr)
+            return 2
+
+    catalog = open_catalog(args.catalog) if args.catalog and not git_mode else None
 
     for root in args.roots:
         root_path = Path(root)
         if not root_path.exists():
             print(f"WARN: Root not found: {root}")
             continue
-        for path in scan(root_path):
+        if git_mode:
+            paths = scan_changed(root_path, changed_paths)
+        elif catalog is not None:
+            catalog.sync([root_path])
+            paths = catalog.paths(root_path)
+        else:
+            paths = scan(root_path, snapshot)
+        for path in paths:
             schema = classify_schema(path, args.schema)
             if schema is None:
                 # Skip unclassified in auto; if explicit schema set we still skip because unmatched
                 continue
-            classified_any = True
-            scanned_files += 1
+            targets.append((path, schema))
             schema_counts[schema.name] += 1
-            file_violations, changed = lint_file(
-                path,
-                schema,
-                args.require_model or bool(args.fix_missing_model),
-                args.fix_missing_model,
-                args.check_order,
-                args.allow_deprecated_claude,
-            )
-            violations.extend(file_violations)
-            if changed:
-                changed_files += 1
+
+    if catalog is not None:
+        catalog.close()
+
+    scanned_files = len(targets)
+    classified_any = bool(targets)
+    options = LintOptions(
+        require_model=args.require_model or bool(args.fix_missing_model),
+        fix_model=args.fix_missing_model,
+        fix_order=args.check_order,
+        allow_deprecated_claude=args.allow_deprecated_claude,
+    )
+
+    cache = None if args.no_cache else LintCache(Path(args.cache_file), options)
+
+    with WriteBatch(transaction=args.transaction) as batch:
+        results = lint_many(targets, options, args.jobs, cache, batch)
+    for file_violations, changed in results:
+        violations.extend(file_violations)
+        if changed:
+            changed_files += 1
 
     if not classified_any:
+        if git_mode:
+            print("No changed agent files to lint.")
+            return 0
         if args.schema == "auto":
             print(
                 "No agent files classified under auto schema detection. Provide --schema opencode or --schema claude explicitly.",
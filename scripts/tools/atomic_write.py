@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""atomic_write: Crash-safe file rewrites shared by format_tool and lint_agents.
+
+Every rewrite is staged in a hidden temp file next to its target
+(``.<name>.<token>.tmp``: same directory, so same filesystem), written,
+fsynced and given the target's permission bits, then committed with
+``os.replace``. Readers see either the old or the new file, never a
+partial one, even if the process is interrupted mid-write.
+
+Batches:
+- ``WriteBatch`` commits staged files and fsyncs each touched directory once
+  when the batch ends instead of once per file
+- ``WriteBatch(transaction=True)`` holds every staged file until the batch
+  ends and commits them only if no error occurred; otherwise all staged
+  files are removed and no target is touched (all-or-nothing). While
+  committing, each target's old version is kept as a hard-linked backup
+  (``.<name>.<token>.bak``) until the batch finishes, so if a replace fails
+  partway, the targets already replaced are restored. Only a crash during
+  the commit itself can leave the batch partly applied
+- The staging name is derived from the batch token, so worker processes can
+  stage with ``stage_text(path, content, batch.share(paths))`` and the
+  parent commits with ``batch.add(path)``; on abort, every staging file of
+  the batch in the shared paths' directories is removed, including those
+  the parent was never told about
+
+Usage:
+    from scripts.tools.atomic_write import WriteBatch, replace_text
+    replace_text(path, new_text)  # one file
+    with WriteBatch(transaction=True) as batch:
+        for path, text in rewrites:
+            batch.write_text(path, text)
+"""
+from __future__ import annotations
+
+import os
+import shutil
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Set, TextIO, Tuple
+
+
+def new_token() -> str:
+    return f'{os.getpid()}.{os.urandom(4).hex()}'
+
+
+def staging_path(path: Path, token: str) -> Path:
+    return path.with_name(f'.{path.name}.{token}.tmp')
+
+
+def backup_path(path: Path, token: str) -> Path:
+    return path.with_name(f'.{path.name}.{token}.bak')
+
+
+def fsync_dirs(dirs: Iterable[Path]) -> None:
+    """fsync each directory once so committed renames are durable."""
+    for directory in dirs:
+        try:
+            fd = os.open(directory, os.O_RDONLY)
+        except OSError:
+            continue
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass  # Some filesystems refuse directory fsync; the rename still happened
+        finally:
+            os.close(fd)
+
+
+@contextmanager
+def staged_writer(path: Path, token: str, fsync: bool = True) -> Iterator[TextIO]:
+    """Open the staging file of ``path`` for UTF-8 text; removed if the block fails."""
+    tmp = staging_path(path, token)
+    fh = tmp.open('w', encoding='utf-8', newline='')
+    try:
+        yield fh
+        fh.flush()
+        if fsync:
+            os.fsync(fh.fileno())
+        fh.close()
+        try:
+            shutil.copymode(path, tmp)
+        except FileNotFoundError:
+            pass  # New file: keep the default mode
+    except BaseException:
+        fh.close()
+        tmp.unlink(missing_ok=True)
+        raise
+
+
+def stage_text(path: Path, content: str, token: str, fsync: bool = True) -> Path:
+    """Write ``content`` to the staging file of ``path``; return the staging path."""
+    with staged_writer(path, token, fsync) as fh:
+        fh.write(content)
+    return staging_path(path, token)
+
+
+def commit_staged(path: Path, token: str) -> None:
+    os.replace(staging_path(path, token), path)
+
+
+def replace_text(path: Path, content: str, fsync: bool = True) -> None:
+    """Atomically replace ``path`` with ``content`` (directory not fsynced)."""
+    token = new_token()
+    stage_text(path, content, token, fsync)
+    commit_staged(path, token)
+
+
+class WriteBatch:
+    """Atomic rewrites with one directory fsync per directory per batch.
+
+    Use as a context manager: on normal exit the batch commits, on an
+    exception it aborts (in transaction mode nothing has been replaced yet).
+    """
+
+    def __init__(self, transaction: bool = False, fsync: bool = True):
+        self.transaction = transaction
+        self.fsync = fsync
+        self.token = new_token()
+        self.pending: List[Path] = []
+        self.dirs: Set[Path] = set()
+        self.shared_dirs: Set[Path] = set()
+        self.committed = 0
+
+    def share(self, paths: Iterable[Path]) -> str:
+        """Token for workers that may stage any of ``paths``; abort() sweeps their directories."""
+        self.shared_dirs.update(path.parent for path in paths)
+        return self.token
+
+    def write_text(self, path: Path, content: str) -> None:
+        stage_text(path, content, self.token, self.fsync)
+        self.add(path)
+
+    def add(self, path: Path) -> None:
+        """Take over ``path``'s staging file (written with this batch's token)."""
+        if self.transaction:
+            self.pending.append(path)
+            return
+        commit_staged(path, self.token)
+        self.committed += 1
+        self.dirs.add(path.parent)
+
+    def commit(self) -> None:
+        """Replace every pending target; on failure restore those already replaced."""
+        pending, self.pending = self.pending, []
+        replaced: List[Tuple[Path, Optional[Path]]] = []
+        try:
+            for path in pending:
+                replaced.append((path, self._backup(path)))
+                commit_staged(path, self.token)
+                self.dirs.add(path.parent)
+        except OSError:
+            self._rollback(replaced)
+            self._discard(pending)
+            raise
+        else:
+            self.committed += len(replaced)
+            for _, backup in replaced:
+                if backup is not None:
+                    backup.unlink(missing_ok=True)
+        finally:
+            if self.fsync:
+                fsync_dirs(sorted(self.dirs))
+            self.dirs.clear()
+
+    def _backup(self, path: Path) -> Optional[Path]:
+        """Keep ``path``'s current version beside it; None if it does not exist."""
+        backup = backup_path(path, self.token)
+        try:
+            os.link(path, backup)
+        except FileNotFoundError:
+            return None
+        except OSError:  # No hard links on this filesystem
+            shutil.copy2(path, backup)
+        return backup
+
+    def _rollback(self, replaced: List[Tuple[Path, Optional[Path]]]) -> None:
+        for path, backup in reversed(replaced):
+            try:
+                if backup is None:
+                    path.unlink(missing_ok=True)
+                else:
+                    os.replace(backup, path)
+                    # rename() is a no-op when both are links to one file
+                    backup.unlink(missing_ok=True)
+            except OSError:
+                pass  # Best effort: keep restoring the others
+
+    def abort(self) -> None:
+        """Remove every staging file of this batch; call once no worker is still staging."""
+        pending, self.pending = self.pending, []
+        self._discard(pending)
+        for directory in sorted(self.shared_dirs):
+            for tmp in directory.glob(staging_path(Path('*'), self.token).name):
+                tmp.unlink(missing_ok=True)
+        self.shared_dirs.clear()
+        if self.fsync:
+            fsync_dirs(sorted(self.dirs))
+        self.dirs.clear()
+
+    def _discard(self, paths: Iterable[Path]) -> None:
+        for path in paths:
+            staging_path(path, self.token).unlink(missing_ok=True)
+
+    def __enter__(self) -> 'WriteBatch':
+        return self
+
+    def __exit__(self, exc_type: Optional[type], exc: Optional[BaseException], tb: object) -> None:
+        if exc_type is None:
+            self.commit()
+        else:
+            self.abort()
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""diff_engine: Lazy line diff with unified output for diff_tool.
+
+Algorithm:
+- Lines are interned to integers, so every comparison is an int compare
+- Common prefix/suffix of each region is matched first
+- Histogram heuristic (as in git/jgit): the remaining region is split at the
+  common line that is rarest on the left (at most MAX_CHAIN occurrences),
+  extended to the longest run around it, and both sides are recursed into
+- Regions with no such anchor fall back to Myers' O(ND) search, capped at
+  MAX_MYERS_D edits; beyond that the region is reported as replaced
+Unlike difflib.SequenceMatcher this stays near-linear on large files full of
+similar lines (generated code, lock files, logs).
+
+Streaming: matching blocks are produced left to right from an explicit work
+stack, opcodes and hunks are derived from them incrementally, and
+``unified_diff`` yields one hunk at a time. A consumer that stops after N
+bytes (diff_tool --limit) never computes the rest of the file. This bounds
+work and output, not memory: both sides are held in full as line lists
+(and their interned ids) before the first hunk.
+
+Resuming: ``iter_hunks`` reports the (left, right) line where each hunk
+starts; passing that position back as ``start`` diffs only the remainder of
+both files, so a paginating caller never recomputes earlier hunks.
+
+Output format matches difflib.unified_diff (3 lines of context, same
+header and range syntax); the chosen alignment may differ where several
+minimal diffs exist.
+"""
+from __future__ import annotations
+
+from itertools import chain
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+# Anchor lines occurring more often than this on the left are not used
+MAX_CHAIN = 64
+# Edit distance beyond which the Myers fallback gives up (region = replace)
+MAX_MYERS_D = 1000
+DEFAULT_CONTEXT = 3
+
+Block = Tuple[int, int, int]  # (i, j, n): a[i:i+n] == b[j:j+n]
+Opcode = Tuple[str, int, int, int, int]
+
+
+def intern_lines(a: Sequence[str], b: Sequence[str]) -> Tuple[List[int], List[int]]:
+    table: Dict[str, int] = {}
+    a_ids = [table.setdefault(line, len(table)) for line in a]
+    b_ids = [table.setdefault(line, len(table)) for line in b]
+    return a_ids, b_ids
+
+
+def _best_anchor(a: Sequence[int], b: Sequence[int], alo: int, ahi: int, blo: int, bhi: int) -> Tuple[Optional[Block], bool]:
+    """Longest common run through the rarest shared line (histogram diff).
+
+    Returns (anchor, shared): anchor is None when every shared line is too
+    common; shared is False when the regions have no line in common at all.
+    """
+    occurrences: Dict[int, List[int]] = {}
+    for i in range(alo, ahi):
+        occurrences.setdefault(a[i], []).append(i)
+    best: Optional[Tuple[Tuple[int, int], Block]] = None
+    shared = False
+    j = blo
+    while j < bhi:
+        positions = occurrences.get(b[j])
+        if not positions or len(positions) > MAX_CHAIN:
+            shared = shared or bool(positions)
+            j += 1
+            continue
+        shared = True
+        next_j = j + 1
+        for i in positions:
+            i0, j0 = i, j
+            while i0 > alo and j0 > blo and a[i0 - 1] == b[j0 - 1]:
+                i0 -= 1
+                j0 -= 1
+            i1, j1 = i + 1, j + 1
+            while i1 < ahi and j1 < bhi and a[i1] == b[j1]:
+                i1 += 1
+                j1 += 1
+            rank = (len(positions), -(i1 - i0))
+            if best is None or rank < best[0]:
+                best = (rank, (i0, j0, i1 - i0))
+            next_j = max(next_j, j1)
+        j = next_j  # Lines inside the run just found cannot start a better one
+    return (best[1] if best is not None else None), shared
+
+
+def _myers(a: Sequence[int], b: Sequence[int], alo: int, ahi: int, blo: int, bhi: int) -> Optional[List[Block]]:
+    """Matching blocks of a shortest edit script, or None past MAX_MYERS_D."""
+    n, m = ahi - alo, bhi - blo
+    v: Dict[int, int] = {1: 0}
+    trace: List[Dict[int, int]] = []
+    for d in range(min(n + m, MAX_MYERS_D) + 1):
+        trace.append(dict(v))
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and v[k - 1] < v[k + 1]):
+                x = v[k + 1]
+            else:
+                x = v[k - 1] + 1
+            y = x - k
+            while x < n and y < m and a[alo + x] == b[blo + y]:
+                x += 1
+                y += 1
+            v[k] = x
+            if x >= n and y >= m:
+                return _myers_blocks(trace, d, k, n, alo, blo)
+    return None
+
+
+def _myers_blocks(trace: List[Dict[int, int]], d: int, k: int, x: int, alo: int, blo: int) -> List[Block]:
+    blocks: List[Block] = []
+    y = x - k
+    for depth in range(d, 0, -1):
+        v = trace[depth]
+        if k == -depth or (k != depth and v[k - 1] < v[k + 1]):
+            prev_k = k + 1
+        else:
+            prev_k = k - 1
+        prev_x = v[prev_k]
+        prev_y = prev_x - prev_k
+        # Snake from the end of the previous edit to (x, y)
+        start_x = prev_x if prev_k == k + 1 else prev_x + 1
+        if x > start_x:
+            blocks.append((alo + start_x, blo + start_x - k, x - start_x))
+        x, y, k = prev_x, prev_y, prev_k
+    if x > 0:
+        blocks.append((alo, blo, x))
+    blocks.reverse()
+    return blocks
+
+
+def matching_blocks(a: Sequence[int], b: Sequence[int]) -> Iterator[Block]:
+    """Yield matching blocks in increasing order, computing lazily."""
+    stack: List[Tuple[bool, int, int, int, int]] = [(False, 0, len(a), 0, len(b))]
+    while stack:
+        is_block, alo, ahi, blo, bhi = stack.pop()
+        if is_block:
+            yield alo, ahi, blo  # (i, j, n) packed into the first fields
+            continue
+        prefix = 0
+        while alo + prefix < ahi and blo + prefix < bhi and a[alo + prefix] == b[blo + prefix]:
+            prefix += 1
+        if prefix:
+            yield alo, blo, prefix
+            alo += prefix
+            blo += prefix
+        suffix = 0
+        while ahi - suffix > alo and bhi - suffix > blo and a[ahi - suffix - 1] == b[bhi - suffix - 1]:
+            suffix += 1
+        if suffix:
+            ahi -= suffix
+            bhi -= suffix
+            stack.append((True, ahi, bhi, suffix, 0))
+        if alo == ahi or blo == bhi:
+            continue
+        anchor, shared = _best_anchor(a, b, alo, ahi, blo, bhi)
+        if not shared:
+            continue
+        if anchor is not None:
+            i, j, n = anchor
+            stack.append((False, i + n, ahi, j + n, bhi))
+            stack.append((True, i, j, n, 0))
+            stack.append((False, alo, i, blo, j))
+            continue
+        for i, j, n in reversed(_myers(a, b, alo, ahi, blo, bhi) or []):
+            stack.append((True, i, j, n, 0))
+
+
+def _merged(blocks: Iterable[Block]) -> Iterator[Block]:
+    pending: Optional[Block] = None
+    for i, j, n in blocks:
+        if pending is not None and pending[0] + pending[2] == i and pending[1] + pending[2] == j:
+            pending = (pending[0], pending[1], pending[2] + n)
+            continue
+        if pending is not None:
+            yield pending
+        pending = (i, j, n)
+    if pending is not None:
+        yield pending
+
+
+def opcodes(a: Sequence[int], b: Sequence[int]) -> Iterator[Opcode]:
+    """difflib-style opcodes, streamed."""
+    i = j = 0
+    for ai, bj, n in chain(_merged(matching_blocks(a, b)), [(len(a), len(b), 0)]):
+        if i < ai and j < bj:
+            yield 'replace', i, ai, j, bj
+        elif i < ai:
+            yield 'delete', i, ai, j, bj
+        elif j < bj:
+            yield 'insert', i, ai, j, bj
+        if n:
+            yield 'equal', ai, ai + n, bj, bj + n
+        i, j = ai + n, bj + n
+
+
+def grouped_opcodes(codes: Iterable[Opcode], n: int = DEFAULT_CONTEXT) -> Iterator[List[Opcode]]:
+    """Streamed equivalent of SequenceMatcher.get_grouped_opcodes."""
+    it = iter(codes)
+    current = next(it, None)
+    if current is None:
+        return
+    if current[0] == 'equal':
+        tag, i1, i2, j1, j2 = current
+        current = tag, max(i1, i2 - n), i2, max(j1, j2 - n), j2
+    nn = n + n
+    group: List[Opcode] = []
+    while current is not None:
+        following = next(it, None)
+        tag, i1, i2, j1, j2 = current
+        if following is None and tag == 'equal':
+            i2, j2 = min(i2, i1 + n), min(j2, j1 + n)
+        if tag == 'equal' and i2 - i1 > nn:
+            group.append((tag, i1, min(i2, i1 + n), j1, min(j2, j1 + n)))
+            yield group
+            group = []
+            i1, j1 = max(i1, i2 - n), max(j1, j2 - n)
+        group.append((tag, i1, i2, j1, j2))
+        current = following
+    if group and not (len(group) == 1 and group[0][0] == 'equal'):
+        yield group
+
+
+def _format_range(start: int, stop: int) -> str:
+    beginning = start + 1
+    length = stop - start
+    if length == 1:
+        return f'{beginning}'
+    if not length:
+        beginning -= 1
+    return f'{beginning},{length}'
+
+
+def iter_hunks(a: Sequence[str], b: Sequence[str], n: int = DEFAULT_CONTEXT, start: Tuple[int, int] = (0, 0)) -> Iterator[Tuple[int, int, str]]:
+    """Yield ``(left_line, right_line, text)`` per hunk, lines 0-based.
+
+    With ``start``, only ``a[start[0]:]`` and ``b[start[1]:]`` are compared;
+    hunk ranges still refer to the whole files.
+    """
+    a_off, b_off = start
+    a, b = a[a_off:], b[b_off:]
+    a_ids, b_ids = intern_lines(a, b)
+    for group in grouped_opcodes(opcodes(a_ids, b_ids), n):
+        first, last = group[0], group[-1]
+        parts = [f'@@ -{_format_range(first[1] + a_off, last[2] + a_off)} +{_format_range(first[3] + b_off, last[4] + b_off)} @@\n']
+        for tag, i1, i2, j1, j2 in group:
+            if tag == 'equal':
+                parts.extend(' ' + line for line in a[i1:i2])
+                continue
+            if tag in ('replace', 'delete'):
+                parts.extend('-' + line for line in a[i1:i2])
+            if tag in ('replace', 'insert'):
+                parts.extend('+' + line for line in b[j1:j2])
+        yield first[1] + a_off, first[3] + b_off, ''.join(parts)
+
+
+def unified_diff(a: Sequence[str], b: Sequence[str], fromfile: str, tofile: str, n: int = DEFAULT_CONTEXT) -> Iterator[str]:
+    """Yield the header, then one string per hunk (difflib.unified_diff text)."""
+    started = False
+    for _, _, text in iter_hunks(a, b, n):
+        if not started:
+            started = True
+            yield f'--- {fromfile}\n+++ {tofile}\n'
+        yield text
@@ -4,47 +4,307 @@
 Supports:
 - File vs file
 - Directory vs directory (recursive, matching relative paths)
-- Limiting max diff size
+- Limiting max diff size: hunks are generated lazily (diff_engine.py) and
+  generation stops as soon as the byte limit is reached. The limit bounds
+  the output only: each pair of files is read into memory whole
+- Directory walks (walker.py) skip .git, virtualenvs and paths excluded by
+  each side's .gitignore/.ignore files (--no-ignore-files to compare them)
+- Directory pre-pass: files present on both sides with equal size and
+  SHA-256 (hashed on a thread pool) are skipped; digests are cached per path
+  under (size, mtime) so an unchanged file is hashed once per process. Hunks
+  for the remaining files are generated in parallel and emitted in sorted
+  path order
+- Rename detection: a file only on the left and one only on the right are
+  paired as a rename when their SHA-256 match, or when a bottom-k MinHash
+  sketch over their lines estimates a Jaccard similarity of at least
+  RENAME_THRESHOLD; the pair is reported under the new path as
+  ``@@ RENAMED old -> new (similarity N%) @@`` plus the hunks between them
+  (--no-renames for plain NEW FILE / DELETED FILE entries)
+- Pagination: a response cut at the byte limit carries ``next_cursor``;
+  passing it back (--cursor) returns the next page, resuming at the same
+  file and hunk (the engine restarts from the hunk's line position, earlier
+  files and hunks are not diffed again). Size is accounted per hunk as it is
+  produced, each hunk encoded once
 
 Intended for review agents needing a safe textual diff.
 """
 from __future__ import annotations
 
 import argparse
-import difflib
+import base64
+import binascii
+import hashlib
+import heapq
 import json
+import os
 import sys
+from dataclasses import dataclass
+from itertools import chain
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import Iterable, Iterator, List, Dict, Any, Optional, Tuple
+
+try:
+    from .diff_engine import iter_hunks
+    from .walker import DEFAULT_WORKERS, ordered_map, walk_files
+except ImportError:  # executed as a script: scripts/tools/ is on sys.path
+    from diff_engine import iter_hunks
+    from walker import DEFAULT_WORKERS, ordered_map, walk_files
 
 MAX_DEFAULT_BYTES = 200_000
+HASH_BLOCK = 1 << 20
+# Rename detection: sketch size and minimum estimated line-set similarity
+SKETCH_SIZE = 128
+RENAME_THRESHOLD = 0.5
+# Line position of a file's ---/+++ header or marker chunk (before any hunk)
+HEADER = -1
+
+# (left line, right line, text) of a header or hunk, as produced
+Positioned = Tuple[int, int, str]
+
+
+@dataclass(frozen=True)
+class Chunk:
+    """A header or hunk with its UTF-8 size, so it is encoded only once."""
+    text: str
+    size: int
+    left: int
+    right: int
+    skip: int = 0  # Leading bytes already returned on an earlier page
 
 
 def read_text(path: Path) -> str:
     return path.read_text(encoding='utf-8', errors='replace')
 
 
-def collect_files(root: Path) -> List[Path]:
+def collect_files(root: Path, ignore_files: bool = True) -> List[Path]:
     if root.is_file():
         return [root]
-    files: List[Path] = []
-    for p in root.rglob('*'):
-        if p.is_file():
-            files.append(p)
-    return files
+    return [root / rel for rel in walk_files(root, ignore_files=ignore_files)]
+
+
+def dir_relative_map(root: Path, ignore_files: bool = True) -> Dict[str, Path]:
+    return {str(p.relative_to(root)): p for p in collect_files(root, ignore_files)}
+
 
+def iter_positioned(a_path: Path, b_path: Path, header: bool = True, start: Tuple[int, int] = (HEADER, HEADER)) -> Iterator[Positioned]:
+    """Yield the header (unless ``header`` is False), then each hunk with its start lines.
 
-def dir_relative_map(root: Path) -> Dict[str, Path]:
-    return {str(p.relative_to(root)): p for p in collect_files(root)}
+    A hunk ``start`` position resumes there: no header, no earlier hunks.
+    Both files are read whole; only hunk generation is lazy.
+    """
+    a_data = a_path.read_bytes()
+    b_data = b_path.read_bytes()
+    if a_data == b_data:
+        return
+    a_lines = a_data.decode('utf-8', errors='replace').splitlines(keepends=True)
+    b_lines = b_data.decode('utf-8', errors='replace').splitlines(keepends=True)
+    from_start = start[0] == HEADER
+    hunks = iter_hunks(a_lines, b_lines, start=(0, 0) if from_start else start)
+    first = next(hunks, None)
+    if first is None:
+        return
+    if header and from_start:
+        yield HEADER, HEADER, f'--- {a_path}\n+++ {b_path}\n'
+    yield first
+    yield from hunks
+
+
+def iter_diff(a_path: Path, b_path: Path, header: bool = True) -> Iterator[str]:
+    """Yield the unified diff header (unless ``header`` is False), then one chunk per hunk."""
+    for _, _, text in iter_positioned(a_path, b_path, header):
+        yield text
 
 
 def make_diff(a_path: Path, b_path: Path) -> List[str]:
-    a_lines = read_text(a_path).splitlines(keepends=True)
-    b_lines = read_text(b_path).splitlines(keepends=True)
-    return list(difflib.unified_diff(a_lines, b_lines, fromfile=str(a_path), tofile=str(b_path)))
+    return list(iter_diff(a_path, b_path))
+
+
+# path -> (size, mtime_ns, SHA-256); mtime only decides whether a cached
+# digest is still valid, never whether two files are equal
+_DIGESTS: Dict[str, Tuple[int, int, str]] = {}
+
+
+def file_digest(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open('rb') as fh:
+        for block in iter(lambda: fh.read(HASH_BLOCK), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def cached_digest(path: Path, stat: os.stat_result) -> str:
+    """SHA-256 of ``path``, reused while its size and mtime are unchanged."""
+    key = os.path.abspath(path)
+    entry = _DIGESTS.get(key)
+    if entry is not None and entry[:2] == (stat.st_size, stat.st_mtime_ns):
+        return entry[2]
+    value = file_digest(path)
+    _DIGESTS[key] = (stat.st_size, stat.st_mtime_ns, value)
+    return value
+
+
+def same_content(a_path: Path, b_path: Path) -> bool:
+    """Size first, then SHA-256 (pinned timestamps make mtime no proof of equality)."""
+    a_stat = os.stat(a_path)
+    b_stat = os.stat(b_path)
+    if a_stat.st_size != b_stat.st_size:
+        return False
+    return cached_digest(a_path, a_stat) == cached_digest(b_path, b_stat)
+
+
+def file_signature(path: Path) -> Tuple[str, frozenset[int]]:
+    """SHA-256 of the file and a bottom-k MinHash sketch of its distinct non-blank lines."""
+    data = path.read_bytes()
+    lines = {line.strip() for line in data.splitlines()}
+    lines.discard(b'')
+    # Not hash(): str/bytes hashing is salted per process, and pages of one
+    # diff (--cursor) must pair renames identically
+    hashes = {int.from_bytes(hashlib.blake2b(line, digest_size=8).digest(), 'big') for line in lines}
+    sketch = frozenset(heapq.nsmallest(SKETCH_SIZE, hashes))
+    return hashlib.sha256(data).hexdigest(), sketch
+
+
+def estimate_similarity(a: frozenset[int], b: frozenset[int]) -> float:
+    """Bottom-k estimate of the Jaccard similarity of two sketched line sets."""
+    union = heapq.nsmallest(SKETCH_SIZE, a | b)
+    if not union:
+        return 0.0
+    return sum(1 for value in union if value in a and value in b) / len(union)
+
+
+def detect_renames(deleted: Iterable[str], added: Iterable[str], left_map: Dict[str, Path], right_map: Dict[str, Path], workers: int = DEFAULT_WORKERS) -> Dict[str, Tuple[str, int]]:
+    """Pair deleted with added paths; returns ``{new: (old, similarity percent)}``.
+
+    Exact content matches are paired first, then the most similar remaining
+    pairs greedily. Candidates come from an inverted index over sketch
+    values, so unrelated files are never compared.
+    """
+    deleted = sorted(deleted)
+    added = sorted(added)
+    if not deleted or not added:
+        return {}
+    old_sigs = dict(zip(deleted, ordered_map(lambda key: file_signature(left_map[key]), deleted, workers)))
+    new_sigs = dict(zip(added, ordered_map(lambda key: file_signature(right_map[key]), added, workers)))
+
+    renames: Dict[str, Tuple[str, int]] = {}
+    by_digest: Dict[str, List[str]] = {}
+    for key in deleted:
+        by_digest.setdefault(old_sigs[key][0], []).append(key)
+    for key in added:
+        candidates = by_digest.get(new_sigs[key][0])
+        if candidates:
+            renames[key] = (candidates.pop(0), 100)
+    used = {old for old, _ in renames.values()}
+
+    index: Dict[int, List[str]] = {}
+    for key in deleted:
+        if key not in used:
+            for value in old_sigs[key][1]:
+                index.setdefault(value, []).append(key)
+    scored: List[Tuple[float, str, str]] = []
+    for key in added:
+        if key in renames:
+            continue
+        sketch = new_sigs[key][1]
+        for old in sorted({old for value in sketch for old in index.get(value, ())}):
+            score = estimate_similarity(old_sigs[old][1], sketch)
+            if score >= RENAME_THRESHOLD:
+                scored.append((-score, key, old))
+    for negative_score, key, old in sorted(scored):
+        if key not in renames and old not in used:
+            renames[key] = (old, min(99, int(-negative_score * 100)))
+            used.add(old)
+    return renames
 
 
-def diff(a: str, b: str, limit: int = MAX_DEFAULT_BYTES) -> Dict[str, Any]:
+def _tail_digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:16]
+
+
+def encode_cursor(state: Dict[str, Any]) -> str:
+    raw = json.dumps(state, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token: str) -> Dict[str, Any]:
+    """Parse a ``next_cursor`` token (ValueError if malformed)."""
+    try:
+        state = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+    except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise ValueError('Invalid cursor') from e
+    if not isinstance(state, dict) or not {'p', 'k', 'l', 'r', 's', 'h'} <= state.keys():
+        raise ValueError('Invalid cursor')
+    return state
+
+
+def pair_id(a_path: Path, b_path: Path) -> str:
+    return hashlib.sha256(f'{a_path}\0{b_path}'.encode('utf-8')).hexdigest()[:16]
+
+
+def sized_chunks(chunks: Iterable[Positioned], limit: int, resume: Optional[Dict[str, Any]] = None) -> List[Chunk]:
+    """Drain ``chunks`` until past ``limit`` bytes; more could never be emitted.
+
+    ``resume`` (a decoded cursor) drops the bytes of the first chunk that an
+    earlier page already returned, if that chunk regenerated identically.
+    """
+    taken: List[Chunk] = []
+    total = 0
+    for left, right, text in chunks:
+        skip = 0
+        if resume is not None and not taken and resume['s'] and (left, right) == (resume['l'], resume['r']):
+            rest = text.encode('utf-8')[resume['s']:]
+            if _tail_digest(rest) == resume['h']:
+                skip = resume['s']
+                text = rest.decode('utf-8', errors='ignore')
+        chunk = Chunk(text, len(text.encode('utf-8')), left, right, skip)
+        taken.append(chunk)
+        total += chunk.size
+        if total > limit:  # The page overflows here; later chunks cannot be shown
+            break
+    return taken
+
+
+class DiffOutput:
+    """Accumulates diff chunks up to ``limit`` UTF-8 bytes.
+
+    ``add`` returns False once the limit is hit (the chunk that crossed it is
+    kept partially) so callers stop producing; ``cursor`` then records where
+    the next page starts.
+    """
+
+    def __init__(self, limit: int, pair: str):
+        self.limit = limit
+        self.pair = pair
+        self.parts: List[str] = []
+        self.bytes = 0
+        self.truncated = False
+        self.cursor: Optional[str] = None
+
+    def add(self, key: str, chunk: Chunk) -> bool:
+        if self.bytes + chunk.size <= self.limit:
+            self.parts.append(chunk.text)
+            self.bytes += chunk.size
+            return True
+        self.truncated = True
+        data = chunk.text.encode('utf-8')
+        partial = data[:max(0, self.limit - self.bytes)].decode('utf-8', errors='ignore')
+        if not partial and not self.parts and self.limit > 0:
+            partial = chunk.text[0]  # A page must make progress even below one character
+        taken = len(partial.encode('utf-8'))
+        self.parts.append(partial)
+        self.bytes += taken
+        if self.limit > 0:
+            self.cursor = encode_cursor({
+                'p': self.pair, 'k': key, 'l': chunk.left, 'r': chunk.right,
+                's': chunk.skip + taken, 'h': _tail_digest(data[taken:]),
+            })
+        return False
+
+    def text(self) -> str:
+        return ''.join(self.parts)
+
+
+def diff(a: str, b: str, limit: int = MAX_DEFAULT_BYTES, ignore_files: bool = True, workers: int = DEFAULT_WORKERS, renames: bool = True, cursor: Optional[str] = None) -> Dict[str, Any]:
     a_path = Path(a).resolve()
     b_path = Path(b).resolve()
     if not a_path.exists():
@@ -52,45 +312,59 @@ def diff(a: str, b: str, limit: int = MAX_DEFAULT_BYTES) -> Dict[str, Any]:
     if not b_path.exists():
         return {"error": f"Right path not found: {b_path}"}
 
+    out = DiffOutput(limit, pair_id(a_path, b_path))
+    resume: Optional[Dict[str, Any]] = None
+    if cursor:
+        try:
+            resume = decode_cursor(cursor)
+        except ValueError as e:
+            return {"error": str(e)}
+        if resume['p'] != out.pair:
+            return {"error": "Cursor was issued for a different pair of paths"}
+
+    def start_of(key: str) -> Tuple[int, int]:
+        return (resume['l'], resume['r']) if resume is not None and resume['k'] == key else (HEADER, HEADER)
+
+    def resume_of(key: str) -> Optional[Dict[str, Any]]:
+        return resume if resume is not None and resume['k'] == key else None
+
     if a_path.is_file() and b_path.is_file():
-        diff_lines = make_diff(a_path, b_path)
-        text = ''.join(diff_lines)
-        truncated = False
-        if len(text.encode('utf-8')) > limit:
-            truncated = True
-            text = text.encode('utf-8')[:limit].decode('utf-8', errors='ignore')
-        return {"mode": "file", "bytes": len(text.encode('utf-8')), "truncated": truncated, "diff": text}
+        for chunk in sized_chunks(iter_positioned(a_path, b_path, start=start_of('')), limit, resume_of('')):
+            if not out.add('', chunk):
+                break
+        return {"mode": "file", "bytes": out.bytes, "truncated": out.truncated, "next_cursor": out.cursor, "diff": out.text()}
 
     # Directory diff
-    left_map = dir_relative_map(a_path)
-    right_map = dir_relative_map(b_path)
-    all_keys = sorted(set(left_map.keys()) | set(right_map.keys()))
-    collected: List[str] = []
-    truncated = False
-    current_bytes: int = 0
-    for key in all_keys:
-        if key not in left_map:
-            collected.append(f"--- (missing)\n+++ {right_map[key]}\n@@ NEW FILE {key} @@\n")
-            continue
-        if key not in right_map:
-            collected.append(f"--- {left_map[key]}\n+++ (missing)\n@@ DELETED FILE {key} @@\n")
-            continue
-        diff_lines = make_diff(left_map[key], right_map[key])
-        if diff_lines:
-            chunk = ''.join(diff_lines)
-            b = len(chunk.encode('utf-8'))
-            if current_bytes + b > limit:
-                truncated = True
-                remaining = limit - current_bytes
-                if remaining > 0:
-                    partial = chunk.encode('utf-8')[:remaining].decode('utf-8', errors='ignore')
-                    collected.append(partial)
-                break
-            collected.append(chunk)
-            current_bytes += b
+    left_map = dir_relative_map(a_path, ignore_files)
+    right_map = dir_relative_map(b_path, ignore_files)
+    first_key = resume['k'] if resume is not None else ''
+    common = sorted(key for key in left_map.keys() & right_map.keys() if key >= first_key)
+    identical = {key for key, same in zip(common, ordered_map(lambda key: same_content(left_map[key], right_map[key]), common, workers)) if same}
+    all_keys = sorted((left_map.keys() | right_map.keys()) - identical)
+    moved = detect_renames(left_map.keys() - right_map.keys(), right_map.keys() - left_map.keys(), left_map, right_map, workers) if renames else {}
+    sources = {old for old, _ in moved.values()}
+    all_keys = [key for key in all_keys if key not in sources and key >= first_key]
+
+    def file_chunks(key: str) -> List[Chunk]:
+        start = start_of(key)
+        if key in moved:
+            old, similarity = moved[key]
+            marker = f"--- {left_map[old]}\n+++ {right_map[key]}\n@@ RENAMED {old} -> {key} (similarity {similarity}%) @@\n"
+            head = [(HEADER, HEADER, marker)] if start[0] == HEADER else []
+            positioned: Iterable[Positioned] = chain(head, iter_positioned(left_map[old], right_map[key], header=False, start=start))
+        elif key not in left_map:
+            positioned = [(HEADER, HEADER, f"--- (missing)\n+++ {right_map[key]}\n@@ NEW FILE {key} @@\n")]
+        elif key not in right_map:
+            positioned = [(HEADER, HEADER, f"--- {left_map[key]}\n+++ (missing)\n@@ DELETED FILE {key} @@\n")]
+        else:
+            positioned = iter_positioned(left_map[key], right_map[key], start=start)
+        return sized_chunks(positioned, limit, resume_of(key))
+
+    for key, chunks in zip(all_keys, ordered_map(file_chunks, all_keys, workers)):
+        if not all(out.add(key, chunk) for chunk in chunks):
+            break
 
-    merged = ''.join(collected)
-    return {"mode": "directory", "bytes": len(merged.encode('utf-8')), "truncated": truncated, "diff": merged}
+    return {"mode": "directory", "bytes": out.bytes, "truncated": out.truncated, "next_cursor": out.cursor, "diff": out.text()}
 
 
 def main(argv: List[str]) -> int:
@@ -98,9 +372,13 @@ def main(argv: List[str]) -> int:
     parser.add_argument('left', help='Left path (file or directory)')
     parser.add_argument('right', help='Right path (file or directory)')
     parser.add_argument('--limit', type=int, default=MAX_DEFAULT_BYTES, help='Max diff bytes (default 200k)')
+    parser.add_argument('--no-ignore-files', dest='ignore_files', action='store_false', help='Do not honor .gitignore/.ignore files')
+    parser.add_argument('--no-renames', dest='renames', action='store_false', help='Report moved files as DELETED FILE + NEW FILE')
+    parser.add_argument('--cursor', help='Continue from the next_cursor of a previous (truncated) response')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help=f'Hashing/diffing threads for directory mode (default {DEFAULT_WORKERS})')
     args = parser.parse_args(argv)
 
-    result = diff(args.left, args.right, args.limit)
+    result = diff(args.left, args.right, args.limit, args.ignore_files, args.workers, args.renames, args.cursor)
     print(json.dumps(result, indent=2))
     return 0 if 'error' not in result else 1
 
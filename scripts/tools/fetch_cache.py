@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""fetch_cache: Shared on-disk response cache for webfetch_tool.
+
+Layout (default ``.cache/webfetch/``):
+- ``index.sqlite``: one row per requested URL with status, final URL,
+  content type, ETag, Last-Modified, validation time, server max-age, last
+  access and body digest
+- ``blobs/<aa>/<sha256>``: response bodies, content-addressed, so a body
+  served under several URLs is stored once; a blob whose digest no longer
+  matches is treated as missing
+
+Freshness and revalidation:
+- An entry is fresh for min(ttl, Cache-Control max-age) seconds after it
+  was last validated, ttl being the caller's; ``no-store`` responses are
+  never stored, ``no-cache`` ones are stored but always revalidated
+- A stale entry with an ETag or Last-Modified is revalidated with
+  If-None-Match / If-Modified-Since; on 304 its validation time is renewed
+  and the stored body is served without transferring it again
+- A body cut at a byte limit is only served to requests with the same or a
+  smaller limit and the same view (raw bytes or HTML extraction mode), since
+  an extracted view stops reading at a different point
+
+Eviction: when the stored bodies exceed ``max_bytes``, least recently used
+entries are dropped and blobs no longer referenced are deleted.
+
+The index uses WAL mode, so agents in several processes share one cache.
+
+Usage:
+    cache = open_cache('.cache/webfetch')
+    cached = cache.get(url, limit)
+    if cached is not None and cached.is_fresh(ttl):
+        ...  # serve cached.body
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Dict, Mapping, Optional, Tuple
+
+DEFAULT_CACHE_DIR = Path('.cache') / 'webfetch'
+DEFAULT_TTL = 300.0
+MAX_CACHE_BYTES = 64 * 1024 * 1024
+
+SCHEMA_VERSION = 2  # Older indexes are dropped with their blobs on open
+
+_DDL = """
+CREATE TABLE IF NOT EXISTS responses (
+    url TEXT PRIMARY KEY,
+    status INTEGER NOT NULL,
+    final_url TEXT NOT NULL,
+    content_type TEXT,
+    etag TEXT,
+    last_modified TEXT,
+    validated REAL NOT NULL,
+    max_age REAL,
+    last_access REAL NOT NULL,
+    digest TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    truncated INTEGER NOT NULL,
+    view TEXT NOT NULL,
+    cap INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_access ON responses(last_access);
+CREATE INDEX IF NOT EXISTS responses_digest ON responses(digest);
+"""
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    url: str
+    status: int
+    final_url: str
+    content_type: Optional[str]
+    etag: Optional[str]
+    last_modified: Optional[str]
+    validated: float
+    max_age: Optional[float]
+    truncated: bool
+    body: bytes
+
+    def is_fresh(self, ttl: float = DEFAULT_TTL) -> bool:
+        lifetime = ttl if self.max_age is None else min(ttl, self.max_age)
+        return time.time() - self.validated < lifetime
+
+    def validators(self) -> Dict[str, str]:
+        """Conditional request headers for revalidating this entry."""
+        headers: Dict[str, str] = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+def parse_cache_control(headers: Mapping[str, str]) -> Tuple[bool, Optional[float]]:
+    """(storable, max_age) from Cache-Control; max_age None when unspecified."""
+    directives: Dict[str, str] = {}
+    for part in (headers.get('Cache-Control') or '').split(','):
+        name, _, value = part.strip().partition('=')
+        directives[name.lower()] = value.strip().strip('"')
+    if 'no-store' in directives:
+        return False, None
+    if 'no-cache' in directives:
+        return True, 0.0
+    try:
+        return True, max(float(directives['max-age']), 0.0)
+    except (KeyError, ValueError):
+        return True, None
+
+
+class ResponseCache:
+    """Thread-safe handle on one cache directory."""
+
+    def __init__(self, root: str | Path = DEFAULT_CACHE_DIR, max_bytes: int = MAX_CACHE_BYTES) -> None:
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        (self.root / 'blobs').mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.root / 'index.sqlite'), timeout=30, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode = WAL')
+        if self.conn.execute('PRAGMA user_version').fetchone()[0] != SCHEMA_VERSION:
+            self.conn.execute('DROP TABLE IF EXISTS responses')
+            shutil.rmtree(self.root / 'blobs', ignore_errors=True)
+            (self.root / 'blobs').mkdir()
+            self.conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+        self.conn.executescript(_DDL)
+        self._lock = threading.Lock()
+
+    def close(self) -> None:
+        with self._lock:
+            self.conn.close()
+
+    def _blob_path(self, digest: str) -> Path:
+        return self.root / 'blobs' / digest[:2] / digest
+
+    def _read_blob(self, digest: str) -> Optional[bytes]:
+        try:
+            data = self._blob_path(digest).read_bytes()
+        except OSError:
+            return None
+        return data if hashlib.sha256(data).hexdigest() == digest else None
+
+    def _write_blob(self, digest: str, data: bytes) -> None:
+        path = self._blob_path(digest)
+        if path.exists():
+            return
+        path.parent.mkdir(exist_ok=True)
+        tmp = path.with_name(f'.{digest}.{os.getpid()}.{threading.get_ident()}.tmp')
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+
+    def get(self, url: str, limit: int, view: str = 'raw') -> Optional[CachedResponse]:
+        """The entry for ``url`` if its stored body can serve ``limit`` bytes of ``view``."""
+        with self._lock:
+            row = self.conn.execute(
+                'SELECT status, final_url, content_type, etag, last_modified, validated, max_age, digest, truncated, view, cap FROM responses WHERE url = ?',
+                (url,),
+            ).fetchone()
+        if row is None:
+            return None
+        status, final_url, ctype, etag, last_modified, validated, max_age, digest, truncated, stored_view, cap = row
+        if truncated and (cap < limit or stored_view != view):
+            return None  # Stored body was cut shorter than this request wants
+        body = self._read_blob(digest)
+        if body is None:
+            self._delete(url)
+            return None
+        with self._lock, self.conn:
+            self.conn.execute('UPDATE responses SET last_access = ? WHERE url = ?', (time.time(), url))
+        return CachedResponse(url, status, final_url, ctype, etag, last_modified, validated, max_age, bool(truncated), body)
+
+    def store(
+        self,
+        url: str,
+        status: int,
+        final_url: str,
+        content_type: Optional[str],
+        headers: Mapping[str, str],
+        body: bytes,
+        truncated: bool,
+        view: str = 'raw',
+        cap: int = 0,
+    ) -> None:
+        """Store ``body``; when ``truncated``, it was read for ``cap`` bytes of ``view``."""
+        storable, max_age = parse_cache_control(headers)
+        if not storable:
+            self._delete(url)
+            return
+        digest = hashlib.sha256(body).hexdigest()
+        self._write_blob(digest, body)
+        now = time.time()
+        with self._lock, self.conn:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (url, status, final_url, content_type, headers.get('ETag'), headers.get('Last-Modified'), now, max_age, now, digest, len(body), int(truncated), view, cap),
+            )
+        self._evict()
+
+    def revalidated(self, cached: CachedResponse, headers: Mapping[str, str]) -> CachedResponse:
+        """Renew ``cached`` after a 304 carrying ``headers``."""
+        storable, max_age = parse_cache_control(headers)
+        if not storable:
+            self._delete(cached.url)
+            return cached
+        if 'Cache-Control' not in headers:
+            max_age = cached.max_age
+        now = time.time()
+        etag = headers.get('ETag') or cached.etag
+        last_modified = headers.get('Last-Modified') or cached.last_modified
+        with self._lock, self.conn:
+            self.conn.execute(
+                'UPDATE responses SET validated = ?, max_age = ?, etag = ?, last_modified = ?, last_access = ? WHERE url = ?',
+                (now, max_age, etag, last_modified, now, cached.url),
+            )
+        return replace(cached, etag=etag, last_modified=last_modified, validated=now, max_age=max_age)
+
+    def _delete(self, url: str) -> None:
+        with self._lock, self.conn:
+            row = self.conn.execute('SELECT digest FROM responses WHERE url = ?', (url,)).fetchone()
+            if row is None:
+                return
+            self.conn.execute('DELETE FROM responses WHERE url = ?', (url,))
+            self._drop_orphan(row[0])
+
+    def _drop_orphan(self, digest: str) -> bool:
+        """Delete ``digest``'s blob if no entry references it (lock held)."""
+        if self.conn.execute('SELECT 1 FROM responses WHERE digest = ? LIMIT 1', (digest,)).fetchone():
+            return False
+        self._blob_path(digest).unlink(missing_ok=True)
+        return True
+
+    def _evict(self) -> None:
+        with self._lock, self.conn:
+            total = self.conn.execute('SELECT COALESCE(SUM(size), 0) FROM (SELECT DISTINCT digest, size FROM responses)').fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            victims = self.conn.execute('SELECT url, digest, size FROM responses ORDER BY last_access').fetchall()
+            for url, digest, size in victims:
+                if total <= self.max_bytes:
+                    break
+                self.conn.execute('DELETE FROM responses WHERE url = ?', (url,))
+                if self._drop_orphan(digest):
+                    total -= size
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            entries, size = self.conn.execute(
+                'SELECT COUNT(*), (SELECT COALESCE(SUM(size), 0) FROM (SELECT DISTINCT digest, size FROM responses)) FROM responses'
+            ).fetchone()
+        return {'entries': entries, 'bytes': size}
+
+
+_OPEN: Dict[Path, ResponseCache] = {}
+_OPEN_LOCK = threading.Lock()
+
+
+def open_cache(root: str | Path = DEFAULT_CACHE_DIR) -> ResponseCache:
+    """Process-wide handle per cache directory (kept open by tool_server)."""
+    key = Path(root).resolve()
+    with _OPEN_LOCK:
+        cache = _OPEN.get(key)
+        if cache is None:
+            cache = _OPEN[key] = ResponseCache(key)
+        return cache
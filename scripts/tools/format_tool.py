@@ -6,6 +6,29 @@ Operations (idempotent):
 - Ensure file ends with a single trailing newline
 - Optionally dry-run to show which files would change
 
+Candidates come from one walk (walker.py) matching every include pattern;
+.git, virtualenvs and paths excluded by .gitignore/.ignore files are pruned
+(--no-ignore-files to format ignored files too).
+
+--stream (or run_format(stream=True), a generator) emits one compact JSON
+record per file as it is processed, then a summary record.
+
+Performance:
+- A byte scan (one regex over the raw bytes, exact for UTF-8 input) detects
+  trailing whitespace, line breaks other than LF/CR/CRLF (which reading
+  translates to LF) and a missing final newline;
+  clean files are reported unchanged without decoding, hashing or writing
+  (their ``original_sha256``/``new_sha256`` are null)
+- Files above STREAM_THRESHOLD bytes are scanned in blocks and, when dirty,
+  normalized line by line into a temp file that replaces the original
+- --jobs N (0 = CPU count) processes files on a process pool; records keep
+  the sorted candidate order
+
+Writes (--apply) go through atomic_write.py: each rewrite is staged in a
+temp file next to the target and committed with an atomic rename, with one
+directory fsync per directory at the end. --transaction commits all
+rewrites only after every file was processed successfully (all-or-nothing).
+
 Intended as a safe placeholder until richer language-aware formatters are integrated.
 """
 from __future__ import annotations
@@ -13,9 +36,39 @@ from __future__ import annotations
 import argparse
 import hashlib
 import json
+import os
+import re
 import sys
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+
+try:
+    from .atomic_write import WriteBatch, commit_staged, new_token, replace_text, stage_text, staged_writer
+    from .streaming import collect, emit_records
+    from .walker import GlobMatcher
+except ImportError:  # executed as a script: scripts/tools/ is on sys.path
+    from atomic_write import WriteBatch, commit_staged, new_token, replace_text, stage_text, staged_writer
+    from streaming import collect, emit_records
+    from walker import GlobMatcher
+
+# Larger files are scanned in SCAN_BLOCK reads and rewritten line by line
+STREAM_THRESHOLD = 8 * 1024 * 1024
+SCAN_BLOCK = 1024 * 1024
+CHUNKS_PER_WORKER = 4
+
+# What makes normalize_text change a file once read with universal newlines
+# (besides a missing final newline): ASCII whitespace before a line end, and
+# str.splitlines() separators other than LF/CR. One translate() folds the
+# ASCII cases so two substring searches find them: whitespace -> b' ',
+# CR -> LF, the extra separators -> NUL (and NUL itself out of the way).
+_FOLD = bytes.maketrans(b'\t\x1f\r\x0b\x0c\x1c\x1d\x1e\x00', b'  \n\x00\x00\x00\x00\x00\x01')
+# The UTF-8 encoded non-ASCII cases; only searched in non-ASCII input
+DIRTY_NON_ASCII = re.compile(
+    rb'\xc2\x85|\xe2\x80[\xa8\xa9]'
+    rb'|(?:\xc2\xa0|\xe1\x9a\x80|\xe2\x80[\x80-\x8a\xaf]|\xe2\x81\x9f|\xe3\x80\x80)[\r\n]'
+)
 
 
 def normalize_text(text: str) -> str:
@@ -24,10 +77,90 @@ def normalize_text(text: str) -> str:
     return '\n'.join(stripped) + '\n'
 
 
-def process_file(path: Path) -> Dict[str, Any]:
-    original = path.read_text(encoding='utf-8', errors='replace')
+def _dirty(data: bytes) -> bool:
+    folded = data.translate(_FOLD)
+    if folded.find(b' \n') != -1 or folded.find(b'\x00') != -1:
+        return True
+    return not data.isascii() and DIRTY_NON_ASCII.search(data) is not None
+
+
+def needs_normalizing(data: bytes) -> bool:
+    """True iff normalize_text would change the file (no decoding needed)."""
+    return data[-1:] not in (b'\n', b'\r') or _dirty(data)
+
+
+def file_needs_normalizing(path: Path) -> bool:
+    """:func:`needs_normalizing` over a file read in blocks."""
+    tail = b''
+    with path.open('rb') as fh:
+        for block in iter(lambda: fh.read(SCAN_BLOCK), b''):
+            window = tail + block
+            if _dirty(window):
+                return True
+            tail = window[-3:]  # Longest dirty sequence is 4 bytes
+    return tail[-1:] not in (b'\n', b'\r')
+
+
+def _unchanged(path: Path) -> Dict[str, Any]:
+    return {'file': str(path), 'changed': False, 'original_sha256': None, 'new_sha256': None, 'new_content': None}
+
+
+def _stream_normalize(path: Path, token: Optional[str]) -> Tuple[str, str]:
+    """Normalize a large file line by line, staged under ``token`` if given.
+
+    Returns the (original, new) SHA-256.
+    """
+    original = hashlib.sha256()
+    normalized = hashlib.sha256()
+    with ExitStack() as stack:
+        tmp = stack.enter_context(staged_writer(path, token)) if token else None
+        wrote = False
+        # Universal newlines, as read_text(); splitlines() below handles the
+        # remaining separators inside each physical line
+        with path.open('r', encoding='utf-8', errors='replace') as src:
+            for physical in src:
+                original.update(physical.encode('utf-8'))
+                for line in physical.splitlines():
+                    out = line.rstrip() + '\n'
+                    normalized.update(out.encode('utf-8'))
+                    if tmp is not None:
+                        tmp.write(out)
+                    wrote = True
+        if not wrote:
+            normalized.update(b'\n')
+            if tmp is not None:
+                tmp.write('\n')
+    return original.hexdigest(), normalized.hexdigest()
+
+
+def process_file(path: Path, apply: bool = False, stage_token: Optional[str] = None) -> Dict[str, Any]:
+    """Normalize one file (writing it when ``apply``) and describe the result.
+
+    Writes replace the file atomically, or with ``stage_token`` are only
+    staged for a :class:`atomic_write.WriteBatch` with that token to commit.
+    """
+    size = path.stat().st_size
+    if size > STREAM_THRESHOLD:
+        if not file_needs_normalizing(path):
+            return _unchanged(path)
+        token = (stage_token or new_token()) if apply else None
+        original_sha, new_sha = _stream_normalize(path, token)
+        if token is not None and stage_token is None:
+            commit_staged(path, token)
+        return {'file': str(path), 'changed': True, 'original_sha256': original_sha, 'new_sha256': new_sha, 'new_content': None}
+
+    data = path.read_bytes()
+    if not needs_normalizing(data):
+        return _unchanged(path)
+    # Same universal-newline translation as read_text()
+    original = data.decode('utf-8', errors='replace').replace('\r\n', '\n').replace('\r', '\n')
     normalized = normalize_text(original)
     changed = normalized != original
+    if changed and apply:
+        if stage_token is not None:
+            stage_text(path, normalized, stage_token)
+        else:
+            replace_text(path, normalized)
     return {
         'file': str(path),
         'changed': changed,
@@ -37,41 +170,91 @@ def process_file(path: Path) -> Dict[str, Any]:
     }
 
 
-def run_format(base: str, include: List[str], dry_run: bool) -> Dict[str, Any]:
+def _process_task(task: Tuple[Path, bool, Optional[str]]) -> Dict[str, Any]:
+    return process_file(*task)
+
+
+def resolve_jobs(jobs: int) -> int:
+    if jobs <= 0:
+        return os.cpu_count() or 1
+    return jobs
+
+
+def iter_processed(files: List[Path], apply: bool, jobs: int = 1, stage_token: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """process_file over ``files`` in order, serially or on a process pool."""
+    tasks = [(f, apply, stage_token) for f in files]
+    workers = min(resolve_jobs(jobs), len(tasks))
+    if workers <= 1:
+        yield from map(_process_task, tasks)
+        return
+    chunksize = max(1, -(-len(tasks) // (workers * CHUNKS_PER_WORKER)))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        try:
+            # Executor.map yields in input order as results arrive
+            yield from pool.map(_process_task, tasks, chunksize=chunksize)
+        except BaseException:
+            # Closed early or a worker failed: no task may stage after cleanup
+            pool.shutdown(wait=True, cancel_futures=True)
+            raise
+
+
+def iter_format(base: str, include: List[str], dry_run: bool, ignore_files: bool = True, jobs: int = 1, transaction: bool = False) -> Iterator[Dict[str, Any]]:
+    """Yield a ``file`` record per candidate as processed, then a ``summary``.
+
+    With ``transaction``, rewrites are committed only once every file has
+    been processed; an error (or closing the generator early) applies none.
+    """
     base_path = Path(base).resolve()
     if not base_path.exists():
-        return {'error': f'Base directory not found: {base_path}'}
+        yield {'type': 'error', 'error': f'Base directory not found: {base_path}'}
+        return
 
-    # Collect candidate files
-    files: List[Path] = []
+    # Collect candidate files (sorted, each once)
     patterns = include or ['**/*.md', '**/*.py']
-    seen: set[Path] = set()
-    for pat in patterns:
-        for p in base_path.glob(pat):
-            if p.is_file() and p not in seen:
-                seen.add(p)
-                files.append(p)
-
-    results = []
+    files = [base_path / rel for rel in GlobMatcher(patterns).walk(base_path, ignore_files=ignore_files)]
+
+    batch = None if dry_run else WriteBatch(transaction=transaction)
     changed_files = 0
-    for f in files:
-        info = process_file(f)
-        if info['changed'] and not dry_run:
-            Path(info['file']).write_text(info['new_content'], encoding='utf-8')  # type: ignore[arg-type]
-        if info['changed']:
-            changed_files += 1
-        # Drop new_content in dry-run output for brevity
-        if dry_run:
-            info.pop('new_content')
-        results.append(info)
+    processed = iter_processed(files, not dry_run, jobs, batch.share(files) if batch else None)
+    try:
+        for info in processed:
+            if info['changed']:
+                changed_files += 1
+                if batch is not None:
+                    batch.add(Path(info['file']))
+            # Drop new_content in dry-run output for brevity
+            if dry_run:
+                info.pop('new_content')
+            yield {'type': 'file', **info}
+    except BaseException:
+        processed.close()  # Waits for the worker pool
+        if batch is not None:
+            batch.abort()
+        raise
+    if batch is not None:
+        batch.commit()
 
-    return {
+    summary = {
+        'type': 'summary',
         'base_dir': str(base_path),
         'files_examined': len(files),
         'files_changed': changed_files,
         'dry_run': dry_run,
-        'results': results,
     }
+    if transaction and not dry_run:
+        summary['transaction'] = 'committed'
+    yield summary
+
+
+def run_format(base: str, include: List[str], dry_run: bool, ignore_files: bool = True, stream: bool = False, jobs: int = 1, transaction: bool = False) -> Dict[str, Any] | Iterator[Dict[str, Any]]:
+    """Normalize files; with ``stream`` return the :func:`iter_format` generator."""
+    records = iter_format(base, include, dry_run, ignore_files, jobs, transaction)
+    if stream:
+        return records
+    results, final = collect(records, 'file')
+    if 'error' in final:
+        return final
+    return {**final, 'results': results}
 
 
 def main(argv: List[str]) -> int:
@@ -79,9 +262,16 @@ def main(argv: List[str]) -> int:
     parser.add_argument('--base', default='.', help='Base directory')
     parser.add_argument('--include', action='append', help='Glob include patterns (repeatable)')
     parser.add_argument('--apply', action='store_true', help='Apply changes (otherwise dry-run)')
+    parser.add_argument('--no-ignore-files', dest='ignore_files', action='store_false', help='Do not honor .gitignore/.ignore files')
+    parser.add_argument('--stream', action='store_true', help='Emit one JSON line per file as processed, then a summary line')
+    parser.add_argument('--jobs', '-j', type=int, default=1, help='Worker processes (0 = CPU count, default 1)')
+    parser.add_argument('--transaction', action='store_true', help='With --apply: commit all rewrites only if every file succeeds')
     args = parser.parse_args(argv)
 
-    result = run_format(args.base, args.include or [], not args.apply)
+    if args.stream:
+        return emit_records(iter_format(args.base, args.include or [], not args.apply, args.ignore_files, args.jobs, args.transaction))
+
+    result = run_format(args.base, args.include or [], not args.apply, args.ignore_files, jobs=args.jobs, transaction=args.transaction)
     print(json.dumps(result, indent=2))
     return 0 if 'error' not in result else 1
 
@@ -0,0 +1,427 @@
+#!/usr/bin/env python3
+"""fs_watch: Live in-memory snapshot of watched directory trees.
+
+A TreeSnapshot holds, for every directory below its roots (minus the
+walker's pruned directories), the names of its subdirectories and the mtime
+and size of its regular files. It is kept current by inotify on Linux
+(stdlib ctypes, no extra dependency) or, where inotify is unavailable or its
+watch limit is exhausted, by polling directory mtimes.
+
+Freshness: ``sync()`` applies every change the kernel has queued (inotify)
+or re-reads every directory whose mtime moved (polling), so a query that
+syncs first reflects all writes completed before it started. The walker
+calls ``sync()`` at the start of each walk when a snapshot is installed as
+its listing source (walker.set_listing_source), so run_grep / run_glob
+(and lint_agents.scan given the snapshot) never rescan the watched trees and
+never see stale listings. In polling mode file stats are re-read at query
+time, since modifying a file does not change its directory's mtime.
+
+Not tracked: changes behind symlinks (a symlinked file's target edited in
+place keeps its old mtime/size until its directory changes).
+
+Usage:
+    from scripts.tools.fs_watch import TreeSnapshot
+    snap = TreeSnapshot(['opencode', 'claude', '.'])
+    for entry in snap.files('opencode'):
+        print(entry.path, entry.mtime_ns, entry.size)
+
+CLI (print the snapshot of the given roots as JSON):
+    python scripts/tools/fs_watch.py opencode claude
+"""
+from __future__ import annotations
+
+import argparse
+import ctypes
+import ctypes.util
+import errno
+import json
+import os
+import stat
+import struct
+import sys
+import threading
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    from .walker import DEFAULT_PRUNE_DIRS, RACY_LISTING_NS, Listing, read_dir
+except ImportError:  # executed as a script: scripts/tools/ is on sys.path
+    from walker import DEFAULT_PRUNE_DIRS, RACY_LISTING_NS, Listing, read_dir
+
+DEFAULT_WATCH_ROOTS = ('opencode', 'claude', '.')
+
+# inotify(7) constants
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_DONT_FOLLOW = 0x02000000
+IN_EXCL_UNLINK = 0x04000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+WATCH_MASK = (
+    IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE
+    | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR | IN_DONT_FOLLOW | IN_EXCL_UNLINK
+)
+_EVENT = struct.Struct('iIII')
+READ_BYTES = 64 * 1024
+
+# Per directory: entry name -> None for a subdirectory, (mtime_ns, size) for a file
+Entries = Dict[str, Optional[Tuple[int, int]]]
+
+
+@dataclass(frozen=True)
+class FileStat:
+    path: str
+    mtime_ns: int
+    size: int
+
+
+class _Inotify:
+    def __init__(self) -> None:
+        if not sys.platform.startswith('linux'):
+            raise OSError('inotify requires Linux')
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self._libc = libc
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+
+    def add(self, path: str) -> int:
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err), path)
+        return wd
+
+    def remove(self, wd: int) -> None:
+        self._libc.inotify_rm_watch(self.fd, wd)  # Already gone: ignore EINVAL
+
+    def events(self) -> Iterator[Tuple[int, int, str]]:
+        """Drain queued events without blocking."""
+        while True:
+            try:
+                data = os.read(self.fd, READ_BYTES)
+            except BlockingIOError:
+                return
+            offset = 0
+            while offset < len(data):
+                wd, mask, _cookie, length = _EVENT.unpack_from(data, offset)
+                start = offset + _EVENT.size
+                name = os.fsdecode(data[start:start + length].rstrip(b'\0'))
+                offset = start + length
+                yield wd, mask, name
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+def _entry_kind(path: str) -> Tuple[bool, Optional[Tuple[int, int]]]:
+    """(present, value) for ``path`` as a snapshot entry, mirroring walker.read_dir."""
+    st = os.lstat(path)
+    if stat.S_ISDIR(st.st_mode):
+        return True, None
+    if stat.S_ISLNK(st.st_mode):
+        st = os.stat(path)  # Symlinked files are listed; symlinked dirs are not
+    if stat.S_ISREG(st.st_mode):
+        return True, (st.st_mtime_ns, st.st_size)
+    return False, None
+
+
+class TreeSnapshot:
+    """In-memory listings of ``roots`` kept current by inotify or polling.
+
+    Also a walker listing source: ``listing()`` serves watched directories
+    from memory and delegates everything else to ``fallback`` (or disk).
+    """
+
+    def __init__(self, roots: Iterable[str | Path], prune: Iterable[str] = DEFAULT_PRUNE_DIRS, use_inotify: bool = True, fallback: Optional[object] = None) -> None:
+        resolved = sorted({Path(r).resolve() for r in roots if Path(r).is_dir()})
+        # Nested roots are covered by their ancestor
+        self.roots = [r for r in resolved if not any(o in r.parents for o in resolved)]
+        self.prune = frozenset(prune)
+        self.fallback = fallback
+        self._lock = threading.RLock()
+        self._listings: Dict[str, Entries] = {}
+        self._dir_mtimes: Dict[str, Optional[int]] = {}
+        self._wd_dirs: Dict[int, str] = {}
+        self._dir_wds: Dict[str, int] = {}
+        self._inotify: Optional[_Inotify] = None
+        self.rebuilds = 0
+        self.events_applied = 0
+        if use_inotify:
+            try:
+                self._inotify = _Inotify()
+            except (OSError, AttributeError):
+                self._inotify = None
+        self._build()
+
+    @property
+    def backend(self) -> str:
+        return 'inotify' if self._inotify is not None else 'poll'
+
+    def close(self) -> None:
+        with self._lock:
+            if self._inotify is not None:
+                self._inotify.close()
+                self._inotify = None
+
+    def __enter__(self) -> 'TreeSnapshot':
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    # ---------------------------
+    # Building and syncing
+    # ---------------------------
+
+    def _build(self) -> None:
+        with self._lock:
+            self._listings.clear()
+            self._dir_mtimes.clear()
+            for wd in list(self._wd_dirs):
+                self._unwatch(wd)
+            try:
+                for root in self.roots:
+                    self._scan_subtree(str(root))
+            except OSError:  # Watch limit exhausted (ENOSPC)
+                self._fall_back_to_polling()
+
+    def _fall_back_to_polling(self) -> None:
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+        self._wd_dirs.clear()
+        self._dir_wds.clear()
+        self._build()
+
+    def _read_entries(self, directory: str) -> Entries:
+        entries: Entries = {}
+        for name, is_dir, is_file in read_dir(Path(directory)):
+            if is_dir:
+                entries[name] = None
+            elif is_file:
+                try:
+                    st = os.stat(os.path.join(directory, name))
+                except OSError:
+                    continue
+                entries[name] = (st.st_mtime_ns, st.st_size)
+        return entries
+
+    def _scan_subtree(self, top: str) -> None:
+        pending = [top]
+        while pending:
+            directory = pending.pop()
+            if self._inotify is not None:
+                # Watch before listing so nothing created in between is missed
+                try:
+                    wd = self._inotify.add(directory)
+                except OSError as e:
+                    if e.errno in (errno.ENOSPC, errno.ENOMEM):
+                        raise
+                    continue  # Vanished or unreadable directory
+                self._wd_dirs[wd] = directory
+                self._dir_wds[directory] = wd
+            else:
+                try:
+                    mtime_ns = os.stat(directory).st_mtime_ns
+                except OSError:
+                    continue
+                self._dir_mtimes[directory] = None if time.time_ns() - mtime_ns <= RACY_LISTING_NS else mtime_ns
+            try:
+                entries = self._read_entries(directory)
+            except OSError:
+                continue
+            self._listings[directory] = entries
+            pending.extend(os.path.join(directory, name) for name, value in entries.items() if value is None and name not in self.prune)
+
+    def _unwatch(self, wd: int) -> None:
+        directory = self._wd_dirs.pop(wd, None)
+        if directory is not None and self._dir_wds.get(directory) == wd:
+            del self._dir_wds[directory]
+        if self._inotify is not None:
+            self._inotify.remove(wd)
+
+    def _drop_subtree(self, top: str) -> None:
+        prefix = top + os.sep
+        for directory in [d for d in self._listings if d == top or d.startswith(prefix)]:
+            del self._listings[directory]
+            self._dir_mtimes.pop(directory, None)
+            wd = self._dir_wds.get(directory)
+            if wd is not None:
+                self._unwatch(wd)
+
+    def _update_entry(self, directory: str, entries: Entries, name: str) -> None:
+        path = os.path.join(directory, name)
+        previous = entries.get(name, ())
+        try:
+            present, value = _entry_kind(path)
+        except OSError:
+            present, value = False, None
+        if previous is None and not (present and value is None):
+            self._drop_subtree(path)  # Directory replaced or gone
+        if not present:
+            entries.pop(name, None)
+            return
+        entries[name] = value
+        if value is None and previous is not None and name not in self.prune:
+            self._scan_subtree(path)
+
+    def _apply(self, wd: int, mask: int, name: str) -> bool:
+        """Apply one inotify event; False if a full rebuild is required."""
+        if mask & IN_Q_OVERFLOW:
+            return False
+        directory = self._wd_dirs.get(wd)
+        if directory is None:
+            return True
+        if mask & IN_IGNORED:
+            self._wd_dirs.pop(wd, None)
+            if self._dir_wds.get(directory) == wd:
+                del self._dir_wds[directory]
+            return True
+        if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+            # Subdirectories are handled through their parent's events
+            return Path(directory) not in self.roots
+        entries = self._listings.get(directory)
+        if not name or entries is None:
+            return True
+        if mask & (IN_DELETE | IN_MOVED_FROM):
+            if entries.pop(name, ()) is None:
+                self._drop_subtree(os.path.join(directory, name))
+            return True
+        self._update_entry(directory, entries, name)
+        return True
+
+    def _poll(self) -> None:
+        for directory in list(self._listings):
+            if directory not in self._listings:
+                continue  # Dropped with an ancestor during this pass
+            try:
+                mtime_ns = os.stat(directory).st_mtime_ns
+            except OSError:
+                self._drop_subtree(directory)
+                continue
+            if self._dir_mtimes.get(directory) == mtime_ns:
+                continue
+            self._dir_mtimes[directory] = None if time.time_ns() - mtime_ns <= RACY_LISTING_NS else mtime_ns
+            entries = self._listings[directory]
+            try:
+                fresh = self._read_entries(directory)
+            except OSError:
+                self._drop_subtree(directory)
+                continue
+            for name in set(entries) | set(fresh):
+                old, new = entries.get(name, ()), fresh.get(name, ())
+                path = os.path.join(directory, name)
+                if old is None and new is not None:
+                    self._drop_subtree(path)
+                if new is None and old is not None and name not in self.prune:
+                    entries[name] = None
+                    self._scan_subtree(path)
+            for name in list(entries):
+                if name not in fresh:
+                    del entries[name]
+            entries.update(fresh)
+
+    def sync(self) -> None:
+        """Bring the snapshot up to date with every change made so far."""
+        with self._lock:
+            if self._inotify is not None:
+                try:
+                    for wd, mask, name in self._inotify.events():
+                        self.events_applied += 1
+                        if not self._apply(wd, mask, name):
+                            self.rebuilds += 1
+                            self._build()
+                            return
+                except OSError:  # Watch limit hit by a new directory
+                    self._fall_back_to_polling()
+            else:
+                self._poll()
+
+    # ---------------------------
+    # Queries
+    # ---------------------------
+
+    def covers(self, path: str | Path) -> bool:
+        resolved = Path(path).resolve()
+        return any(resolved == r or r in resolved.parents for r in self.roots)
+
+    def listing(self, directory: Path) -> Listing:
+        """Walker listing source: watched directories from memory."""
+        with self._lock:
+            entries = self._listings.get(str(directory))
+            if entries is not None:
+                return [(name, value is None, value is not None) for name, value in entries.items()]
+        if self.fallback is not None:
+            return self.fallback.listing(directory)  # type: ignore[attr-defined]
+        return read_dir(directory)
+
+    def files(self, root: str | Path | None = None, sync: bool = True) -> List[FileStat]:
+        """Sorted stats of every file below ``root`` (default: all roots)."""
+        if sync:
+            self.sync()
+        top = str(Path(root).resolve()) if root is not None else None
+        prefix = top + os.sep if top is not None else None
+        out: List[FileStat] = []
+        with self._lock:
+            for directory, entries in self._listings.items():
+                if top is not None and directory != top and not directory.startswith(prefix):  # type: ignore[arg-type]
+                    continue
+                for name, value in entries.items():
+                    if value is not None:
+                        out.append(FileStat(os.path.join(directory, name), *value))
+        if self._inotify is None:
+            out = self._restat(out)
+        out.sort(key=lambda f: f.path)
+        return out
+
+    def _restat(self, entries: List[FileStat]) -> List[FileStat]:
+        # Polling cannot observe in-place modification; stat at query time
+        fresh: List[FileStat] = []
+        for entry in entries:
+            try:
+                st = os.stat(entry.path)
+            except OSError:
+                continue
+            fresh.append(FileStat(entry.path, st.st_mtime_ns, st.st_size))
+        return fresh
+
+    def paths(self, root: str | Path, sync: bool = True) -> List[str]:
+        """Sorted POSIX paths of files below ``root``, relative to it."""
+        top = Path(root).resolve()
+        return [Path(f.path).relative_to(top).as_posix() for f in self.files(top, sync)]
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description='Print a snapshot of watched trees (path, mtime_ns, size)')
+    parser.add_argument('roots', nargs='*', default=list(DEFAULT_WATCH_ROOTS), help='Roots to snapshot (default opencode claude .)')
+    parser.add_argument('--poll', action='store_true', help='Use the polling backend even where inotify is available')
+    args = parser.parse_args(argv)
+
+    with TreeSnapshot(args.roots, use_inotify=not args.poll) as snap:
+        files = snap.files()
+        result = {'backend': snap.backend, 'roots': [str(r) for r in snap.roots], 'count': len(files), 'files': [asdict(f) for f in files]}
+    print(json.dumps(result, indent=2))
+    return 0
+
+
+if __name__ == '__main__':  # pragma: no cover
+    try:
+        sys.exit(main(sys.argv[1:]))
+    except KeyboardInterrupt:
+        print('Interrupted', file=sys.stderr)
+        sys.exit(130)
@@ -5,6 +5,15 @@ Design goals:
 - Pure function style returning deterministic JSON-friendly data
 - No network, no modification side effects
 - Graceful handling of invalid patterns / empty results
+- One parallel directory walk (walker.py) shared by all patterns; .git,
+  node_modules, .venv and similar are pruned before descending
+- Patterns and excludes compiled into one matcher (walker.GlobMatcher);
+  excluded directories and directories outside every pattern's literal
+  prefix are pruned instead of enumerated and filtered
+- .gitignore/.ignore files are honored during the walk (--no-ignore-files
+  to list ignored files too)
+- --stream (or run_glob(stream=True), a generator) emits one compact JSON
+  record per file in discovery order as the walk finds it, then a summary
 
 Usage (library style):
     from scripts.tools.glob_tool import run_glob
@@ -12,37 +21,46 @@ Usage (library style):
 
 CLI:
     python scripts/tools/glob_tool.py --base . --pattern '**/*.md' --exclude 'build/*'
+    python scripts/tools/glob_tool.py --base . --pattern '**/*.md' --stream
 """
 from __future__ import annotations
 
 import argparse
 import json
 import sys
-import re
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator
 
+try:
+    from .streaming import emit_records
+    from .walker import DEFAULT_WORKERS, GlobMatcher
+except ImportError:  # executed as a script: scripts/tools/ is on sys.path
+    from streaming import emit_records
+    from walker import DEFAULT_WORKERS, GlobMatcher
 
-def run_glob(base_dir: str, patterns: List[str], exclude: List[str] | None = None) -> Dict[str, Any]:
+
+def iter_glob(base_dir: str, patterns: List[str], exclude: List[str] | None = None, workers: int = DEFAULT_WORKERS, ignore_files: bool = True) -> Iterator[Dict[str, Any]]:
+    """Yield ``file`` records as the walk finds them, then one ``summary``."""
+    base = Path(base_dir).resolve()
+    if not base.exists():
+        yield {"type": "error", "base_dir": str(base), "error": f"Base directory not found: {base}"}
+        return
+    count = 0
+    for rel in GlobMatcher(patterns, exclude or []).iter_walk(base, workers=workers, ignore_files=ignore_files):
+        count += 1
+        yield {"type": "file", "file": rel}
+    yield {"type": "summary", "base_dir": str(base), "count": count}
+
+
+def run_glob(base_dir: str, patterns: List[str], exclude: List[str] | None = None, workers: int = DEFAULT_WORKERS, ignore_files: bool = True, stream: bool = False) -> Dict[str, Any] | Iterator[Dict[str, Any]]:
+    """List matching files (sorted); with ``stream`` return :func:`iter_glob`."""
+    if stream:
+        return iter_glob(base_dir, patterns, exclude, workers, ignore_files)
     base = Path(base_dir).resolve()
     if not base.exists():
         return {"base_dir": str(base), "files": [], "error": f"Base directory not found: {base}"}
-    exclude = exclude or []
-    matched: set[Path] = set()
-    for pat in patterns:
-        # (Python's glob doesn't raise re.error; pattern errors are rare but we guard anyway.)
-        for p in base.glob(pat):
-            if not p.is_file():
-                continue
-            skipped = False
-            for ex in exclude:
-                if p.match(ex):
-                    skipped = True
-                    break
-            if not skipped:
-                matched.add(p)
-    # Sort by relative path for stability
-    rels = sorted(str(p.relative_to(base)) for p in matched)
+    matcher = GlobMatcher(patterns, exclude or [])
+    rels = matcher.walk(base, workers=workers, ignore_files=ignore_files)
     return {"base_dir": str(base), "count": len(rels), "files": rels}
 
 
@@ -51,9 +69,15 @@ def main(argv: List[str]) -> int:
     parser.add_argument("--base", default=".", help="Base directory")
     parser.add_argument("--pattern", action="append", required=True, help="Glob pattern (can repeat)")
     parser.add_argument("--exclude", action="append", help="Exclude pattern (can repeat)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help=f"Walker threads (default {DEFAULT_WORKERS})")
+    parser.add_argument("--no-ignore-files", dest="ignore_files", action="store_false", help="Do not honor .gitignore/.ignore files")
+    parser.add_argument("--stream", action="store_true", help="Emit one JSON line per file as found, then a summary line")
     args = parser.parse_args(argv)
 
-    result = run_glob(args.base, args.pattern, args.exclude)
+    if args.stream:
+        return emit_records(iter_glob(args.base, args.pattern, args.exclude, args.workers, args.ignore_files))
+
+    result = run_glob(args.base, args.pattern, args.exclude, args.workers, args.ignore_files)
     print(json.dumps(result, indent=2))
     return 0 if 'error' not in result else 1
 
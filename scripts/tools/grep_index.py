@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""grep_index: Incremental trigram index that narrows grep_tool searches.
+
+Features:
+- Lower-cased trigram postings per file, stored in SQLite
+- Incremental refresh: only files whose mtime/size changed are re-indexed,
+  deleted files are dropped
+- Required-literal extraction from the regex; candidates are the files that
+  contain every trigram of every required literal. The regex confirmation
+  pass in grep_tool still decides what matches, so the index only ever
+  removes files that cannot match.
+- Files are decoded as grep_tool scans them: skipped only when the first
+  block sniffs as binary, with later invalid UTF-8 replaced, so an indexed
+  search finds the same matches as a full scan.
+
+Default scope is the agent catalog (opencode/**/SKILL.md, claude/*.md).
+
+Usage:
+    from scripts.tools.grep_index import GrepIndex
+    with GrepIndex(base_dir='.') as idx:
+        idx.refresh()
+        files = idx.candidates('security audit')
+
+CLI (build/refresh the index):
+    python scripts/tools/grep_index.py --base . [--glob 'docs/*.md']
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import re
+import sqlite3
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set
+
+try:
+    import re._parser as sre_parse  # Python 3.11+
+except ImportError:  # pragma: no cover
+    import sre_parse  # type: ignore[no-redef]
+
+DEFAULT_INDEX_GLOBS = ['opencode/**/SKILL.md', 'claude/*.md']
+DEFAULT_INDEX_DB = Path('.cache') / 'grep-index.sqlite'
+# Under IGNORECASE, re also folds these ASCII letters onto non-ASCII code points
+# (e.g. 'k' ~ KELVIN SIGN, 's' ~ LONG S), which str.lower() does not; trigrams
+# containing them cannot safely exclude a file.
+_CASEFOLD_AMBIGUOUS = set('iks')
+_REPEATS = {sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT}
+if hasattr(sre_parse, 'POSSESSIVE_REPEAT'):
+    _REPEATS.add(sre_parse.POSSESSIVE_REPEAT)
+
+_DDL = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    rel TEXT UNIQUE NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS postings (
+    trigram TEXT NOT NULL,
+    file_id INTEGER NOT NULL,
+    PRIMARY KEY (trigram, file_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS postings_file ON postings(file_id);
+"""
+
+
+def trigrams(text: str) -> Set[str]:
+    lowered = text.lower()
+    return {lowered[i:i + 3] for i in range(len(lowered) - 2)}
+
+
+def _collect_literals(seq: Any, runs: List[str], ignorecase: bool) -> bool:
+    """Append literal runs every match must contain; return ignorecase seen."""
+    current: List[str] = []
+
+    def flush() -> None:
+        if current:
+            runs.append(''.join(current))
+            current.clear()
+
+    for op, av in seq:
+        if op is sre_parse.LITERAL:
+            current.append(chr(av))
+        elif op is sre_parse.SUBPATTERN:
+            flush()
+            _group, add_flags, _del_flags, sub = av
+            ignorecase |= bool(add_flags & re.IGNORECASE)
+            ignorecase |= _collect_literals(sub, runs, ignorecase)
+        elif op in _REPEATS and av[0] >= 1:
+            flush()
+            ignorecase |= _collect_literals(av[2], runs, ignorecase)
+        else:  # Branches, classes, optional repeats, assertions: nothing required
+            flush()
+    flush()
+    return ignorecase
+
+
+def required_trigrams(pattern: str) -> Set[str]:
+    """Trigrams that any line matching ``pattern`` must contain (lower-cased)."""
+    try:
+        parsed = sre_parse.parse(pattern)
+    except Exception:
+        return set()
+    runs: List[str] = []
+    ignorecase = bool(parsed.state.flags & re.IGNORECASE)
+    ignorecase = _collect_literals(parsed, runs, ignorecase)
+    grams: Set[str] = set()
+    for run in runs:
+        grams |= trigrams(run)
+    if ignorecase:
+        grams = {g for g in grams if g.isascii() and not _CASEFOLD_AMBIGUOUS & set(g)}
+    return grams
+
+
+class GrepIndex:
+    def __init__(self, base_dir: str, db_path: Optional[str] = None, globs: Optional[List[str]] = None) -> None:
+        self.base = Path(base_dir).resolve()
+        self.globs = globs or DEFAULT_INDEX_GLOBS
+        self.db_path = Path(db_path) if db_path else self.base / DEFAULT_INDEX_DB
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.db_path))
+        self.conn.execute('PRAGMA journal_mode = WAL')
+        self.conn.executescript(_DDL)
+
+    def __enter__(self) -> 'GrepIndex':
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def scope(self) -> List[Path]:
+        seen: Set[Path] = set()
+        for pat in self.globs:
+            seen.update(p for p in self.base.glob(pat) if p.is_file())
+        return sorted(seen)
+
+    def refresh(self) -> Dict[str, int]:
+        """Re-index files whose mtime/size changed; drop files that vanished."""
+        # Imported lazily: grep_tool imports this module.
+        try:
+            from .grep_tool import SNIFF_BYTES, looks_binary
+        except ImportError:  # executed as a script: scripts/tools/ is on sys.path
+            from grep_tool import SNIFF_BYTES, looks_binary
+        stats = {'indexed': 0, 'unchanged': 0, 'removed': 0}
+        known = {rel: (fid, mtime, size) for fid, rel, mtime, size in self.conn.execute('SELECT id, rel, mtime_ns, size FROM files')}
+        seen: Set[str] = set()
+        with self.conn:
+            for path in self.scope():
+                rel = str(path.relative_to(self.base))
+                seen.add(rel)
+                st = path.stat()
+                row = known.get(rel)
+                if row is not None and row[1:] == (st.st_mtime_ns, st.st_size):
+                    stats['unchanged'] += 1
+                    continue
+                if row is not None:
+                    self._drop(row[0])
+                try:
+                    data = path.read_bytes()
+                except OSError:
+                    continue  # Unreadable; grep_tool skips these too
+                if looks_binary(data[:SNIFF_BYTES]):
+                    continue
+                # Same policy as grep_tool.scan_file: only the first block is
+                # sniffed, invalid UTF-8 later on is replaced, not fatal
+                text = data.decode('utf-8', errors='replace')
+                cur = self.conn.execute(
+                    'INSERT INTO files (rel, mtime_ns, size) VALUES (?, ?, ?)',
+                    (rel, st.st_mtime_ns, st.st_size),
+                )
+                self.conn.executemany(
+                    'INSERT INTO postings (trigram, file_id) VALUES (?, ?)',
+                    [(g, cur.lastrowid) for g in trigrams(text)],
+                )
+                stats['indexed'] += 1
+            for rel, row in known.items():
+                if rel not in seen:
+                    self._drop(row[0])
+                    stats['removed'] += 1
+        return stats
+
+    def _drop(self, file_id: int) -> None:
+        self.conn.execute('DELETE FROM postings WHERE file_id = ?', (file_id,))
+        self.conn.execute('DELETE FROM files WHERE id = ?', (file_id,))
+
+    def candidates(self, pattern: str) -> List[Path]:
+        """Indexed files that may contain a match for ``pattern``, sorted."""
+        grams = sorted(required_trigrams(pattern))
+        if not grams:
+            rows = self.conn.execute('SELECT rel FROM files')
+        else:
+            marks = ','.join('?' * len(grams))
+            rows = self.conn.execute(
+                f'SELECT rel FROM files WHERE id IN ('
+                f'SELECT file_id FROM postings WHERE trigram IN ({marks}) '
+                f'GROUP BY file_id HAVING COUNT(*) = ?)',
+                (*grams, len(grams)),
+            )
+        return sorted(self.base / rel for (rel,) in rows)
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description='Build or refresh the grep_tool trigram index')
+    parser.add_argument('--base', default='.', help='Base directory')
+    parser.add_argument('--db', help=f'Index database (default <base>/{DEFAULT_INDEX_DB})')
+    parser.add_argument('--glob', action='append', help='Files to index (repeatable; default agent catalog)')
+    args = parser.parse_args(argv)
+
+    base = Path(args.base).resolve()
+    if not base.exists():
+        print(json.dumps({'error': f'Base directory not found: {base}'}, indent=2))
+        return 1
+    with GrepIndex(str(base), args.db, args.glob) as idx:
+        stats = idx.refresh()
+        result = {'base_dir': str(base), 'db': str(idx.db_path), **stats}
+    print(json.dumps(result, indent=2))
+    return 0
+
+
+if __name__ == '__main__':  # pragma: no cover
+    try:
+        sys.exit(main(sys.argv[1:]))
+    except KeyboardInterrupt:
+        print('Interrupted', file=sys.stderr)
+        sys.exit(130)
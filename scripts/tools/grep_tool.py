@@ -2,9 +2,29 @@
 """grep_tool: Regex search across text files.
 
 Features:
-- UTF-8 text scanning with line numbers
+- Streaming UTF-8 text scanning with line numbers (constant memory per file)
+- Files are memory-mapped; binaries are sniffed from the first block (NUL byte
+  or invalid UTF-8) and skipped without reading the rest
+- Patterns whose byte-level semantics match str semantics (ASCII literals,
+  non-negated ASCII classes, anchors, groups, repeats) run directly over the
+  mapped bytes; line numbers are computed only for matching lines. Other
+  patterns (and files containing CR) are applied line by line. Lines are
+  '\n'-delimited with a trailing '\r' stripped. Scanning stops once max
+  matches is hit.
 - Include glob filtering and simple ignore patterns
+- One parallel directory walk (walker.py) that prunes .git, node_modules,
+  .venv and similar before descending; files are searched on a thread pool
+  and reported in sorted path order
+- .gitignore/.ignore files (nested, and up to the repository root) are
+  honored during the walk; ignored subtrees are never opened
+  (--no-ignore-files to disable)
 - Limits results to avoid overwhelming output
+- Optional trigram index (grep_index.py) narrows the search to candidate
+  files before the regex confirmation pass; results keep the same shape
+- --stream (or run_grep(stream=True), a generator) emits one compact JSON
+  record per match as soon as it is found, then a summary record; files are
+  searched in walk order while the walk is still running (JSON mode reports
+  sorted path order, so it waits for the whole walk)
 
 Usage:
     from scripts.tools.grep_tool import run_grep
@@ -12,18 +32,46 @@ Usage:
 
 CLI:
     python scripts/tools/grep_tool.py --base . --pattern 'TODO' --include '*.py' --max 200
+    python scripts/tools/grep_tool.py --base . --pattern 'threat model' --index
+    python scripts/tools/grep_tool.py --base . --pattern 'TODO' --stream
 """
 from __future__ import annotations
 
 import argparse
+import codecs
 import json
+import mmap
 import re
 import sys
 from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Dict, Any, Iterable
+from typing import List, Dict, Any, Iterable, Iterator, Optional
+
+try:
+    import re._parser as sre_parse  # Python 3.11+
+except ImportError:  # pragma: no cover
+    import sre_parse  # type: ignore[no-redef]
+
+try:
+    from .grep_index import GrepIndex
+    from .streaming import collect, emit_records
+    from .walker import DEFAULT_WORKERS, glob_regex, iter_walk, ordered_map, walk_files
+except ImportError:  # executed as a script: scripts/tools/ is on sys.path
+    from grep_index import GrepIndex
+    from streaming import collect, emit_records
+    from walker import DEFAULT_WORKERS, glob_regex, iter_walk, ordered_map, walk_files
 
 DEFAULT_MAX_MATCHES = 500
+SNIFF_BYTES = 8192
+MAX_LINE_CHARS = 400
+# UTF-8 needs at most 4 bytes per char, so this many bytes always decodes to
+# at least MAX_LINE_CHARS characters.
+MAX_LINE_BYTES = MAX_LINE_CHARS * 4
+_SAFE_AT = {sre_parse.AT_BEGINNING, sre_parse.AT_END}
+_LINE_BREAKS = (ord('\n'), ord('\r'))
+_ASCII_MAX = 0x7F
+COUNT_CHUNK = 1 << 20
 
 
 @dataclass
@@ -33,64 +81,206 @@ class Match:
     text: str
 
 
-def iter_files(base: Path, includes: List[str] | None) -> Iterable[Path]:
-    if not includes:
-        yield from base.rglob('*')
-    else:
-        seen: set[Path] = set()
-        for inc in includes:
-            for p in base.rglob(inc):
-                if p in seen:
+def iter_files(base: Path, includes: List[str] | None, workers: int = DEFAULT_WORKERS, ignore_files: bool = True, sort: bool = True) -> Iterable[Path]:
+    """Files under base (one parallel walk), filtered by rglob-style includes.
+
+    With ``sort`` False, files are yielded in walk order as they are found.
+    """
+    include_rxs = [glob_regex(f'**/{inc}') for inc in includes or []]
+    walk = walk_files if sort else iter_walk
+    for rel in walk(base, workers=workers, ignore_files=ignore_files):
+        if include_rxs and not any(rx.match(rel) for rx in include_rxs):
+            continue
+        yield base / rel
+
+
+def _byte_safe(seq: Any) -> bool:
+    """True if ``seq`` matches the same lines as bytes as it does as str.
+
+    Whitelist: ASCII literals, non-negated ASCII literal/range classes, line
+    anchors, groups, alternation, repeats and lookarounds, none of which may
+    touch a line break (so matches can never span lines of the mapped file).
+    Escapes such as ``\xe9`` are ASCII text but name a code point >= 0x80,
+    which would match a single raw byte rather than its UTF-8 encoding.
+    """
+    for op, av in seq:
+        if op is sre_parse.LITERAL:
+            if av in _LINE_BREAKS or av > _ASCII_MAX:
+                return False
+        elif op is sre_parse.IN:
+            for item_op, item_av in av:
+                if item_op is sre_parse.LITERAL and item_av not in _LINE_BREAKS and item_av <= _ASCII_MAX:
                     continue
-                seen.add(p)
-                yield p
+                if (item_op is sre_parse.RANGE and item_av[1] <= _ASCII_MAX
+                        and not any(item_av[0] <= c <= item_av[1] for c in _LINE_BREAKS)):
+                    continue
+                return False
+        elif op is sre_parse.AT:
+            if av not in _SAFE_AT:
+                return False
+        elif op is sre_parse.SUBPATTERN:
+            if av[1] & re.IGNORECASE or not _byte_safe(av[3]):
+                return False
+        elif op is sre_parse.BRANCH:
+            if not all(_byte_safe(branch) for branch in av[1]):
+                return False
+        elif op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT):
+            if not _byte_safe(av[2]):
+                return False
+        elif op in (sre_parse.ASSERT, sre_parse.ASSERT_NOT):
+            if not _byte_safe(av[1]):
+                return False
+        elif op is sre_parse.GROUPREF:
+            continue
+        else:  # ., \w, \s, \b, [^...], NOT_LITERAL, conditionals, ...
+            return False
+    return True
+
+
+@lru_cache(maxsize=256)
+def bytes_pattern(pattern: str) -> Optional[re.Pattern[bytes]]:
+    """Compile ``pattern`` for direct use on mapped bytes, or None if unsafe."""
+    if not pattern.isascii():
+        return None
+    try:
+        parsed = sre_parse.parse(pattern)
+        if parsed.state.flags & re.IGNORECASE or not _byte_safe(parsed):
+            return None
+        return re.compile(pattern.encode('ascii'), re.MULTILINE)
+    except (re.error, ValueError):
+        return None
+
+
+def _count_newlines(mm: mmap.mmap, start: int, end: int) -> int:
+    # mmap has no count(); copy bounded chunks to keep memory constant
+    total = 0
+    for lo in range(start, end, COUNT_CHUNK):
+        total += mm[lo:min(lo + COUNT_CHUNK, end)].count(b'\n')
+    return total
+
+
+def looks_binary(block: bytes) -> bool:
+    if b'\0' in block:
+        return True
+    try:
+        # Incremental decode tolerates a multi-byte char cut at the block edge
+        codecs.getincrementaldecoder('utf-8')().decode(block, final=False)
+    except UnicodeDecodeError:
+        return True
+    return False
 
 
-def run_grep(base_dir: str, pattern: str, include: List[str] | None = None, ignore: List[str] | None = None, max_matches: int = DEFAULT_MAX_MATCHES) -> Dict[str, Any]:
+def _line_text(raw: bytes) -> str:
+    return raw[:MAX_LINE_BYTES].decode('utf-8', errors='replace')[:MAX_LINE_CHARS]
+
+
+def scan_file(path: Path, rel: str, rx: re.Pattern[str], rxb: Optional[re.Pattern[bytes]], limit: int) -> List[Match]:
+    """Return up to ``limit`` matching lines of ``path`` (skips binaries)."""
+    found: List[Match] = []
+    with path.open('rb') as fh:
+        if looks_binary(fh.read(SNIFF_BYTES)):
+            return found
+        try:
+            mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # Empty file
+            return found
+    with mm:
+        if rxb is not None and mm.find(b'\r') != -1:
+            rxb = None  # '$' would not match before '\r'; use the line path
+        if rxb is not None:
+            # A final '\n' terminates the last line rather than starting a new one
+            endpos = len(mm) - 1 if mm[-1:] == b'\n' else len(mm)
+            lineno, counted_to, pos = 1, 0, 0
+            while len(found) < limit and pos <= endpos:
+                m = rxb.search(mm, pos, endpos)
+                if m is None:
+                    break
+                start = mm.rfind(b'\n', 0, m.start()) + 1
+                end = mm.find(b'\n', m.start())
+                end = endpos if end == -1 or end > endpos else end
+                lineno += _count_newlines(mm, counted_to, start)
+                counted_to = start
+                found.append(Match(rel, lineno, _line_text(mm[start:end])))
+                pos = end + 1
+        else:
+            for lineno, raw in enumerate(iter(mm.readline, b''), start=1):
+                line = raw.rstrip(b'\r\n').decode('utf-8', errors='replace')
+                if rx.search(line):
+                    found.append(Match(rel, lineno, line[:MAX_LINE_CHARS]))
+                    if len(found) >= limit:
+                        break
+    return found
+
+
+def iter_indexed_files(base: Path, pattern: str, includes: List[str] | None, index_db: str | None) -> Iterable[Path]:
+    """Candidate files from the (freshly refreshed) trigram index."""
+    with GrepIndex(str(base), index_db) as idx:
+        idx.refresh()
+        candidates = idx.candidates(pattern)
+    for p in candidates:
+        if includes and not any(p.relative_to(base).match(inc) for inc in includes):
+            continue
+        yield p
+
+
+def iter_grep(base_dir: str, pattern: str, include: List[str] | None = None, ignore: List[str] | None = None, max_matches: int = DEFAULT_MAX_MATCHES, use_index: bool = False, index_db: str | None = None, workers: int = DEFAULT_WORKERS, ignore_files: bool = True, sort: bool = True) -> Iterator[Dict[str, Any]]:
+    """Yield ``match`` records, then one ``summary`` record.
+
+    Files are searched in sorted path order, or with ``sort`` False in walk
+    order, starting while the walk is still running.
+    """
     base = Path(base_dir).resolve()
     if not base.exists():
-        return {"error": f"Base directory not found: {base}"}
+        yield {"type": "error", "error": f"Base directory not found: {base}"}
+        return
 
     ignore = ignore or []
     rx: re.Pattern[str]
     try:
         rx = re.compile(pattern)
     except re.error as e:
-        return {"error": f"Invalid regex: {e}"}
+        yield {"type": "error", "error": f"Invalid regex: {e}"}
+        return
+    rxb = bytes_pattern(pattern)
 
-    matches: List[Match] = []
-    for path in iter_files(base, include):
-        if not path.is_file():
-            continue
-        rel = path.relative_to(base)
-        skip = False
-        for ig in ignore:
-            if path.match(ig):
-                skip = True
-                break
-        if skip:
-            continue
+    files = iter_indexed_files(base, pattern, include, index_db) if use_index else iter_files(base, include, workers, ignore_files, sort)
+    targets = (p for p in files if not any(p.match(ig) for ig in ignore))
+
+    def search(path: Path) -> List[Match]:
         try:
-            text = path.read_text(encoding='utf-8')
-        except Exception:
-            continue  # Skip binary or unreadable
-        for idx, line in enumerate(text.splitlines(), start=1):
-            if rx.search(line):
-                matches.append(Match(str(rel), idx, line[:400]))
-                if len(matches) >= max_matches:
-                    break
-        if len(matches) >= max_matches:
+            return scan_file(path, str(path.relative_to(base)), rx, rxb, max_matches)
+        except OSError:
+            return []  # Skip unreadable
+
+    # Searchers run on a thread pool; results are consumed in path order
+    count = 0
+    for found in ordered_map(search, targets, workers):
+        for m in found[:max_matches - count]:
+            count += 1
+            yield {"type": "match", **m.__dict__}
+        if count >= max_matches:
             break
 
-    return {
+    yield {
+        "type": "summary",
         "base_dir": str(base),
         "pattern": pattern,
-        "count": len(matches),
-        "truncated": len(matches) >= max_matches,
-        "matches": [m.__dict__ for m in matches],
+        "count": count,
+        "truncated": count >= max_matches,
     }
 
 
+def run_grep(base_dir: str, pattern: str, include: List[str] | None = None, ignore: List[str] | None = None, max_matches: int = DEFAULT_MAX_MATCHES, use_index: bool = False, index_db: str | None = None, workers: int = DEFAULT_WORKERS, ignore_files: bool = True, stream: bool = False) -> Dict[str, Any] | Iterator[Dict[str, Any]]:
+    """Search files; with ``stream`` return the :func:`iter_grep` generator (walk order)."""
+    records = iter_grep(base_dir, pattern, include, ignore, max_matches, use_index, index_db, workers, ignore_files, sort=not stream)
+    if stream:
+        return records
+    matches, final = collect(records, "match")
+    if "error" in final:
+        return final
+    return {**final, "matches": matches}
+
+
 def main(argv: List[str]) -> int:
     parser = argparse.ArgumentParser(description="Regex search across repository text files")
     parser.add_argument('--base', default='.', help='Base directory')
@@ -98,9 +288,16 @@ def main(argv: List[str]) -> int:
     parser.add_argument('--include', action='append', help='Glob include (repeatable)')
     parser.add_argument('--ignore', action='append', help='Glob ignore (repeatable)')
     parser.add_argument('--max', type=int, default=DEFAULT_MAX_MATCHES, help='Max matches (default 500)')
+    parser.add_argument('--index', action='store_true', help='Search only the indexed catalog files, narrowed by the trigram index')
+    parser.add_argument('--index-db', help='Trigram index database (default <base>/.cache/grep-index.sqlite)')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help=f'Walker/searcher threads (default {DEFAULT_WORKERS})')
+    parser.add_argument('--no-ignore-files', dest='ignore_files', action='store_false', help='Do not honor .gitignore/.ignore files')
+    parser.add_argument('--stream', action='store_true', help='Emit one JSON line per match as found, then a summary line')
     args = parser.parse_args(argv)
 
-    result = run_grep(args.base, args.pattern, args.include, args.ignore, args.max)
+    if args.stream:
+        return emit_records(iter_grep(args.base, args.pattern, args.include, args.ignore, args.max, args.index, args.index_db, args.workers, args.ignore_files, sort=False))
+    result = run_grep(args.base, args.pattern, args.include, args.ignore, args.max, args.index, args.index_db, args.workers, args.ignore_files)
     print(json.dumps(result, indent=2))
     return 0 if 'error' not in result else 1
 
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""html_extract: Incremental HTML to markdown/text extraction for webfetch_tool.
+
+``HtmlExtractor`` is an html.parser.HTMLParser fed decoded text as the body
+arrives; ``size`` (UTF-8 bytes extracted so far) lets the caller stop reading
+once it has enough content, instead of capping raw HTML.
+
+Dropped while parsing (element and everything inside it):
+- script, style, noscript, template, svg, iframe, object, title
+- nav, footer, and any element with role="navigation", aria-hidden="true"
+  or the hidden attribute
+
+Rendering (``markdown=True``; ``False`` keeps only the text and line breaks):
+- h1-h6 as ``#`` headings, p/div/section/... as paragraphs, br as a line
+  break, hr as ``---``
+- ul/ol items as ``-`` / ``1.`` lines, indented per nesting level
+- a[href] as ``[text](absolute url)``; fragment and javascript: links keep
+  only their text
+- pre as fenced code blocks (whitespace kept), inline code in backticks
+- table rows as lines with `` | `` between cells
+Elsewhere whitespace is collapsed as a browser would.
+
+Usage:
+    extractor = HtmlExtractor(base_url=url)
+    for text in chunks:
+        extractor.feed(text)
+        if extractor.size > limit:
+            break
+    extractor.close()
+    content = extractor.text()
+"""
+from __future__ import annotations
+
+import re
+from html.parser import HTMLParser
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urljoin
+
+SKIP_TAGS = {'script', 'style', 'noscript', 'template', 'svg', 'iframe', 'object', 'title', 'nav', 'footer'}
+BLOCK_TAGS = {
+    'address', 'article', 'aside', 'blockquote', 'center', 'dd', 'details', 'dialog', 'div', 'dl', 'dt',
+    'fieldset', 'figcaption', 'figure', 'form', 'header', 'main', 'ol', 'p', 'section', 'summary', 'table', 'ul',
+}
+VOID_TAGS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'param', 'source', 'track', 'wbr'}
+HEADINGS = {'h1': 1, 'h2': 2, 'h3': 3, 'h4': 4, 'h5': 5, 'h6': 6}
+
+_SPACE = re.compile(r'\s+')
+
+
+def _hidden(attrs: Dict[str, Optional[str]]) -> bool:
+    return (
+        'hidden' in attrs
+        or (attrs.get('role') or '').lower() == 'navigation'
+        or (attrs.get('aria-hidden') or '').lower() == 'true'
+    )
+
+
+class HtmlExtractor(HTMLParser):
+    def __init__(self, base_url: str = '', markdown: bool = True) -> None:
+        super().__init__(convert_charrefs=True)
+        self.base_url = base_url
+        self.markdown = markdown
+        self.size = 0
+        self._out: List[str] = []
+        self._breaks = 0  # Newlines owed before the next text
+        self._prefix = ''  # List marker / heading mark owed before the next text
+        self._space = False  # Whitespace owed between inline runs
+        self._skip: Optional[Tuple[str, int]] = None  # (tag, nesting) of the dropped element
+        self._pre = 0
+        self._lists: List[List[int]] = []  # Per open list: [next number] (ol) or [] (ul)
+        self._link: Optional[List[object]] = None  # [href, opened]
+        self._cell = False
+
+    # Output
+
+    def _emit(self, text: str) -> None:
+        self._out.append(text)
+        self.size += len(text.encode('utf-8'))
+
+    def _write(self, text: str) -> None:
+        """Emit inline ``text``, settling owed breaks, prefix and space first."""
+        if self._out and self._breaks:
+            self._emit('\n' * self._breaks)
+            self._space = False
+        elif self._out and self._space:
+            self._emit(' ')
+        self._breaks = 0
+        self._space = False
+        if self._prefix:
+            self._emit(self._prefix)
+            self._prefix = ''
+        if self._link is not None and not self._link[1]:
+            self._emit('[')
+            self._link[1] = True
+        self._emit(text)
+
+    def _block(self, breaks: int = 2) -> None:
+        self._breaks = max(self._breaks, breaks)
+        self._space = False
+
+    def text(self) -> str:
+        out = ''.join(self._out).rstrip()
+        return out + '\n' if out else ''
+
+    # Parser callbacks
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        if self._skip is not None:
+            if tag == self._skip[0]:
+                self._skip = (tag, self._skip[1] + 1)
+            return
+        attr = dict(attrs)
+        if tag in SKIP_TAGS or (tag not in VOID_TAGS and _hidden(attr)):
+            self._skip = (tag, 1)
+            return
+        if tag in HEADINGS:
+            self._block()
+            if self.markdown:
+                self._prefix = '#' * HEADINGS[tag] + ' '
+        elif tag == 'li':
+            self._block(1)
+            indent = '  ' * max(len(self._lists) - 1, 0)
+            counter = self._lists[-1] if self._lists else []
+            if counter:
+                self._prefix = f'{indent}{counter[0]}. '
+                counter[0] += 1
+            else:
+                self._prefix = f'{indent}- '
+        elif tag in ('ul', 'ol'):
+            self._block(1 if self._lists else 2)
+            self._lists.append([1] if tag == 'ol' else [])
+        elif tag == 'pre':
+            self._block()
+            if self.markdown:
+                self._write('```\n')
+                self._breaks = 0
+            self._pre += 1
+        elif tag == 'br':
+            if self._pre:
+                self._emit('\n')
+            else:
+                self._block(1)
+        elif tag == 'hr':
+            self._block()
+            if self.markdown:
+                self._write('---')
+            self._block()
+        elif tag == 'tr':
+            self._block(1)
+            self._cell = False
+        elif tag in ('td', 'th'):
+            if self._cell:
+                self._space = True
+                self._write('|')
+                self._space = True
+            self._cell = True
+        elif tag == 'code' and not self._pre and self.markdown:
+            self._write('`')
+        elif tag == 'a' and self.markdown:
+            href = (attr.get('href') or '').strip()
+            if href and not href.startswith('#') and not href.lower().startswith('javascript:'):
+                self._link = [urljoin(self.base_url, href), False]
+        elif tag in BLOCK_TAGS:
+            self._block()
+
+    def handle_endtag(self, tag: str) -> None:
+        if self._skip is not None:
+            if tag == self._skip[0]:
+                depth = self._skip[1] - 1
+                self._skip = (tag, depth) if depth else None
+            return
+        if tag in HEADINGS:
+            self._prefix = ''
+            self._block()
+        elif tag in ('ul', 'ol'):
+            if self._lists:
+                self._lists.pop()
+            self._block(1 if self._lists else 2)
+        elif tag == 'li':
+            self._prefix = ''
+            self._block(1)
+        elif tag == 'pre':
+            if self._pre:
+                self._pre -= 1
+            if self.markdown:
+                if self._out and not self._out[-1].endswith('\n'):
+                    self._emit('\n')
+                self._emit('```')
+            self._block()
+        elif tag == 'code' and not self._pre and self.markdown:
+            self._emit('`')
+        elif tag == 'a' and self._link is not None:
+            href, opened = self._link
+            self._link = None
+            if opened:
+                self._emit(f']({href})')
+        elif tag == 'tr':
+            self._block(1)
+        elif tag in BLOCK_TAGS:
+            self._block()
+
+    def handle_data(self, data: str) -> None:
+        if self._skip is not None or not data:
+            return
+        if self._pre:
+            self._write(data)
+            return
+        leading = data[0].isspace()
+        words = _SPACE.sub(' ', data).strip()
+        if not words:
+            self._space = self._space or bool(self._out)
+            return
+        if leading:
+            self._space = True
+        self._write(words)
+        self._space = data[-1].isspace()
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""http_content: Response body decoding for webfetch_tool.
+
+Content-Encoding:
+- ``ACCEPT_ENCODING`` offers gzip and deflate, plus br when the optional
+  ``brotli`` (or ``brotlicffi``) package is importable
+- ``decode_body`` decompresses a stream of raw chunks lazily, yielding at most
+  CHUNK_SIZE bytes per zlib step, so a caller that stops at a byte cap never
+  inflates the rest of the body (cap applies to decompressed bytes)
+- Stacked codings (``gzip, br``) are undone in reverse order; deflate bodies
+  with or without the zlib header are accepted; concatenated gzip members
+  are read to the end
+
+Charset (``detect_charset``), first match wins:
+1. Byte order mark
+2. ``charset=`` in the Content-Type header
+3. For HTML/XML (or an unknown type): ``<meta charset>`` /
+   ``<meta http-equiv content="...; charset=">`` or the XML declaration in
+   the first SNIFF_BYTES of the body
+4. UTF-8
+Labels are resolved with codecs.lookup; as in browsers, ISO-8859-1 and ASCII
+labels decode as windows-1252. ``TextDecoder`` applies the same choice to a
+body arriving in chunks (it holds back the first SNIFF_BYTES to decide).
+
+Usage:
+    chunks = decode_body(iter(lambda: resp.read(CHUNK_SIZE), b''), resp.headers.get('Content-Encoding'))
+    text, charset = decode_text(b''.join(chunks), resp.headers.get('Content-Type'))
+"""
+from __future__ import annotations
+
+import codecs
+import re
+import zlib
+from itertools import chain
+from typing import Iterable, Iterator, Optional, Tuple
+
+try:
+    import brotli  # type: ignore[import-not-found]
+except ImportError:  # Optional dependency
+    try:
+        import brotlicffi as brotli  # type: ignore[import-not-found, no-redef]
+    except ImportError:
+        brotli = None
+
+CHUNK_SIZE = 8192
+# Compressed input handed to brotli per step (it has no output bound)
+BROTLI_STEP = 1024
+# Body prefix searched for <meta charset> / <?xml encoding> (HTML prescan: 1024)
+SNIFF_BYTES = 4096
+
+ACCEPT_ENCODING = 'gzip, deflate, br' if brotli is not None else 'gzip, deflate'
+
+_GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+_BOMS = (
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+_CHARSET_PARAM = re.compile(r'charset\s*=\s*["\']?\s*([\w.:-]+)', re.IGNORECASE)
+_META_CHARSET = re.compile(rb'<meta\b[^>]*?charset\s*=\s*["\']?\s*([\w.:-]+)', re.IGNORECASE)
+_XML_ENCODING = re.compile(rb'^\s*<\?xml\b[^>]*?encoding\s*=\s*["\']([\w.:-]+)', re.IGNORECASE)
+_MARKUP_TYPES = ('text/html', 'application/xhtml+xml', 'text/xml', 'application/xml')
+# codecs names whose web label means windows-1252 (WHATWG Encoding Standard)
+_WINDOWS_1252 = {'latin-1', 'iso8859-1', 'ascii'}
+
+
+def _inflate(chunks: Iterable[bytes], wbits: int) -> Iterator[bytes]:
+    decompressor = zlib.decompressobj(wbits)
+    for chunk in chunks:
+        data = chunk
+        while data:
+            out = decompressor.decompress(data, CHUNK_SIZE)
+            if out:
+                yield out
+            if not decompressor.eof:
+                data = decompressor.unconsumed_tail
+                continue
+            data = decompressor.unused_data
+            if wbits != _GZIP_WBITS:
+                return  # Trailing bytes after a deflate stream are ignored
+            decompressor = zlib.decompressobj(wbits)  # Next gzip member
+    tail = decompressor.flush()
+    if tail:
+        yield tail
+
+
+def _inflate_deflate(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """HTTP deflate: zlib-wrapped per RFC 9110, but raw deflate is common."""
+    it = iter(chunks)
+    first = b''
+    for first in it:
+        if first:
+            break
+    zlib_header = len(first) >= 2 and first[0] & 0x0F == 8 and (first[0] << 8 | first[1]) % 31 == 0
+    yield from _inflate(chain([first], it), zlib.MAX_WBITS if zlib_header else -zlib.MAX_WBITS)
+
+
+def _unbrotli(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    decompressor = brotli.Decompressor()
+    for chunk in chunks:
+        for start in range(0, len(chunk), BROTLI_STEP):
+            out = decompressor.process(chunk[start:start + BROTLI_STEP])
+            if out:
+                yield out
+
+
+def _checked(chunks: Iterator[bytes], coding: str) -> Iterator[bytes]:
+    """Report corrupt compressed data as ValueError."""
+    errors = (zlib.error,) + ((brotli.error,) if brotli is not None and hasattr(brotli, 'error') else ())
+    try:
+        yield from chunks
+    except errors as e:
+        raise ValueError(f'Corrupt {coding} body: {e}') from e
+
+
+def decode_body(chunks: Iterable[bytes], content_encoding: Optional[str]) -> Iterator[bytes]:
+    """Lazily undo ``content_encoding`` over raw body ``chunks``."""
+    stream: Iterator[bytes] = iter(chunks)
+    codings = [c.strip().lower() for c in (content_encoding or '').split(',') if c.strip()]
+    for coding in reversed(codings):
+        if coding == 'identity':
+            continue
+        if coding in ('gzip', 'x-gzip'):
+            stream = _inflate(stream, _GZIP_WBITS)
+        elif coding == 'deflate':
+            stream = _inflate_deflate(stream)
+        elif coding == 'br' and brotli is not None:
+            stream = _unbrotli(stream)
+        else:
+            raise ValueError(f'Unsupported Content-Encoding: {content_encoding}')
+        stream = _checked(stream, coding)
+    return stream
+
+
+def normalize_charset(label: str) -> Optional[str]:
+    try:
+        name = codecs.lookup(label).name
+    except LookupError:
+        return None
+    return 'cp1252' if name in _WINDOWS_1252 else name
+
+
+def detect_charset(head: bytes, content_type: Optional[str]) -> str:
+    """Charset for a body starting with ``head`` (see module docstring)."""
+    for bom, name in _BOMS:
+        if head.startswith(bom):
+            return name
+    match = _CHARSET_PARAM.search(content_type or '')
+    if match:
+        charset = normalize_charset(match.group(1))
+        if charset:
+            return charset
+    mime = (content_type or '').split(';', 1)[0].strip().lower()
+    if not mime or mime in _MARKUP_TYPES or mime.endswith('+xml'):
+        prefix = head[:SNIFF_BYTES]
+        match = _XML_ENCODING.search(prefix) or _META_CHARSET.search(prefix)
+        if match:
+            charset = normalize_charset(match.group(1).decode('ascii'))
+            # A document cannot declare a UTF-16 charset in ASCII-compatible markup
+            if charset and not charset.startswith('utf-16'):
+                return charset
+    return 'utf-8'
+
+
+class TextDecoder:
+    """Incremental body decoder; ``charset`` is set once the head is sniffed."""
+
+    def __init__(self, content_type: Optional[str]) -> None:
+        self.content_type = content_type
+        self.charset: Optional[str] = None
+        self._head = b''
+        self._decoder: Optional[codecs.IncrementalDecoder] = None
+
+    def decode(self, data: bytes, final: bool = False) -> str:
+        if self._decoder is None:
+            self._head += data
+            if len(self._head) < SNIFF_BYTES and not final:
+                return ''
+            self.charset = detect_charset(self._head, self.content_type)
+            self._decoder = codecs.getincrementaldecoder(self.charset)(errors='replace')
+            data, self._head = self._head, b''
+        return self._decoder.decode(data, final)
+
+
+def decode_text(data: bytes, content_type: Optional[str]) -> Tuple[str, str]:
+    """(text, charset); undecodable bytes become U+FFFD."""
+    decoder = TextDecoder(content_type)
+    text = decoder.decode(data, final=True)
+    return text, decoder.charset or 'utf-8'
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""http_pool: Keep-alive connection pool behind urllib openers (webfetch_tool).
+
+urllib's stock handlers open a new TCP (and TLS) connection per request and
+force ``Connection: close``. ``PooledHTTPHandler`` / ``PooledHTTPSHandler``
+replace them in an opener built with ``urllib.request.build_opener``, so the
+rest of the pipeline (redirect handlers, error processing) is unchanged:
+
+- Idle connections are kept per (scheme, host:port), at most
+  MAX_IDLE_PER_HOST each, and dropped after IDLE_TIMEOUT seconds
+- A connection returns to the pool only when its response body was read to
+  the end and the server did not ask to close it
+- New HTTPS connections to a host resume its last TLS session (abbreviated
+  handshake) when the server supports session resumption
+- A request on a reused connection that the server already closed is
+  retried once on a fresh connection
+- Requests through an HTTPS proxy tunnel fall back to the stock handler
+
+Usage:
+    pool = ConnectionPool()
+    opener = urllib.request.build_opener(*pooled_handlers(pool))
+"""
+from __future__ import annotations
+
+import http.client
+import ssl
+import threading
+import time
+import urllib.error
+import urllib.request
+from typing import Any, Dict, List, Optional, Tuple
+
+MAX_IDLE_PER_HOST = 4
+IDLE_TIMEOUT = 30.0
+
+PoolKey = Tuple[str, str]  # (scheme, host[:port])
+
+
+class _SessionHTTPSConnection(http.client.HTTPSConnection):
+    """HTTPSConnection that offers a cached TLS session in the handshake."""
+
+    def __init__(self, host: str, session: Optional[ssl.SSLSession] = None, **kwargs: Any) -> None:
+        super().__init__(host, **kwargs)
+        self._session = session
+        self.resumed = False  # Set per handshake; counted once by the pool
+
+    def connect(self) -> None:
+        http.client.HTTPConnection.connect(self)
+        server_hostname = self._tunnel_host or self.host
+        self.sock = self._context.wrap_socket(self.sock, server_hostname=server_hostname, session=self._session)
+        self.resumed = self.sock.session_reused
+
+
+class ConnectionPool:
+    """Thread-safe idle-connection and TLS-session store."""
+
+    def __init__(self, max_idle_per_host: int = MAX_IDLE_PER_HOST, idle_timeout: float = IDLE_TIMEOUT, context: Optional[ssl.SSLContext] = None) -> None:
+        self.max_idle_per_host = max_idle_per_host
+        self.idle_timeout = idle_timeout
+        self.context = context or ssl.create_default_context()
+        self._idle: Dict[PoolKey, List[Tuple[float, http.client.HTTPConnection]]] = {}
+        self._sessions: Dict[PoolKey, ssl.SSLSession] = {}
+        self._lock = threading.Lock()
+        self.opened = 0
+        self.reused = 0
+        self.resumed = 0
+
+    def acquire(self, key: PoolKey, timeout: Optional[float]) -> Tuple[http.client.HTTPConnection, bool]:
+        """An idle connection for ``key`` (reused=True) or a new, unconnected one."""
+        now = time.monotonic()
+        stale: List[http.client.HTTPConnection] = []
+        conn: Optional[http.client.HTTPConnection] = None
+        with self._lock:
+            idle = self._idle.get(key, [])
+            while idle:
+                since, candidate = idle.pop()
+                if now - since <= self.idle_timeout:
+                    conn = candidate
+                    self.reused += 1
+                    break
+                stale.append(candidate)
+            session = self._sessions.get(key)
+            if conn is None:
+                self.opened += 1
+        for old in stale:
+            old.close()
+        if conn is not None:
+            conn.timeout = timeout
+            if conn.sock is not None:
+                conn.sock.settimeout(timeout)
+            return conn, True
+        scheme, host = key
+        if scheme == 'https':
+            return _SessionHTTPSConnection(host, session=session, timeout=timeout, context=self.context), False
+        return http.client.HTTPConnection(host, timeout=timeout), False
+
+    def release(self, key: PoolKey, conn: http.client.HTTPConnection) -> None:
+        """Return a connection whose last response was fully read."""
+        self._remember_session(key, conn)
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_idle_per_host:
+                idle.append((time.monotonic(), conn))
+                return
+        conn.close()
+
+    def discard(self, key: PoolKey, conn: http.client.HTTPConnection) -> None:
+        self._remember_session(key, conn)
+        conn.close()
+
+    def _remember_session(self, key: PoolKey, conn: http.client.HTTPConnection) -> None:
+        sock = conn.sock
+        if not isinstance(sock, ssl.SSLSocket):
+            return
+        resumed = getattr(conn, 'resumed', False)
+        conn.resumed = False  # type: ignore[attr-defined]
+        session = sock.session
+        with self._lock:
+            self.resumed += resumed
+            if session is not None:
+                self._sessions[key] = session
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            idle = sum(len(conns) for conns in self._idle.values())
+            return {'opened': self.opened, 'reused': self.reused, 'tls_resumed': self.resumed, 'idle': idle}
+
+    def close(self) -> None:
+        with self._lock:
+            conns = [conn for idle in self._idle.values() for _, conn in idle]
+            self._idle.clear()
+        for conn in conns:
+            conn.close()
+
+
+class PooledResponse:
+    """http.client.HTTPResponse proxy that hands its connection back on close."""
+
+    def __init__(self, response: http.client.HTTPResponse, pool: ConnectionPool, key: PoolKey, conn: http.client.HTTPConnection) -> None:
+        self._response = response
+        self._pool = pool
+        self._key = key
+        self._conn: Optional[http.client.HTTPConnection] = conn
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._response, name)
+
+    def close(self) -> None:
+        conn, self._conn = self._conn, None
+        if conn is None:
+            return
+        # isclosed(): the body was consumed to its end (length or last chunk)
+        reusable = self._response.isclosed() and not self._response.will_close
+        self._response.close()
+        if reusable:
+            self._pool.release(self._key, conn)
+        else:
+            self._pool.discard(self._key, conn)
+
+    def __enter__(self) -> 'PooledResponse':
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+# Errors meaning a kept-alive connection was closed by the server meanwhile
+_STALE_ERRORS = (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError)
+
+
+class _PooledOpenMixin:
+    pool: ConnectionPool
+
+    def _pooled_open(self, req: urllib.request.Request, scheme: str) -> PooledResponse:
+        if not req.host:
+            raise urllib.error.URLError('no host given')
+        headers = dict(req.unredirected_hdrs)
+        headers.update({k: v for k, v in req.headers.items() if k not in headers})
+        headers = {name.title(): value for name, value in headers.items()}
+        key = (scheme, req.host)
+        for attempt in range(2):
+            conn, reused = self.pool.acquire(key, req.timeout)
+            try:
+                conn.request(req.get_method(), req.selector, req.data, headers, encode_chunked=req.has_header('Transfer-encoding'))
+                response = conn.getresponse()
+            except _STALE_ERRORS as err:
+                conn.close()
+                if reused and attempt == 0:
+                    continue
+                raise urllib.error.URLError(err)
+            except OSError as err:
+                conn.close()
+                raise urllib.error.URLError(err)
+            except BaseException:
+                conn.close()
+                raise
+            break
+        # As urllib's do_open: expose the request URL and reason phrase
+        response.url = req.get_full_url()
+        response.msg = response.reason
+        return PooledResponse(response, self.pool, key, conn)
+
+
+class PooledHTTPHandler(_PooledOpenMixin, urllib.request.HTTPHandler):
+    def __init__(self, pool: ConnectionPool) -> None:
+        super().__init__()
+        self.pool = pool
+
+    def http_open(self, req: urllib.request.Request) -> Any:
+        return self._pooled_open(req, 'http')
+
+
+class PooledHTTPSHandler(_PooledOpenMixin, urllib.request.HTTPSHandler):
+    def __init__(self, pool: ConnectionPool) -> None:
+        super().__init__(context=pool.context)
+        self.pool = pool
+
+    def https_open(self, req: urllib.request.Request) -> Any:
+        if req._tunnel_host:  # type: ignore[attr-defined]  # CONNECT through a proxy
+            return super().https_open(req)
+        return self._pooled_open(req, 'https')
+
+
+def pooled_handlers(pool: ConnectionPool) -> Tuple[urllib.request.BaseHandler, ...]:
+    return PooledHTTPHandler(pool), PooledHTTPSHandler(pool)
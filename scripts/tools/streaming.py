@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""streaming: JSON Lines output shared by the tools' ``--stream`` mode.
+
+Streaming tools yield one record per result as soon as it is found, each a
+dict with a ``type`` key ('match', 'file', ...), and finish with exactly one
+``{"type": "summary", ...}`` record (or a single ``{"type": "error", ...}``
+record when the call fails up front). Records are printed as compact JSON,
+one per line, and flushed immediately so a consuming agent can act before
+the walk completes.
+
+Usage:
+    from scripts.tools.streaming import collect, emit_records
+    code = emit_records(run_grep('.', 'TODO', stream=True))
+"""
+from __future__ import annotations
+
+import json
+import sys
+from typing import Any, Dict, Iterable, List, Optional, TextIO, Tuple
+
+
+def emit_records(records: Iterable[Dict[str, Any]], out: Optional[TextIO] = None) -> int:
+    """Print records as JSON Lines; return the CLI exit code (1 on error)."""
+    out = out or sys.stdout
+    status = 0
+    for record in records:
+        if record.get('type') == 'error' or 'error' in record:
+            status = 1
+        out.write(json.dumps(record, separators=(',', ':')) + '\n')
+        out.flush()
+    return status
+
+
+def collect(records: Iterable[Dict[str, Any]], kind: str) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """Split a record stream into its ``kind`` items and the final record.
+
+    The ``type`` key is dropped from every record. The final record is the
+    summary, or the error record if the call failed.
+    """
+    items: List[Dict[str, Any]] = []
+    final: Dict[str, Any] = {}
+    for record in records:
+        record = dict(record)
+        rtype = record.pop('type')
+        if rtype == kind:
+            items.append(record)
+        else:
+            final = record
+    return items, final
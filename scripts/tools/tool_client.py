@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""tool_client: Thin client for tool_server.py with the tools' own CLIs.
+
+    python scripts/tools/tool_client.py grep --base . --pattern TODO
+
+behaves like ``python scripts/tools/grep_tool.py --base . --pattern TODO``:
+same arguments, stdout, stderr and exit code (``--stream`` output is relayed
+line by line). The work runs inside the warm daemon, so the per-call cost is
+this module's start-up (json + socket only) instead of importing and
+re-walking in a fresh interpreter. When no daemon is listening the tool runs
+in-process instead.
+
+Tools: grep, glob, diff, format, fetch, lint (grep_tool.py, glob_tool.py,
+diff_tool.py, format_tool.py, webfetch_tool.py, ../lint_agents.py). The
+caller's working directory and OPENCODE_ALLOW_WEB are forwarded with each
+call.
+
+Socket: $OPENCODE_TOOL_SOCKET, else $XDG_RUNTIME_DIR (or $TMPDIR, /tmp)
+/opencode-tools-<uid>.sock.
+
+Library:
+    from scripts.tools.tool_client import call
+    result = call('grep', {'base_dir': '.', 'pattern': 'TODO'})
+"""
+from __future__ import annotations
+
+import importlib
+import json
+import os
+import socket
+import sys
+from typing import Any, Callable, Dict, List, Optional
+
+TOOLS = {
+    'grep': 'grep_tool',
+    'glob': 'glob_tool',
+    'diff': 'diff_tool',
+    'format': 'format_tool',
+    'fetch': 'webfetch_tool',
+    'lint': 'lint_agents',
+}
+# Tools living outside scripts/tools/, relative to it
+TOOL_DIRS = {'lint': os.pardir}
+FORWARDED_ENV = ('OPENCODE_ALLOW_WEB',)
+
+Notify = Callable[[str, Dict[str, Any]], None]
+
+
+class ToolServerError(RuntimeError):
+    pass
+
+
+def default_socket_path() -> str:
+    env = os.environ.get('OPENCODE_TOOL_SOCKET')
+    if env:
+        return env
+    # Not tempfile.gettempdir(): importing tempfile costs more than this client
+    runtime = os.environ.get('XDG_RUNTIME_DIR') or os.environ.get('TMPDIR') or '/tmp'
+    return os.path.join(runtime, f'opencode-tools-{os.getuid()}.sock')
+
+
+def connect(socket_path: Optional[str] = None) -> socket.socket:
+    """Open a connection to the daemon (raises OSError if none is listening)."""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socket_path or default_socket_path())
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+def call_on(sock: socket.socket, method: str, params: Dict[str, Any], on_notify: Optional[Notify] = None) -> Any:
+    """Send one request on ``sock``; relay notifications until its response."""
+    request = {'jsonrpc': '2.0', 'id': 1, 'method': method, 'params': params}
+    sock.sendall(json.dumps(request).encode('utf-8') + b'\n')
+    with sock.makefile('rb') as reader:
+        for line in reader:
+            msg = json.loads(line)
+            if 'id' not in msg:
+                if on_notify is not None:
+                    on_notify(msg['method'], msg.get('params') or {})
+                continue
+            if 'error' in msg:
+                raise ToolServerError(msg['error'].get('message', 'tool server error'))
+            return msg.get('result')
+    raise ToolServerError('Connection closed before response')
+
+
+def call(method: str, params: Dict[str, Any], socket_path: Optional[str] = None, on_notify: Optional[Notify] = None) -> Any:
+    """Call a daemon method, e.g. ``call('glob', {'base_dir': '.', 'patterns': ['**/*.md']})``."""
+    with connect(socket_path) as sock:
+        return call_on(sock, method, params, on_notify)
+
+
+def _relay(method: str, params: Dict[str, Any]) -> None:
+    stream = sys.stderr if method == 'stderr' else sys.stdout
+    stream.write(params.get('data', ''))
+    stream.flush()
+
+
+def run_local(tool: str, argv: List[str]) -> int:
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), TOOL_DIRS.get(tool, '')))
+    module = importlib.import_module(TOOLS[tool])
+    sys.argv = [module.__file__, *argv]  # argparse program name, as if run directly
+    return module.main(argv)
+
+
+def main(argv: List[str]) -> int:
+    if not argv or argv[0] not in TOOLS:
+        print(f"usage: tool_client.py {{{','.join(TOOLS)}}} [tool arguments ...]", file=sys.stderr)
+        return 2
+    tool, tool_argv = argv[0], argv[1:]
+    try:
+        sock = connect()
+    except OSError:
+        return run_local(tool, tool_argv)
+    params = {
+        'tool': tool,
+        'argv': tool_argv,
+        'cwd': os.getcwd(),
+        'env': {name: os.environ.get(name) for name in FORWARDED_ENV},
+    }
+    with sock:
+        try:
+            result = call_on(sock, 'cli', params, _relay)
+        except ToolServerError as e:
+            print(f'tool server error: {e}', file=sys.stderr)
+            return 1
+    return int(result.get('exit_code', 1))
+
+
+if __name__ == '__main__':  # pragma: no cover
+    try:
+        sys.exit(main(sys.argv[1:]))
+    except KeyboardInterrupt:
+        print('Interrupted', file=sys.stderr)
+        sys.exit(130)
@@ -0,0 +1,432 @@
+#!/usr/bin/env python3
+"""tool_server: Long-running host for the scripts/tools tools.
+
+Agent sessions make hundreds of tool calls; starting a fresh interpreter for
+each one (imports, regex compilation, a cold directory walk) dominates their
+cost. This daemon keeps the tools imported and their caches warm:
+- a live snapshot of the watched trees (fs_watch.TreeSnapshot; default
+  opencode/, claude/ and the working directory) kept current by inotify or
+  polling, which every walk and lint_agents.scan consume instead of
+  rescanning the disk
+- directory listings elsewhere (walker.ListingCache, revalidated by mtime)
+- compiled .gitignore/.ignore rules (per file, revalidated by mtime/size)
+- compiled regexes (re's own cache, grep_tool.bytes_pattern)
+
+Protocol: JSON-RPC 2.0, one JSON object per line, over a Unix socket
+(default, see tool_client.default_socket_path) or stdin/stdout (--stdio).
+
+Methods:
+  grep, glob, diff, format, fetch, fetch_many
+      Keyword params of run_grep / run_glob / diff / run_format / run_fetch /
+      run_fetch_many; the result is the function's JSON value. An optional "cwd" resolves
+      relative paths. With "stream": true (grep, glob, format) every record is
+      sent first as a {"method": "record"} notification and the result is the
+      final summary record.
+  files {"root"?}
+      Snapshot query: [{"path", "mtime_ns", "size"}] below root (default all
+      watched roots), sorted by path.
+  cli {"tool", "argv", "cwd"?, "env"?}
+      Runs the tool's own main(argv) as the command line would (tools: grep,
+      glob, diff, format, fetch, lint). Output is
+      relayed as {"method": "stdout"|"stderr", "params": {"data"}}
+      notifications while it is written; the result is {"exit_code": n}.
+      This is what tool_client.py uses.
+  stats, ping, shutdown
+
+Calls run one at a time because they switch working directory and the
+forwarded environment; each tool already parallelizes internally. Process
+pools (lint/format -j) use the spawn start method: forking this
+multithreaded process (socket, inotify fd, SQLite handles) is unsafe.
+
+Usage:
+    python scripts/tools/tool_server.py [--socket PATH] [--idle-timeout 900] [--watch DIR ...]
+    python scripts/tools/tool_server.py --stdio
+    python scripts/tools/tool_client.py grep --base . --pattern TODO
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import socket
+import socketserver
+import sys
+import threading
+import time
+from dataclasses import asdict
+from pathlib import Path
+from types import ModuleType
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+try:
+    from . import diff_tool, format_tool, glob_tool, grep_tool, webfetch_tool
+    from .fs_watch import DEFAULT_WATCH_ROOTS, TreeSnapshot
+    from .tool_client import FORWARDED_ENV, default_socket_path
+    from .walker import ListingCache, set_listing_source
+except ImportError:  # executed as a script: scripts/tools/ is on sys.path
+    import diff_tool
+    import format_tool
+    import glob_tool
+    import grep_tool
+    import webfetch_tool
+    from fs_watch import DEFAULT_WATCH_ROOTS, TreeSnapshot
+    from tool_client import FORWARDED_ENV, default_socket_path
+    from walker import ListingCache, set_listing_source
+
+
+def _import_lint_agents() -> Optional[ModuleType]:
+    """scripts/lint_agents.py, or None when its dependencies are missing."""
+    try:
+        from .. import lint_agents  # type: ignore[misc]
+        return lint_agents
+    except ImportError:
+        pass
+    scripts_dir = str(Path(__file__).resolve().parent.parent)
+    if scripts_dir not in sys.path:
+        sys.path.append(scripts_dir)
+    try:
+        import lint_agents  # type: ignore[no-redef]
+    except ImportError:
+        return None
+    return lint_agents
+
+LIBRARY_METHODS: Dict[str, Callable[..., Any]] = {
+    'grep': grep_tool.run_grep,
+    'glob': glob_tool.run_glob,
+    'diff': diff_tool.diff,
+    'format': format_tool.run_format,
+    'fetch': webfetch_tool.run_fetch,
+    'fetch_many': webfetch_tool.run_fetch_many,
+}
+STREAMING_METHODS = {'grep', 'glob', 'format'}
+CLI_MODULES: Dict[str, ModuleType] = {
+    'grep': grep_tool,
+    'glob': glob_tool,
+    'diff': diff_tool,
+    'format': format_tool,
+    'fetch': webfetch_tool,
+}
+_lint_agents = _import_lint_agents()
+if _lint_agents is not None:
+    CLI_MODULES['lint'] = _lint_agents
+
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+TOOL_ERROR = -32000
+
+Send = Callable[[Dict[str, Any]], None]
+
+
+class RpcError(Exception):
+    def __init__(self, code: int, message: str) -> None:
+        super().__init__(message)
+        self.code = code
+
+
+def notification(method: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    return {'jsonrpc': '2.0', 'method': method, 'params': params}
+
+
+class _Relay(io.TextIOBase):
+    """Text stream forwarding complete lines (and explicit flushes) as notifications."""
+
+    def __init__(self, send: Send, name: str) -> None:
+        self._send = send
+        self._name = name
+        self._buffer = ''
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        self._buffer += text
+        cut = self._buffer.rfind('\n') + 1
+        if cut:
+            data, self._buffer = self._buffer[:cut], self._buffer[cut:]
+            self._send(notification(self._name, {'data': data}))
+        return len(text)
+
+    def flush(self) -> None:
+        if self._buffer:
+            data, self._buffer = self._buffer, ''
+            self._send(notification(self._name, {'data': data}))
+
+
+@contextlib.contextmanager
+def _call_context(cwd: Optional[str], env: Optional[Dict[str, Optional[str]]]) -> Iterator[None]:
+    previous_cwd = os.getcwd()
+    previous_env = {name: os.environ.get(name) for name in FORWARDED_ENV}
+    try:
+        if cwd:
+            os.chdir(cwd)
+        if env is not None:
+            for name in FORWARDED_ENV:
+                value = env.get(name)
+                if value is None:
+                    os.environ.pop(name, None)
+                else:
+                    os.environ[name] = value
+        yield
+    finally:
+        os.chdir(previous_cwd)
+        for name, value in previous_env.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+class ToolHost:
+    """Dispatches JSON-RPC requests to the tools; shared by both transports."""
+
+    def __init__(self, watch_roots: Optional[List[str]] = None, use_inotify: bool = True) -> None:
+        self.started = time.time()
+        self.calls = 0
+        self.listings = ListingCache()
+        self.snapshot: Optional[TreeSnapshot] = None
+        if watch_roots:
+            self.snapshot = TreeSnapshot(watch_roots, use_inotify=use_inotify, fallback=self.listings)
+        set_listing_source(self.snapshot or self.listings)
+        self.shutdown_requested = threading.Event()
+        self._lock = threading.Lock()
+
+    def handle(self, request: Any, send: Send) -> Optional[Dict[str, Any]]:
+        """Serve one request; return its response (None for notifications)."""
+        req_id = request.get('id') if isinstance(request, dict) else None
+        try:
+            if not isinstance(request, dict) or not isinstance(request.get('method'), str):
+                raise RpcError(INVALID_REQUEST, 'Invalid request')
+            params = request.get('params') or {}
+            if not isinstance(params, dict):
+                raise RpcError(INVALID_PARAMS, 'params must be an object')
+            result = self.dispatch(request['method'], dict(params), send)
+        except RpcError as e:
+            response = {'jsonrpc': '2.0', 'id': req_id, 'error': {'code': e.code, 'message': str(e)}}
+        except Exception as e:  # Tool crashed: report, keep serving
+            response = {'jsonrpc': '2.0', 'id': req_id, 'error': {'code': TOOL_ERROR, 'message': f'{type(e).__name__}: {e}'}}
+        else:
+            response = {'jsonrpc': '2.0', 'id': req_id, 'result': result}
+        if isinstance(request, dict) and 'id' not in request:
+            return None
+        return response
+
+    def dispatch(self, method: str, params: Dict[str, Any], send: Send) -> Any:
+        if method == 'ping':
+            return 'pong'
+        if method == 'stats':
+            stats: Dict[str, Any] = {
+                'uptime_s': round(time.time() - self.started, 3),
+                'calls': self.calls,
+                'listing_cache': {'hits': self.listings.hits, 'misses': self.listings.misses},
+                'http_pool': webfetch_tool.DEFAULT_POOL.stats(),
+            }
+            if self.snapshot is not None:
+                stats['snapshot'] = {
+                    'backend': self.snapshot.backend,
+                    'roots': [str(r) for r in self.snapshot.roots],
+                    'events': self.snapshot.events_applied,
+                    'rebuilds': self.snapshot.rebuilds,
+                }
+            return stats
+        if method == 'files':
+            return self._snapshot_files(params)
+        if method == 'shutdown':
+            self.shutdown_requested.set()
+            return 'bye'
+        if method == 'cli':
+            return self._run_cli(params, send)
+        if method in LIBRARY_METHODS:
+            return self._run_library(method, params, send)
+        raise RpcError(METHOD_NOT_FOUND, f'Unknown method: {method}')
+
+    def _snapshot_files(self, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        if self.snapshot is None:
+            raise RpcError(INVALID_PARAMS, 'No watched trees (server started with --no-watch)')
+        root = params.get('root')
+        if root is not None and not self.snapshot.covers(root):
+            raise RpcError(INVALID_PARAMS, f'Not inside a watched tree: {root}')
+        return [asdict(f) for f in self.snapshot.files(root)]
+
+    def _run_library(self, method: str, params: Dict[str, Any], send: Send) -> Any:
+        cwd = params.pop('cwd', None)
+        stream = bool(params.pop('stream', False))
+        if stream and method not in STREAMING_METHODS:
+            raise RpcError(INVALID_PARAMS, f'{method} does not support streaming')
+        with self._lock, _call_context(cwd, None):
+            self.calls += 1
+            try:
+                if not stream:
+                    return LIBRARY_METHODS[method](**params)
+                final: Dict[str, Any] = {}
+                for record in LIBRARY_METHODS[method](**params, stream=True):
+                    send(notification('record', record))
+                    final = record
+                return final
+            except TypeError as e:
+                raise RpcError(INVALID_PARAMS, str(e))
+
+    def _run_cli(self, params: Dict[str, Any], send: Send) -> Dict[str, int]:
+        tool = params.get('tool')
+        argv = params.get('argv') or []
+        if tool not in CLI_MODULES:
+            raise RpcError(INVALID_PARAMS, f'Unknown tool: {tool}')
+        if not isinstance(argv, list) or not all(isinstance(a, str) for a in argv):
+            raise RpcError(INVALID_PARAMS, 'argv must be a list of strings')
+        module = CLI_MODULES[tool]
+        out, err = _Relay(send, 'stdout'), _Relay(send, 'stderr')
+        with self._lock, _call_context(params.get('cwd'), params.get('env') or {}):
+            self.calls += 1
+            saved_argv = sys.argv
+            # argparse derives the program name in usage/errors from argv[0]
+            sys.argv = [module.__file__, *argv]
+            with contextlib.redirect_stdout(out), contextlib.redirect_stderr(err):
+                try:
+                    code = module.main(argv, snapshot=self.snapshot) if tool == 'lint' else module.main(argv)
+                except SystemExit as e:  # argparse errors, --help
+                    if isinstance(e.code, str):
+                        print(e.code, file=sys.stderr)
+                    code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+                finally:
+                    sys.argv = saved_argv
+                    out.flush()
+                    err.flush()
+        return {'exit_code': code}
+
+
+def _line_sender(write: Callable[[bytes], Any], flush: Callable[[], Any]) -> Send:
+    lock = threading.Lock()
+
+    def send(msg: Dict[str, Any]) -> None:
+        data = json.dumps(msg, separators=(',', ':')).encode('utf-8') + b'\n'
+        with lock:
+            write(data)
+            flush()
+
+    return send
+
+
+def _serve_lines(host: ToolHost, lines: Any, send: Send) -> None:
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            request = json.loads(line)
+        except ValueError:
+            send({'jsonrpc': '2.0', 'id': None, 'error': {'code': PARSE_ERROR, 'message': 'Parse error'}})
+            continue
+        response = host.handle(request, send)
+        if response is not None:
+            send(response)
+        if host.shutdown_requested.is_set():
+            return
+
+
+def serve_stdio(host: ToolHost) -> None:
+    # Keep the real stdout for protocol messages; tool output is relayed
+    stdout = sys.stdout.buffer
+    _serve_lines(host, sys.stdin.buffer, _line_sender(stdout.write, stdout.flush))
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    server: '_UnixServer'
+
+    def handle(self) -> None:
+        self.server.touch(+1)
+        try:
+            _serve_lines(self.server.host, self.rfile, _line_sender(self.wfile.write, self.wfile.flush))
+        finally:
+            self.server.touch(-1)
+        if self.server.host.shutdown_requested.is_set():
+            threading.Thread(target=self.server.shutdown, daemon=True).start()
+
+
+class _UnixServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path: str, host: ToolHost) -> None:
+        self.host = host
+        self.active = 0
+        self.last_activity = time.monotonic()
+        self._count_lock = threading.Lock()
+        super().__init__(path, _Handler)
+
+    def touch(self, delta: int) -> None:
+        with self._count_lock:
+            self.active += delta
+            self.last_activity = time.monotonic()
+
+    def idle_for(self) -> float:
+        with self._count_lock:
+            return 0.0 if self.active else time.monotonic() - self.last_activity
+
+
+def _socket_in_use(path: str) -> bool:
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+        return True
+    except OSError:
+        return False
+    finally:
+        probe.close()
+
+
+def serve_socket(host: ToolHost, path: str, idle_timeout: float = 0) -> int:
+    if os.path.exists(path):
+        if _socket_in_use(path):
+            print(f'tool server already listening on {path}', file=sys.stderr)
+            return 1
+        os.unlink(path)  # Stale socket from a crashed server
+    old_umask = os.umask(0o177)  # Socket usable by this user only
+    try:
+        server = _UnixServer(path, host)
+    finally:
+        os.umask(old_umask)
+    if idle_timeout > 0:
+        def watchdog() -> None:
+            while not host.shutdown_requested.wait(min(idle_timeout, 5.0)):
+                if server.idle_for() > idle_timeout:
+                    server.shutdown()
+                    return
+        threading.Thread(target=watchdog, daemon=True).start()
+    print(f'tool server listening on {path}', file=sys.stderr)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(path)
+    return 0
+
+
+def main(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(description='Warm JSON-RPC host for grep/glob/diff/format/fetch')
+    parser.add_argument('--socket', default=None, help=f'Unix socket path (default {default_socket_path()})')
+    parser.add_argument('--stdio', action='store_true', help='Serve JSON-RPC over stdin/stdout instead of a socket')
+    parser.add_argument('--idle-timeout', type=float, default=0, help='Exit after this many idle seconds (socket mode; 0 = never)')
+    parser.add_argument('--watch', nargs='+', default=list(DEFAULT_WATCH_ROOTS), metavar='DIR', help='Trees kept in the live snapshot (default opencode claude .)')
+    parser.add_argument('--no-watch', action='store_true', help='Do not keep a live snapshot; only cache listings by mtime')
+    parser.add_argument('--poll', action='store_true', help='Poll for changes instead of using inotify')
+    args = parser.parse_args(argv)
+
+    # ProcessPoolExecutors created by the hosted tools start clean interpreters
+    # instead of forking the daemon's threads and open handles
+    multiprocessing.set_start_method('spawn', force=True)
+    host = ToolHost(None if args.no_watch else args.watch, use_inotify=not args.poll)
+    if args.stdio:
+        serve_stdio(host)
+        return 0
+    return serve_socket(host, args.socket or default_socket_path(), args.idle_timeout)
+
+
+if __name__ == '__main__':  # pragma: no cover
+    try:
+        sys.exit(main(sys.argv[1:]))
+    except KeyboardInterrupt:
+        print('Interrupted', file=sys.stderr)
+        sys.exit(130)
@@ -0,0 +1,440 @@
+#!/usr/bin/env python3
+"""walker: Shared parallel directory traversal for the search tools.
+
+Features:
+- Single traversal per call; directories of each level are scanned
+  concurrently on a thread pool (os.scandir releases the GIL)
+- Well-known noise directories (.git, node_modules, .venv, ...) are pruned
+  before descending, never enumerated and filtered afterwards
+- Deterministic output: POSIX paths relative to the base, sorted
+  (iter_walk yields the same paths in discovery order as they are found)
+- Optional .gitignore/.ignore support (nested files, plus ancestors up to the
+  repository root and .git/info/exclude); ignored subtrees are pruned during
+  the walk and compiled rules are cached per ignore file
+- Glob translation with pathlib-style ``**`` semantics for single-pass matching
+- Pluggable process-wide listing source for long-running hosts such as
+  tool_server.py: ListingCache re-reads a directory only when its mtime
+  changes; fs_watch.TreeSnapshot serves watched trees from memory
+- GlobMatcher: many include/exclude patterns compiled into one regex each,
+  with directory pruning for excluded subtrees and for directories outside
+  every include's literal prefix
+- Ordered thread-pool mapping helper for per-file work (searchers)
+
+Ignore files follow gitignore(5): '#' comments, '!' re-includes, a trailing
+'/' matches directories only, a pattern with any other '/' is anchored to its
+file's directory (otherwise it matches a name at any depth), and later rules
+win. Deeper files override their parents and .ignore overrides .gitignore in
+the same directory. As with git, a path inside an ignored directory cannot be
+re-included because the directory is never read.
+
+Usage:
+    from scripts.tools.walker import walk_files, glob_regex
+    rx = glob_regex('**/*.md')
+    files = [rel for rel in walk_files(Path('.'), ignore_files=True) if rx.match(rel)]
+"""
+from __future__ import annotations
+
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from itertools import islice
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, TypeVar
+
+T = TypeVar('T')
+R = TypeVar('R')
+
+DEFAULT_PRUNE_DIRS = frozenset({
+    '.git', '.hg', '.svn', 'node_modules', '.venv', 'venv', '__pycache__',
+    '.mypy_cache', '.pytest_cache', '.ruff_cache', '.tox', '.nox',
+})
+DEFAULT_WORKERS = min(32, (os.cpu_count() or 1) + 4)
+# Per-file tasks submitted ahead of consumption; bounds wasted work on early stop
+WINDOW_PER_WORKER = 4
+# Read in this order within a directory; later files take precedence
+IGNORE_FILE_NAMES = ('.gitignore', '.ignore')
+# Listings of directories modified this recently are not cached: a second
+# change within the same timestamp tick would leave the mtime unchanged
+RACY_LISTING_NS = 2_000_000_000
+MAX_CACHED_LISTINGS = 200_000
+
+# (name, is_dir, is_file) per directory entry
+Listing = List[Tuple[str, bool, bool]]
+
+
+@dataclass(frozen=True)
+class IgnoreRule:
+    regex: re.Pattern[str]
+    negate: bool
+    dir_only: bool
+
+
+@dataclass(frozen=True)
+class IgnoreFrame:
+    """Rules of one directory, positioned relative to the walk base.
+
+    A walk-relative path is made relative to the rules' directory by dropping
+    its first ``strip`` characters (descendants of the base) or prepending
+    ``prepend`` (ancestors of the base).
+    """
+    rules: Tuple[IgnoreRule, ...]
+    strip: int = 0
+    prepend: str = ''
+
+    def decide(self, rel: str, is_dir: bool) -> Optional[bool]:
+        local = self.prepend + rel[self.strip:]
+        for rule in reversed(self.rules):
+            if rule.dir_only and not is_dir:
+                continue
+            if rule.regex.match(local):
+                return not rule.negate
+        return None
+
+
+IgnoreChain = Tuple[IgnoreFrame, ...]
+
+# Compiled rules per ignore file, keyed on (mtime_ns, size) so edits are seen
+_RULE_CACHE: Dict[str, Tuple[Tuple[int, int], Tuple[IgnoreRule, ...]]] = {}
+
+
+def parse_ignore_line(line: str) -> Optional[IgnoreRule]:
+    line = line.rstrip('\r\n')
+    if not line or line.startswith('#'):
+        return None
+    # Trailing spaces are dropped unless escaped with a backslash
+    stripped = line.rstrip(' ')
+    if stripped.endswith('\\') and len(stripped) < len(line):
+        stripped = stripped[:-1] + ' '
+    line = stripped
+    negate = line.startswith('!')
+    if negate:
+        line = line[1:]
+    elif line.startswith(('\\#', '\\!')):
+        line = line[1:]
+    dir_only = line.endswith('/')
+    line = line.rstrip('/')
+    if not line:
+        return None
+    src = glob_regex_source(line)
+    if '/' not in line:
+        src = f'(?:.*/)?{src}'  # Unanchored: matches the name at any depth
+    return IgnoreRule(re.compile(f'(?s:{src})\\Z'), negate, dir_only)
+
+
+def load_ignore_file(path: Path) -> Tuple[IgnoreRule, ...]:
+    """Compiled rules of ``path`` (empty if unreadable), cached per file."""
+    try:
+        st = path.stat()
+    except OSError:
+        return ()
+    key = str(path)
+    stamp = (st.st_mtime_ns, st.st_size)
+    cached = _RULE_CACHE.get(key)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    try:
+        text = path.read_text(encoding='utf-8', errors='replace')
+    except OSError:
+        return ()
+    rules = tuple(r for r in map(parse_ignore_line, text.splitlines()) if r is not None)
+    _RULE_CACHE[key] = (stamp, rules)
+    return rules
+
+
+def is_ignored(chain: IgnoreChain, rel: str, is_dir: bool) -> bool:
+    for frame in reversed(chain):
+        decision = frame.decide(rel, is_dir)
+        if decision is not None:
+            return decision
+    return False
+
+
+def _dir_rules(directory: Path, names: Iterable[str] = IGNORE_FILE_NAMES) -> Tuple[IgnoreRule, ...]:
+    rules: Tuple[IgnoreRule, ...] = ()
+    for name in IGNORE_FILE_NAMES:
+        if name in names:
+            rules += load_ignore_file(directory / name)
+    return rules
+
+
+def base_ignore_chain(base: Path) -> IgnoreChain:
+    """Frames that apply above ``base``: .git/info/exclude and ancestors' files.
+
+    Ancestors are only consulted up to the enclosing repository root (the
+    nearest directory containing ``.git``); outside a repository the chain is
+    empty and only ignore files at or below ``base`` apply.
+    """
+    base = base.resolve()
+    root = next((d for d in (base, *base.parents) if (d / '.git').exists()), None)
+    if root is None:
+        return ()
+    frames: List[IgnoreFrame] = []
+    to_root = base.relative_to(root).as_posix()
+    prefix = '' if to_root == '.' else f'{to_root}/'
+    exclude = load_ignore_file(root / '.git' / 'info' / 'exclude')
+    if exclude:
+        frames.append(IgnoreFrame(exclude, prepend=prefix))
+    ancestors = [d for d in base.parents if d == root or root in d.parents]
+    for directory in reversed(ancestors):
+        rules = _dir_rules(directory)
+        if rules:
+            frames.append(IgnoreFrame(rules, prepend=f'{base.relative_to(directory).as_posix()}/'))
+    return tuple(frames)
+
+
+def read_dir(directory: Path) -> Listing:
+    listing: Listing = []
+    with os.scandir(directory) as it:
+        for entry in it:
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+                listing.append((entry.name, is_dir, not is_dir and entry.is_file()))
+            except OSError:
+                continue
+    return listing
+
+
+class ListingCache:
+    """Directory listings reused while the directory's mtime is unchanged.
+
+    Creating, deleting or renaming an entry updates the parent directory's
+    mtime, so a cached listing is never stale; a revisit costs one stat
+    instead of a full scandir. Ignore rules and pruning are still evaluated
+    on every walk.
+    """
+
+    def __init__(self, max_entries: int = MAX_CACHED_LISTINGS) -> None:
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: Dict[str, Tuple[int, Listing]] = {}
+
+    def listing(self, directory: Path) -> Listing:
+        key = str(directory)
+        mtime_ns = os.stat(key).st_mtime_ns
+        cached = self._entries.get(key)
+        if cached is not None and cached[0] == mtime_ns:
+            self.hits += 1
+            return cached[1]
+        self.misses += 1
+        listing = read_dir(directory)
+        if time.time_ns() - mtime_ns > RACY_LISTING_NS:
+            if len(self._entries) >= self.max_entries:
+                self._entries.clear()
+            self._entries[key] = (mtime_ns, listing)
+        return listing
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+# Object with listing(directory) -> Listing (may raise OSError) and optionally
+# sync(), called once at the start of every walk
+_LISTING_SOURCE: Optional[Any] = None
+
+
+def set_listing_source(source: Optional[Any]) -> Optional[Any]:
+    """Install the process-wide listing source; return the previous one."""
+    global _LISTING_SOURCE
+    previous, _LISTING_SOURCE = _LISTING_SOURCE, source
+    return previous
+
+
+def enable_listing_cache(max_entries: int = MAX_CACHED_LISTINGS) -> ListingCache:
+    """Turn on the process-wide listing cache (for long-running hosts)."""
+    if not isinstance(_LISTING_SOURCE, ListingCache):
+        set_listing_source(ListingCache(max_entries))
+    return _LISTING_SOURCE  # type: ignore[return-value]
+
+
+def _scan_dir(base: Path, prune: frozenset[str], prune_dir: Optional[Callable[[str], bool]], ignore_files: bool, rel: str, chain: IgnoreChain) -> Tuple[List[str], List[Tuple[str, IgnoreChain]]]:
+    files: List[str] = []
+    dirs: List[Tuple[str, IgnoreChain]] = []
+    prefix = f'{rel}/' if rel else ''
+    directory = base / rel if rel else base
+    try:
+        source = _LISTING_SOURCE
+        listing = source.listing(directory) if source is not None else read_dir(directory)
+    except OSError:
+        return files, dirs  # Unreadable directory: nothing to report
+    if ignore_files:
+        names = {name for name, _, _ in listing}
+        if not names.isdisjoint(IGNORE_FILE_NAMES):
+            rules = _dir_rules(directory, names)
+            if rules:
+                chain = chain + (IgnoreFrame(rules, strip=len(prefix)),)
+    for name, is_dir, is_file in listing:
+        sub = prefix + name
+        if is_dir:
+            if name in prune or (prune_dir and prune_dir(sub)):
+                continue
+            if chain and is_ignored(chain, sub, True):
+                continue
+            dirs.append((sub, chain))
+        elif is_file:
+            if chain and is_ignored(chain, sub, False):
+                continue
+            files.append(sub)
+    return files, dirs
+
+
+def iter_walk(base: Path, prune: Iterable[str] = DEFAULT_PRUNE_DIRS, workers: int = DEFAULT_WORKERS, prune_dir: Optional[Callable[[str], bool]] = None, ignore_files: bool = False) -> Iterator[str]:
+    """Yield POSIX paths, relative to ``base``, of every file below it.
+
+    Paths are yielded as each directory is scanned: level by level, in
+    directory-listing order within a directory. Directories named in
+    ``prune``, or whose relative path satisfies ``prune_dir``, are skipped
+    without being opened. With ``ignore_files``, paths excluded by
+    .gitignore/.ignore rules are dropped and ignored directories are not
+    opened either. Symlinked directories are not followed; symlinked files
+    are reported.
+    """
+    prune_set = frozenset(prune)
+    source = _LISTING_SOURCE
+    if source is not None and hasattr(source, 'sync'):
+        source.sync()  # Apply pending changes so this walk is never stale
+    level: List[Tuple[str, IgnoreChain]] = [('', base_ignore_chain(base) if ignore_files else ())]
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        while level:
+            next_level: List[Tuple[str, IgnoreChain]] = []
+            for files, dirs in pool.map(lambda item: _scan_dir(base, prune_set, prune_dir, ignore_files, *item), level):
+                yield from files
+                next_level.extend(dirs)
+            level = next_level
+
+
+def walk_files(base: Path, prune: Iterable[str] = DEFAULT_PRUNE_DIRS, workers: int = DEFAULT_WORKERS, prune_dir: Optional[Callable[[str], bool]] = None, ignore_files: bool = False) -> List[str]:
+    """Sorted list of :func:`iter_walk` (same pruning and ignore options)."""
+    return sorted(iter_walk(base, prune, workers, prune_dir, ignore_files))
+
+
+def _translate_part(part: str) -> str:
+    out: List[str] = []
+    i, n = 0, len(part)
+    while i < n:
+        c = part[i]
+        i += 1
+        if c == '*':
+            out.append('[^/]*')
+        elif c == '?':
+            out.append('[^/]')
+        elif c == '[':
+            j = i
+            if j < n and part[j] == '!':
+                j += 1
+            if j < n and part[j] == ']':
+                j += 1
+            while j < n and part[j] != ']':
+                j += 1
+            if j >= n:
+                out.append('\\[')
+                continue
+            body = part[i:j].replace('\\', '\\\\')
+            i = j + 1
+            if body[0] == '!':
+                body = '^/' + body[1:]
+            elif body[0] in '^[':
+                body = '\\' + body
+            out.append(f'[{body}]')
+        else:
+            out.append(re.escape(c))
+    return ''.join(out)
+
+
+def glob_regex_source(pattern: str) -> str:
+    """Regex source matching relative POSIX paths the way ``Path.glob`` does.
+
+    ``**`` as a whole component matches zero or more directories (or, as the
+    final component, any file below); ``*``/``?``/``[...]`` never cross '/'.
+    """
+    parts = [p for p in pattern.strip('/').split('/') if p not in ('', '.')]
+    out: List[str] = []
+    for idx, part in enumerate(parts):
+        last = idx == len(parts) - 1
+        if part == '**':
+            out.append('(?:[^/]+/)*[^/]+' if last else '(?:[^/]+/)*')
+        else:
+            out.append(_translate_part(part) + ('' if last else '/'))
+    return ''.join(out)
+
+
+def glob_regex(pattern: str) -> re.Pattern[str]:
+    return re.compile(f'(?s:{glob_regex_source(pattern)})\\Z')
+
+
+def _literal_prefix(pattern: str) -> Tuple[str, ...]:
+    """Leading directory components of ``pattern`` that contain no wildcards."""
+    parts = [p for p in pattern.strip('/').split('/') if p not in ('', '.')]
+    prefix: List[str] = []
+    for part in parts[:-1]:
+        if any(c in part for c in '*?['):
+            break
+        prefix.append(part)
+    return tuple(prefix)
+
+
+class GlobMatcher:
+    """Include and exclude globs compiled for a single walk.
+
+    Includes follow ``Path.glob`` semantics relative to the base. Excludes are
+    right-anchored like ``PurePath.match`` (``*.log`` matches at any depth,
+    ``build/*`` matches inside any ``build`` directory) but understand ``**``.
+    A directory matched by an exclude, or by the part before a trailing
+    ``/**``, is pruned with its whole subtree.
+    """
+
+    def __init__(self, patterns: Sequence[str], exclude: Sequence[str] = ()) -> None:
+        self._include = re.compile('(?s:%s)\\Z' % '|'.join(f'(?:{glob_regex_source(p)})' for p in patterns))
+        self._prefixes = [_literal_prefix(p) for p in patterns]
+        self._exclude: Optional[re.Pattern[str]] = None
+        self._exclude_dir: Optional[re.Pattern[str]] = None
+        if exclude:
+            sources = [glob_regex_source(ex) for ex in exclude]
+            self._exclude = re.compile('(?s:(?:.*/)?(?:%s))\\Z' % '|'.join(f'(?:{src})' for src in sources))
+            tree_sources = list(sources)
+            for ex in exclude:
+                trimmed = ex.rstrip('/')
+                if trimmed.endswith('/**'):
+                    tree_sources.append(glob_regex_source(trimmed[:-3]))
+            self._exclude_dir = re.compile('(?s:(?:.*/)?(?:%s))\\Z' % '|'.join(f'(?:{src})' for src in tree_sources if src))
+
+    def matches(self, rel: str) -> bool:
+        if not self._include.match(rel):
+            return False
+        return self._exclude is None or not self._exclude.match(rel)
+
+    def prune_dir(self, rel: str) -> bool:
+        if self._exclude_dir is not None and self._exclude_dir.match(rel):
+            return True
+        # Keep only directories on the way to, or below, some include's literal prefix
+        parts = tuple(rel.split('/'))
+        return not any(parts[:len(pre)] == pre[:len(parts)] for pre in self._prefixes)
+
+    def iter_walk(self, base: Path, workers: int = DEFAULT_WORKERS, ignore_files: bool = False) -> Iterator[str]:
+        """Relative paths under ``base`` accepted by this matcher, as found."""
+        files = iter_walk(base, workers=workers, prune_dir=self.prune_dir, ignore_files=ignore_files)
+        return (rel for rel in files if self.matches(rel))
+
+    def walk(self, base: Path, workers: int = DEFAULT_WORKERS, ignore_files: bool = False) -> List[str]:
+        """Sorted relative paths under ``base`` accepted by this matcher."""
+        return sorted(self.iter_walk(base, workers, ignore_files))
+
+
+def ordered_map(fn: Callable[[T], R], items: Iterable[T], workers: int = DEFAULT_WORKERS) -> Iterator[R]:
+    """Yield ``fn(item)`` for each item in input order, computed on a thread pool.
+
+    Only a bounded window of tasks is in flight, so a consumer that stops early
+    (e.g. a match cap) does not pay for the whole list. ``items`` is consumed
+    one window at a time, so it may be a generator still being produced (e.g.
+    :func:`iter_walk`) and results flow before it is exhausted.
+    """
+    window = max(1, workers) * WINDOW_PER_WORKER
+    items = iter(items)
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        while True:
+            batch = list(islice(items, window))
+            if not batch:
+                return
+            yield from pool.map(fn, batch)
@@ -13,30 +13,86 @@ Activation:
 Behavior:
 - Only allows URLs beginning with http:// or https://
 - Fetches using stdlib urllib; no redirects beyond a small chain (default 5)
-- Captures status code, final URL, and at most N bytes of UTF-8 text
+- Connections are pooled per host (http_pool.py): keep-alive reuse and TLS
+  session resumption across fetches in one process (e.g. tool_server.py)
+- Offers gzip/deflate (and br if brotli is installed) and decompresses while
+  reading; the byte cap counts decompressed bytes (http_content.py)
+- Captures status code, final URL, and at most N bytes of text, decoded with
+  the charset from the BOM, Content-Type or <meta>/<?xml?> (default UTF-8)
+- Responses are cached on disk (fetch_cache.py, default .cache/webfetch,
+  shared by every agent in the workspace): a fresh entry is served without a
+  request, a stale one is revalidated with If-None-Match / If-Modified-Since
+  and a 304 is served from cache; --no-cache bypasses it. If the cache
+  cannot be opened, read or written (e.g. a read-only cwd), the fetch goes
+  ahead uncached with a warning on stderr
+- HTML (text/html, application/xhtml+xml) is converted while it is read
+  (html_extract.py, --extract markdown by default, or text): script, style,
+  nav, footer and hidden elements are dropped, and the byte cap applies to
+  the extracted content, so reading stops once enough text was extracted
+  (raw HTML read is bounded by MAX_HTML_BYTES); --extract raw returns the
+  HTML itself
 - If content-type indicates binary (e.g., application/octet-stream, image/*) -> abort
 - Truncates large responses and reports truncated: true
 
-Return JSON fields:
-  url, final_url, status, bytes, truncated, content (if text), error (if any)
+Batch mode:
+- --url repeated and/or --url-file (one URL per line, # comments) fetch on a
+  thread pool: at most --concurrency requests in flight, at most --per-host
+  per host; each keeps its own --limit and --timeout
+- Output is {"results": [...], "errors": N} in input order; a URL listed
+  twice is fetched once. Library: run_fetch_many(urls, ...)
 
-Note: This is intentionally minimal; richer parsing (HTML->markdown) can be layered later.
+Return JSON fields:
+  url, final_url, status, bytes (of content), raw_bytes (decompressed body
+  read), truncated, content_type, charset, extract (markdown | text | raw),
+  content (if text), cache (hit | revalidated | miss), error (if any)
 """
 
 from __future__ import annotations
 
 import argparse
+import http.client
 import json
 import os
+import sqlite3
 import sys
+import urllib.parse
 import urllib.request
 import urllib.error
-from typing import Dict, Any, Tuple
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from email.message import Message
+from typing import Deque, Dict, Any, Iterable, List, Optional, Sequence, Tuple
+
+try:
+    from .fetch_cache import DEFAULT_CACHE_DIR, DEFAULT_TTL, CachedResponse, open_cache
+    from .html_extract import HtmlExtractor
+    from .http_content import ACCEPT_ENCODING, CHUNK_SIZE, TextDecoder, decode_body, decode_text
+    from .http_pool import ConnectionPool, pooled_handlers
+except ImportError:  # executed as a script: scripts/tools/ is on sys.path
+    from fetch_cache import DEFAULT_CACHE_DIR, DEFAULT_TTL, CachedResponse, open_cache
+    from html_extract import HtmlExtractor
+    from http_content import ACCEPT_ENCODING, CHUNK_SIZE, TextDecoder, decode_body, decode_text
+    from http_pool import ConnectionPool, pooled_handlers
 
 MAX_DEFAULT_BYTES = 100_000  # 100 KB cap
 MAX_REDIRECTS = 5
+MAX_ERROR_BODY = 64 * 1024  # Error pages up to this size are drained, longer ones drop their connection
+MAX_CONCURRENCY = 8  # Batch mode: requests in flight
+MAX_PER_HOST = 4  # Batch mode: requests in flight per host (pool keeps as many idle)
 BINARY_PREFIXES = ("image/", "video/", "audio/", "application/octet-stream")
 TEXT_LIKE = ("text/", "application/json", "application/javascript", "application/xml")
+HTML_TYPES = ("text/html", "application/xhtml+xml")
+EXTRACT_MODES = ("markdown", "text", "raw")
+# Extraction stops reading an HTML body past this many decompressed bytes
+MAX_HTML_BYTES = 8 * 1024 * 1024
+
+# Shared by every fetch in this process
+DEFAULT_POOL = ConnectionPool()
+
+# Failures of the response cache; the fetch then proceeds without it
+CACHE_ERRORS = (OSError, sqlite3.Error)
+_cache_warned: set[str] = set()
 
 
 def allowed() -> bool:
@@ -54,6 +110,10 @@ def classify_content_type(ct: str | None) -> str:
     return "other"
 
 
+def is_html(ct: str | None) -> bool:
+    return (ct or "").split(";", 1)[0].strip().lower() in HTML_TYPES
+
+
 class LimitedRedirectHandler(urllib.request.HTTPRedirectHandler):
     def __init__(self, max_redirects: int) -> None:
         self.max_redirects = max_redirects
@@ -72,14 +132,94 @@ class LimitedRedirectHandler(urllib.request.HTTPRedirectHandler):
         return super().redirect_request(req, fp, code, msg, headers, newurl)
 
 
+@dataclass(frozen=True)
+class FetchResult:
+    status: int
+    final_url: str
+    data: bytes
+    content_type: str | None
+    truncated: bool
+    headers: Message
+    # Set when an HTML body was extracted while reading (extract != "raw")
+    text: Optional[str] = None
+    charset: Optional[str] = None
+
+
+def _cut(text: str, limit: int) -> str:
+    """``text`` shortened to at most ``limit`` UTF-8 bytes."""
+    return text.encode("utf-8")[: max(limit, 0)].decode("utf-8", errors="ignore")
+
+
+def extract_html(
+    chunks: Iterable[bytes],
+    content_type: str | None,
+    base_url: str,
+    markdown: bool,
+    limit: int,
+) -> Tuple[bytes, str, str, bool]:
+    """Extract HTML ``chunks`` as they arrive until ``limit`` bytes of content.
+
+    Returns (raw bytes consumed, content, charset, truncated).
+    """
+    decoder = TextDecoder(content_type)
+    extractor = HtmlExtractor(base_url, markdown=markdown)
+    raw: list[bytes] = []
+    raw_size = 0
+    truncated = False
+    for chunk in chunks:
+        raw.append(chunk)
+        raw_size += len(chunk)
+        extractor.feed(decoder.decode(chunk))
+        if extractor.size > limit or raw_size >= MAX_HTML_BYTES:
+            truncated = True
+            break
+    else:
+        extractor.feed(decoder.decode(b"", final=True))
+    extractor.close()
+    text = extractor.text()
+    if len(text.encode("utf-8")) > limit:
+        text = _cut(text, limit)
+        truncated = True
+    return b"".join(raw), text, decoder.charset or "utf-8", truncated
+
+
 def fetch_once(
-    url: str, timeout: int, limit: int
-) -> Tuple[int, str, bytes, str | None, bool]:
-    req = urllib.request.Request(url, headers={"User-Agent": "opencode-webfetch/0.1"})
+    url: str,
+    timeout: int,
+    limit: int,
+    pool: Optional[ConnectionPool] = None,
+    headers: Optional[Dict[str, str]] = None,
+    extract: str = "raw",
+) -> FetchResult:
+    """Fetch ``url``; a 304 answer to conditional ``headers`` returns status 304.
+
+    ``data`` is the decompressed body, at most ``limit`` bytes; with
+    ``extract`` markdown or text an HTML body is instead read until ``limit``
+    bytes of ``text`` were extracted.
+    """
+    req = urllib.request.Request(
+        url,
+        headers={
+            "User-Agent": "opencode-webfetch/0.1",
+            "Accept-Encoding": ACCEPT_ENCODING,
+            **(headers or {}),
+        },
+    )
     redirect_handler = LimitedRedirectHandler(MAX_REDIRECTS)
-    opener = urllib.request.build_opener(redirect_handler)
+    opener = urllib.request.build_opener(
+        redirect_handler, *pooled_handlers(pool or DEFAULT_POOL)
+    )
+
+    try:
+        resp = opener.open(req, timeout=timeout)  # nosec B310 (controlled destination)
+    except urllib.error.HTTPError as e:
+        if e.code != 304 or not headers:
+            raise
+        with e:
+            e.read()  # Empty body: lets the pooled connection be reused
+            return FetchResult(304, e.geturl(), b"", None, False, e.headers)
 
-    with opener.open(req, timeout=timeout) as resp:  # nosec B310 (controlled destination)
+    with resp:
         status = getattr(resp, "status", 200)
         final_url = resp.geturl()
         ctype = resp.headers.get("Content-Type")
@@ -88,17 +228,22 @@ def fetch_once(
         if classification == "binary":
             raise ValueError(f"Refusing binary content type: {ctype}")
 
-        chunk_size = 8192
+        raw = iter(lambda: resp.read(CHUNK_SIZE), b"")
+        body = decode_body(raw, resp.headers.get("Content-Encoding"))
+        if extract != "raw" and is_html(ctype):
+            data, text, charset, truncated = extract_html(
+                body, ctype, final_url, extract == "markdown", limit
+            )
+            return FetchResult(
+                status, final_url, data, ctype, truncated, resp.headers, text, charset
+            )
+
         max_bytes = max(limit, 0)
         chunks: list[bytes] = []
         bytes_read = 0
         truncated = False
 
-        while True:
-            chunk = resp.read(chunk_size)
-            if not chunk:
-                break
-
+        for chunk in body:
             remaining = max_bytes - bytes_read
             if remaining <= 0:
                 truncated = True
@@ -113,18 +258,90 @@ def fetch_once(
             chunks.append(chunk)
             bytes_read += len(chunk)
 
-    return status, final_url, b"".join(chunks), ctype, truncated
+    return FetchResult(status, final_url, b"".join(chunks), ctype, truncated, resp.headers)
+
+
+def _cache_unavailable(cache_dir: str, err: Exception) -> None:
+    """Warn (once per cache directory) that fetches proceed uncached."""
+    if cache_dir in _cache_warned:
+        return
+    _cache_warned.add(cache_dir)
+    print(f"webfetch cache {cache_dir} unavailable, fetching uncached: {err}", file=sys.stderr)
+
+
+def _cached_result(
+    cached: CachedResponse, limit: int, extract: str, state: str
+) -> Dict[str, Any]:
+    if extract != "raw" and is_html(cached.content_type):
+        data, text, charset, truncated = extract_html(
+            [cached.body], cached.content_type, cached.final_url, extract == "markdown", limit
+        )
+        truncated = truncated or cached.truncated
+    else:
+        extract = "raw"
+        data = cached.body[: max(limit, 0)]
+        text, charset = decode_text(data, cached.content_type)
+        truncated = cached.truncated or len(cached.body) > len(data)
+    return {
+        "url": cached.url,
+        "final_url": cached.final_url,
+        "status": cached.status,
+        "bytes": len(text.encode("utf-8")) if extract != "raw" else len(data),
+        "raw_bytes": len(data),
+        "truncated": truncated,
+        "content_type": cached.content_type,
+        "charset": charset,
+        "extract": extract,
+        "content": text,
+        "cache": state,
+    }
+
 
+def run_fetch(
+    url: str,
+    allow: bool,
+    limit: int,
+    timeout: int,
+    cache_dir: Optional[str] = str(DEFAULT_CACHE_DIR),
+    ttl: float = DEFAULT_TTL,
+    extract: str = "markdown",
+) -> Dict[str, Any]:
+    """Fetch ``url`` through the response cache in ``cache_dir`` (None: no cache).
 
-def run_fetch(url: str, allow: bool, limit: int, timeout: int) -> Dict[str, Any]:
+    ``extract`` (markdown | text | raw) selects how HTML bodies are returned.
+    """
     if not allow and not allowed():
         return {"error": "webfetch disabled (set OPENCODE_ALLOW_WEB=1 or pass --allow)"}
     if not (url.startswith("http://") or url.startswith("https://")):
         return {"error": f"Only http(s) URLs allowed: {url}"}
+    if extract not in EXTRACT_MODES:
+        return {"error": f"Unknown extract mode: {extract}", "url": url}
+
+    cache = cached = None
+    if cache_dir:
+        try:
+            cache = open_cache(cache_dir)
+            cached = cache.get(url, limit, extract)
+        except CACHE_ERRORS as e:
+            _cache_unavailable(cache_dir, e)
+            cache = cached = None
+    if cached is not None and cached.is_fresh(ttl):
+        return _cached_result(cached, limit, extract, "hit")
 
     try:
-        status, final_url, data, ctype, truncated = fetch_once(url, timeout, limit)
+        fetched = fetch_once(
+            url,
+            timeout,
+            limit,
+            headers=cached.validators() if cached else None,
+            extract=extract,
+        )
     except urllib.error.HTTPError as e:
+        with e:
+            try:
+                e.read(MAX_ERROR_BODY)  # Drain a short error page so the pooled connection is reused
+            except (OSError, http.client.HTTPException):
+                pass
         return {
             "error": f"HTTP error {e.code}: {e.reason}",
             "status": e.code,
@@ -137,6 +354,20 @@ def run_fetch(url: str, allow: bool, limit: int, timeout: int) -> Dict[str, Any]
     except Exception as e:  # pragma: no cover
         return {"error": f"Unexpected error: {e}", "url": url}
 
+    if fetched.status == 304 and cached is not None:
+        try:
+            cached = cache.revalidated(cached, fetched.headers)
+        except CACHE_ERRORS as e:
+            _cache_unavailable(cache_dir, e)
+        return _cached_result(cached, limit, extract, "revalidated")
+
+    status, final_url, data, ctype, truncated = (
+        fetched.status,
+        fetched.final_url,
+        fetched.data,
+        fetched.content_type,
+        fetched.truncated,
+    )
     classification = classify_content_type(ctype)
     if classification == "binary":
         return {
@@ -145,29 +376,110 @@ def run_fetch(url: str, allow: bool, limit: int, timeout: int) -> Dict[str, Any]
             "url": url,
         }
 
-    # Attempt UTF-8 decode with fallback replace
-    try:
-        text = data.decode("utf-8")
-    except UnicodeDecodeError:
-        text = data.decode("utf-8", errors="replace")
+    if fetched.text is not None:
+        text, charset = fetched.text, fetched.charset
+    else:
+        text, charset = decode_text(data, ctype)
 
     if classification not in ("text", "other", "unknown"):
         return {"error": f"Unsupported content type: {ctype}"}
 
+    if cache is not None:
+        try:
+            cache.store(
+                url, status, final_url, ctype, fetched.headers, data, truncated, extract, limit
+            )
+        except CACHE_ERRORS as e:
+            _cache_unavailable(cache_dir, e)
+
     return {
         "url": url,
         "final_url": final_url,
         "status": status,
-        "bytes": len(data),
+        "bytes": len(text.encode("utf-8")) if fetched.text is not None else len(data),
+        "raw_bytes": len(data),
         "truncated": truncated,
         "content_type": ctype,
+        "charset": charset,
+        "extract": extract if fetched.text is not None else "raw",
         "content": text,
+        "cache": "miss",
     }
 
 
+def run_fetch_many(
+    urls: Sequence[str],
+    allow: bool,
+    limit: int,
+    timeout: int,
+    cache_dir: Optional[str] = str(DEFAULT_CACHE_DIR),
+    ttl: float = DEFAULT_TTL,
+    concurrency: int = MAX_CONCURRENCY,
+    per_host: int = MAX_PER_HOST,
+    extract: str = "markdown",
+) -> List[Dict[str, Any]]:
+    """run_fetch for each URL concurrently; results in input order.
+
+    A URL whose host already has ``per_host`` requests in flight waits
+    without holding one of the ``concurrency`` worker slots.
+    """
+    unique = list(dict.fromkeys(urls))
+    hosts = [urllib.parse.urlsplit(url).netloc.lower() for url in unique]
+    results: List[Dict[str, Any]] = [{} for _ in unique]
+    concurrency, per_host = max(1, concurrency), max(1, per_host)
+    pending: Deque[int] = deque(range(len(unique)))
+    active: Dict[str, int] = {}
+    running: Dict[Future, int] = {}
+    with ThreadPoolExecutor(max_workers=min(concurrency, len(unique)) or 1) as pool:
+        while pending or running:
+            waiting: Deque[int] = deque()
+            while pending and len(running) < concurrency:
+                index = pending.popleft()
+                host = hosts[index]
+                if active.get(host, 0) >= per_host:
+                    waiting.append(index)
+                    continue
+                active[host] = active.get(host, 0) + 1
+                future = pool.submit(
+                    run_fetch,
+                    unique[index],
+                    allow,
+                    limit,
+                    timeout,
+                    cache_dir,
+                    ttl,
+                    extract,
+                )
+                running[future] = index
+            waiting.extend(pending)
+            pending = waiting
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                index = running.pop(future)
+                active[hosts[index]] -= 1
+                try:
+                    results[index] = future.result()
+                except Exception as e:  # pragma: no cover
+                    results[index] = {"error": f"Unexpected error: {e}", "url": unique[index]}
+    by_url = dict(zip(unique, results))
+    return [dict(by_url[url]) for url in urls]
+
+
+def read_url_file(path: str) -> List[str]:
+    with open(path, encoding="utf-8") as fh:
+        lines = (line.strip() for line in fh)
+        return [line for line in lines if line and not line.startswith("#")]
+
+
 def main(argv: list[str]) -> int:
     parser = argparse.ArgumentParser(description="Controlled remote fetch (text only)")
-    parser.add_argument("--url", required=True, help="HTTP(S) URL to fetch")
+    parser.add_argument(
+        "--url",
+        action="append",
+        default=[],
+        help="HTTP(S) URL to fetch (repeat for a batch)",
+    )
+    parser.add_argument("--url-file", help="File with one URL per line (batch)")
     parser.add_argument(
         "--allow",
         action="store_true",
@@ -179,11 +491,71 @@ def main(argv: list[str]) -> int:
     parser.add_argument(
         "--timeout", type=int, default=10, help="Timeout seconds (default 10)"
     )
+    parser.add_argument(
+        "--cache-dir",
+        default=str(DEFAULT_CACHE_DIR),
+        help=f"Response cache directory (default {DEFAULT_CACHE_DIR})",
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true", help="Bypass the response cache"
+    )
+    parser.add_argument(
+        "--ttl",
+        type=float,
+        default=DEFAULT_TTL,
+        help=f"Seconds a cached response is served without revalidation (default {DEFAULT_TTL:g})",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=MAX_CONCURRENCY,
+        help=f"Batch: max requests in flight (default {MAX_CONCURRENCY})",
+    )
+    parser.add_argument(
+        "--per-host",
+        type=int,
+        default=MAX_PER_HOST,
+        help=f"Batch: max requests in flight per host (default {MAX_PER_HOST})",
+    )
+    parser.add_argument(
+        "--extract",
+        choices=EXTRACT_MODES,
+        default="markdown",
+        help="HTML output: markdown (default), text, or raw HTML",
+    )
     args = parser.parse_args(argv)
 
-    result = run_fetch(args.url, args.allow, args.limit, args.timeout)
-    print(json.dumps(result, indent=2))
-    return 0 if "error" not in result else 1
+    urls = list(args.url)
+    if args.url_file:
+        try:
+            urls.extend(read_url_file(args.url_file))
+        except OSError as e:
+            parser.error(f"cannot read --url-file: {e}")
+    if not urls:
+        parser.error("--url or --url-file is required")
+
+    cache_dir = None if args.no_cache else args.cache_dir
+    if len(urls) == 1 and not args.url_file:
+        result = run_fetch(
+            urls[0], args.allow, args.limit, args.timeout, cache_dir, args.ttl, args.extract
+        )
+        print(json.dumps(result, indent=2))
+        return 0 if "error" not in result else 1
+
+    results = run_fetch_many(
+        urls,
+        args.allow,
+        args.limit,
+        args.timeout,
+        cache_dir,
+        args.ttl,
+        args.concurrency,
+        args.per_host,
+        args.extract,
+    )
+    errors = sum(1 for r in results if "error" in r)
+    print(json.dumps({"results": results, "errors": errors}, indent=2))
+    return 0 if not errors else 1
 
 
 if __name__ == "__main__":  # pragma: no cover